@@ -1,15 +1,32 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from functools import partial
+import json
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file, stream_with_context
 from flask_cors import CORS
-from app.services.journal_service import get_journal_metrics_single
 from ranking.ranking import LitStudy
+from ranking.normalizacion import normalize_results
+from ranking.espejo import local_mirror
+from ranking.almacen_columnar import columnar_store
 import csv
-from litstudy.sources.crossref import CrossRefDocument
-import requests
-from litstudy import search_crossref
+import io
+import re
+import zlib
+from urllib.parse import quote
 import matplotlib
-from pybliometrics.scopus import AuthorRetrieval, ScopusSearch, SerialTitle
-from mapas.mapa_referencias import build_citation_graph, plot_citation_graph, get_refs_scopus, get_refs_crossref
+from mapas.mapa_referencias import build_citation_graph, graph_to_json, plot_citation_graph, render_citation_graph_html, get_refs_scopus, get_refs_crossref
 from config import SCOPUS_API_KEY,SCOPUS_HEADERS,SCOPUS_BASE_URL
+from mapas.almacen_grafo import citation_store
+from mapas.analisis import analyze_columnar, analyze_graph, analyze_store
+from mapas.disposicion import get_layout, wants_server_layout
+from mapas.rastreo import DIRECTIONS as CRAWL_DIRECTIONS, crawl_citations
+from servicios import ajustes
+from servicios.cache import response_cache
+from servicios.concurrencia import iter_completed, run_with_timeouts
+from servicios.identidad import identity_index
+from servicios.indice_autores import author_index, author_search_query
+from servicios.limitador import rate_limiter
+from servicios.fuentes import author_retrieval, author_search, crossref_work, http_get_json, iter_scopus_search
+from servicios.revistas import get_journal_metrics_many, journal_metrics, normalize_issn
+from servicios.trabajos import DONE, ERROR, job_queue
 
 
 # Inicialización de la aplicación Flask
@@ -30,12 +47,27 @@ def get_author_eid():
         return jsonify({'error': 'El nombre del autor es obligatorio'}), 400
 
     try:
-        search_results = ScopusSearch(f"AUTH({author_name})")
-        if search_results.results:
-            author_ids_list = [
-                result.author_ids.split(";")[0] for result in search_results.results[:max_results]
+        # Primero el índice local; Scopus (AuthorSearch) solo si no hay ninguna coincidencia
+        authors = author_index.lookup(author_name, limit=max_results, source="scopus")
+        origin = "local"
+        if not authors:
+            candidates = author_search(author_search_query(author_name))
+            authors = author_index.lookup(author_name, limit=max_results, source="scopus") or [
+                {"id": candidate.identifier, "name": f"{candidate.surname}, {candidate.given_name}",
+                 "affiliation": candidate.affiliation, "documents": candidate.documents}
+                for candidate in sorted(candidates, key=lambda candidate: -candidate.documents)[:max_results]
             ]
-            return jsonify({"author_ids": list(set(author_ids_list))})
+            origin = "scopus"
+
+        if authors:
+            return jsonify({
+                "author_ids": [author["id"] for author in authors],
+                "authors": [
+                    {field: author.get(field) for field in ("id", "name", "affiliation", "h_index", "documents")}
+                    for author in authors
+                ],
+                "origin": origin,
+            })
         else:
             return jsonify({"error": f"No se encontró el autor: {author_name}"}), 404
     except Exception as e:
@@ -43,278 +75,257 @@ def get_author_eid():
 
 
 
-@app.route('/generate_report', methods=['POST'])
-def generate_author_impact_report():
+REPORT_FIELDNAMES = [
+    "Título", "Fecha", "SJR (SCImago)", "SNIP", "H-index de la revista",
+    "Editorial", "Citas", "Lecturas (Estimadas)"
+]
+
+
+def _report_rows(author_ids, max_results, progress=None):
     """
-    Genera un informe de impacto de autor en formato CSV y lo devuelve al cliente.
+    Genera las filas del informe de impacto, autor por autor.
+    ``progress(hechos, total, mensaje)`` se llama al terminar cada autor.
+    """
+    for idx, author_id in enumerate(author_ids, 1):
+        try:
+            # Obtener detalles del autor
+            author = author_retrieval(author_id)
+            # Buscar artículos del autor
+            search_results = list(iter_scopus_search(f"AU-ID({author_id})", limit=max_results))
+
+            # Métricas de todas las revistas del autor en una sola consulta en bloque
+            journals = journal_metrics.get_many(result.issn for result in search_results)
+
+            for result in search_results:
+                # Obtener métricas del journal (si tiene ISSN)
+                scimago_rank, snip, journal_h_index, publisher = None, None, None, "Desconocido"
+                journal = journals.get(normalize_issn(result.issn))
+                if journal:
+                    scimago_rank = journal.sjr
+                    snip = journal.snip
+                    journal_h_index = journal.citescoreyearinfolist
+                    publisher = journal.publisher
+
+                yield {
+                    "Título": result.title,
+                    "Fecha": result.coverDate,
+                    "SJR (SCImago)": scimago_rank or "No disponible",
+                    "SNIP": snip or "No disponible",
+                    "H-index de la revista": journal_h_index or "No disponible",
+                    "Editorial": publisher,
+                    "Citas": result.citedby_count,
+                    "Lecturas (Estimadas)": author.cited_by_count
+                }
+
+        except Exception as e:
+            print(f"Error procesando autor ID {author_id}: {e}")
+
+        if progress:
+            progress(idx, len(author_ids), f"Autor {author_id} procesado")
+
+
+def _report_params(data):
+    """
+    Valida los parámetros del informe de impacto. Lanza ``ValueError`` si faltan.
     """
-    data = request.get_json()
     author_name = data.get('author_name')
     author_ids = data.get('author_ids', [])
-    max_results = int(data.get('max_results'))  # Valor predeterminado: 5 resultados
+    max_results = int(data.get('max_results') or 5)  # Valor predeterminado: 5 resultados
 
     if not author_name or not author_ids:
-        return jsonify({'error': 'El nombre del autor y los IDs son obligatorios'}), 400
+        raise ValueError('El nombre del autor y los IDs son obligatorios')
+
+    # Sanear nombre del archivo: sin separadores de ruta ni caracteres de control
+    sanitized_author_name = re.sub(r"[\s/\\\x00-\x1f\x7f]", "_", author_name)
+    return {
+        "author_ids": list(author_ids),
+        "max_results": max_results,
+        "filename": f"{sanitized_author_name}_impact_report.csv",
+    }
 
-    report_data = []
-    sanitized_author_name = author_name.replace(" ", "_").replace("/", "_")  # Sanear nombre del archivo
-    output_file = f"{sanitized_author_name}_impact_report.csv"
 
+def _content_disposition(filename):
+    """
+    Cabecera ``Content-Disposition`` de una descarga: ``filename`` solo con
+    caracteres seguros (para clientes antiguos) y ``filename*`` (RFC 5987) con
+    el nombre completo en UTF-8 codificado con porcentajes.
+    """
+    fallback = re.sub(r"[^A-Za-z0-9_.-]", "_", filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def _iter_csv(rows, fieldnames):
+    """
+    Genera el CSV fila a fila (cabecera incluida) sin acumularlo en memoria.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    writer.writeheader()
+    yield flush()
+    for row in rows:
+        writer.writerow(row)
+        yield flush()
+
+
+def _iter_gzip(chunks):
+    """
+    Comprime en gzip un flujo de fragmentos de texto.
+    """
+    compressor = zlib.compressobj(wbits=31)  # 31 = formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _report_job(params, job):
+    rows = _report_rows(params["author_ids"], params["max_results"], job.report)
+    return "".join(_iter_csv(rows, REPORT_FIELDNAMES)).encode("utf-8"), "text/csv", params["filename"]
+
+
+@app.route('/generate_report', methods=['POST'])
+def generate_author_impact_report():
+    """
+    Genera un informe de impacto de autor en formato CSV y lo envía al cliente
+    fila a fila según se procesan los artículos, sin fichero temporal.
+    Con ``"gzip": true`` la respuesta se envía comprimida (Content-Encoding: gzip).
+    """
+    data = request.get_json()
     try:
-        for author_id in author_ids:
-            try:
-                # Obtener detalles del autor
-                author = AuthorRetrieval(author_id)
-                # Buscar artículos del autor
-                search_results = ScopusSearch(f"AU-ID({author_id})")
-
-                for result in search_results.results[:max_results]:
-                    title = result.title
-                    cited_by_count = result.citedby_count
-                    issn = result.issn
-                    cover_date = result.coverDate
-
-                    # Obtener métricas del journal (si tiene ISSN)
-                    scimago_rank, snip, journal_h_index, publisher = None, None, None, "Desconocido"
-                    if issn:
-                        try:
-                            journal = SerialTitle(issn)
-                            scimago_rank = journal.sjrlist[0][1] if journal.sjrlist else None
-                            snip = journal.sniplist[0][1] if journal.sniplist else None
-                            journal_h_index = journal.citescoreyearinfolist
-                            publisher = journal.publisher
-                        except Exception as e:
-                            print(f"Error al obtener métricas del ISSN {issn}: {e}")
-
-                    # Agregar datos al informe
-                    report_data.append({
-                        "Título": title,
-                        "Fecha": cover_date,
-                        "SJR (SCImago)": scimago_rank or "No disponible",
-                        "SNIP": snip or "No disponible",
-                        "H-index de la revista": journal_h_index or "No disponible",
-                        "Editorial": publisher,
-                        "Citas": cited_by_count,
-                        "Lecturas (Estimadas)": author.cited_by_count
-                    })
-
-            except Exception as e:
-                print(f"Error procesando autor ID {author_id}: {e}")
-                continue
-
-        # Generar archivo CSV
-        with open(output_file, "w", newline='', encoding="utf-8") as csvfile:
-            fieldnames = [
-                "Título", "Fecha", "SJR (SCImago)", "SNIP", "H-index de la revista",
-                "Editorial", "Citas", "Lecturas (Estimadas)"
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(report_data)
+        params = _report_params(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        # Enviar el archivo generado al cliente
-        return send_file(output_file, as_attachment=True, download_name=output_file)
+    chunks = _iter_csv(_report_rows(params["author_ids"], params["max_results"]), REPORT_FIELDNAMES)
+    headers = {"Content-Disposition": _content_disposition(params["filename"])}
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    if data.get('gzip'):
+        headers["Content-Encoding"] = "gzip"
+        return Response(stream_with_context(_iter_gzip(chunks)), mimetype="text/csv", headers=headers)
+
+    return Response(stream_with_context(chunks), mimetype="text/csv", headers=headers)
         
 
+def _search_source(source, query, search_type, fecha_inicio=None, fecha_fin=None, peso_grafo=0.0,
+                   local_first=ajustes.MIRROR_LOCAL_FIRST):
+    """
+    Busca y ordena los artículos de una fuente y los deja en el formato de la respuesta.
+    Cada fuente se consulta una sola vez; la normalización trabaja sobre los artículos ya ordenados.
+    """
+    articles = lit_study.search_and_rank(
+        query=query, source=source, search_type=search_type, delta=peso_grafo, local_first=local_first
+    ) or []
+    print(f"Articulos para {source}: {len(articles)}")
+
+    return normalize_results(source, articles, fecha_inicio, fecha_fin)
+
+
+def _source_tasks(data):
+    """
+    Valida los parámetros de /search_and_rank y devuelve {fuente: tarea}.
+    Lanza ``ValueError`` si las fechas no son válidas.
+    """
+    busqueda = data.get('busqueda', '')
+    tipo_busqueda = data.get('tipoBusqueda', 'title')  # Puede ser "title", "author" o "keywords"
+    fecha_inicio = data.get('fechaInicio', None)
+    fecha_fin = data.get('fechaFin', None)
+    sources = data.get('sources', ['scopus', 'crossref', 'scholar'])  # Fuentes seleccionadas
+
+    # Convertir fechas a enteros si son válidas
+    try:
+        fecha_inicio = int(fecha_inicio) if fecha_inicio else None
+        fecha_fin = int(fecha_fin) if fecha_fin else None
+    except ValueError:
+        raise ValueError("Las fechas deben ser números válidos")
+
+    # Peso opcional del PageRank en el grafo de citas rastreado (0 = ranking de siempre)
+    try:
+        peso_grafo = float(data.get('pesoGrafo') or 0.0)
+    except (TypeError, ValueError):
+        raise ValueError("El peso del grafo debe ser un número")
+
+    # Responder las consultas repetidas desde el espejo local mientras no hayan caducado
+    local_first = data.get('localFirst', ajustes.MIRROR_LOCAL_FIRST)
+    if isinstance(local_first, str):
+        local_first = local_first.lower() not in ("0", "false", "no")
+
+    # Ajustar la consulta según el tipo de búsqueda
+    query = busqueda  # Por defecto es búsqueda por título
+    search_type = "title"
+
+    if tipo_busqueda.lower() == "author":
+        search_type = "author"
+    elif tipo_busqueda.lower() == "keywords":
+        search_type = "keywords"
+
+    return {
+        source: partial(_search_source, source, query, search_type, fecha_inicio, fecha_fin, peso_grafo, bool(local_first))
+        for source in sources if source in ['scopus', 'crossref', 'scholar', 'local']
+    }
+
+
+def _stream_search(tasks, mode):
+    """
+    Devuelve los resultados de cada fuente en cuanto están listos, como NDJSON
+    (una línea JSON por fuente) o como Server-Sent Events.
+    """
+    def format_event(event):
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        return f"data: {payload}\n\n" if mode == "sse" else f"{payload}\n"
+
+    def generate():
+        for source, articles, error in iter_completed(tasks, timeouts=ajustes.SOURCE_TIMEOUTS):
+            event = {"source": source, "articles": articles or []}
+            if error:
+                event["error"] = error
+            yield format_event(event)
+        yield format_event({"done": True})
+
+    mimetype = "text/event-stream" if mode == "sse" else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route('/search_and_rank', methods=['POST'])
 def search_and_rank():
     try:
         # Obtener parámetros de la solicitud
         data = request.get_json()
-        busqueda = data.get('busqueda', '')
-        tipo_busqueda = data.get('tipoBusqueda', 'title')  # Puede ser "title", "author" o "keywords"
-        fecha_inicio = data.get('fechaInicio', None)
-        fecha_fin = data.get('fechaFin', None)
-        sources = data.get('sources', ['scopus', 'crossref', 'scholar'])  # Fuentes seleccionadas
-
-        # Convertir fechas a enteros si son válidas
         try:
-            fecha_inicio = int(fecha_inicio) if fecha_inicio else None
-            fecha_fin = int(fecha_fin) if fecha_fin else None
-        except ValueError:
-            return jsonify({"error": "Las fechas deben ser números válidos"}), 400
-
-        # Ajustar la consulta según el tipo de búsqueda
-        query = busqueda  # Por defecto es búsqueda por título
-        search_type = "title"
-
-        if tipo_busqueda.lower() == "author":
-            search_type = "author"
-        elif tipo_busqueda.lower() == "keywords":
-            search_type = "keywords"
+            tasks = _source_tasks(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Modo streaming opcional: "stream": "ndjson" | "sse" (o cabecera Accept: text/event-stream)
+        stream_mode = data.get('stream')
+        if stream_mode is True:
+            stream_mode = "ndjson"
+        if not stream_mode and request.accept_mimetypes.best == "text/event-stream":
+            stream_mode = "sse"
+        if stream_mode in ("ndjson", "sse"):
+            return _stream_search(tasks, stream_mode)
 
         results = {"scopus": [], "crossref": [], "scholar": []}  # Diccionario con listas separadas
+        if "local" in tasks:
+            results["local"] = []
 
-        for source in sources:
-            if source in ['scopus', 'crossref', 'scholar']:
-                articles = lit_study.search_and_rank(query=query, source=source, search_type=search_type) or []
-                print(f"Articulos para {source}:",articles)
-
-                filtered_articles = []  # Lista específica para cada fuente
-
-                for article in articles:
-                    pub_year = None
-                    title = 'Sin título'
-                    author_names = 'Sin autores'
-                    citation_count = 0
-                    keywords = 'No disponibles'
-                    h_index_info = {}
-
-                    if source == "scopus":
-                        if isinstance(article, dict) and "article" in article:
-                            article_obj = article["article"]
-
-                            # Extraer datos del artículo
-                            title = getattr(article_obj, 'title', 'Sin título')
-                            author_names = getattr(article_obj, 'author_names', 'Sin autores')
-                            citation_count = getattr(article_obj, 'citedby_count', 0)
-                            keywords = getattr(article_obj, 'authkeywords', 'No disponibles')
-                            journal_h_index = [
-                                {"year": getattr(entry, "year", "Desconocido"), "citescore": getattr(entry, "citescore", "No disponible")}
-                                for entry in (article.get("journal_h_index") or []) if entry is not None
-                            ]
-
-                            scimago_rank = article.get('scimago_rank', 'No disponibles')
-                            snip = article.get('snip', 'No disponibles')
-                            doi = getattr(article_obj, 'doi', 'No disponibles')
-
-                            # Extraer el año de publicación de 'coverDate'
-                            cover_date = getattr(article_obj, 'coverDate', None)
-                            if cover_date:  # Verificar si existe
-                                try:
-                                    if len(cover_date) == 4:  # Ejemplo: "2023"
-                                        pub_year = int(cover_date)
-                                    elif len(cover_date) == 7:  # Ejemplo: "2023-05"
-                                        pub_year = int(cover_date[:4])
-                                    else:  # Ejemplo: "2023-05-15"
-                                        pub_year = int(cover_date[:4])  # Extraer solo el año
-                                except ValueError:
-                                    pub_year = None  # Si el formato es incorrecto, asignar None
-                            else:
-                                pub_year = None  # Si no existe, asignar None
-
-                            # 🔹 Obtener lista de IDs y nombres de autores
-                        author_names_list = author_names.split(";") if author_names else []
-                        author_ids_list = getattr(article_obj, "author_ids", "").split(";") if getattr(article_obj, "author_ids", None) else []
-
-                        # 🔥 Diccionario para almacenar { author_id: { name, h_index } }
-                        author_data = {}
-
-                        # 🔹 Asegurar que los IDs correspondan con los nombres en orden
-                        for idx, author_name in enumerate(author_names_list):
-                            author_name = author_name.strip()
-                            author_id = author_ids_list[idx] if idx < len(author_ids_list) else None
-
-                            # Si hay un ID, obtenemos el H-Index
-                            if author_id:
-                                try:
-                                    author = AuthorRetrieval(author_id)
-                                    h_index = author.h_index
-                                except Exception:
-                                    h_index = "No disponible"
-
-                                # Guardamos en el diccionario con el formato { author_id: { name, h_index } }
-                                author_data[author_id] = {
-                                    "name": author_name,
-                                    "h_index": h_index
-                                }
-
-
-                            # Agregar artículo filtrado a la lista de Scopus
-                            if title != 'Sin título' and author_names != 'Sin autores':
-                                filtered_articles.append({
-                                    "title": title,
-                                    "citation_count": citation_count,
-                                    "publication_year": pub_year or "Desconocido",
-                                    "authors": author_data,
-                                    "h_index": h_index_info,
-                                    "keywords": keywords,
-                                    "journal_h_index": journal_h_index,
-                                    "scimago_rank": scimago_rank,
-                                    "doi": doi,
-                                    "snip": snip,
-                                    "source": "scopus"
-                                })
-
-                    elif source == "crossref":
-                        # Llamamos a la función search_crossref para obtener los artículos de CrossRef
-                        docs = search_crossref(query=query, limit=10, session=None)
-
-                        # Filtramos los artículos obtenidos de CrossRef
-                        for doc in docs:
-                            if isinstance(doc, CrossRefDocument):  # Verificamos que el artículo sea un objeto CrossRefDocument
-                                title = doc.title
-                                doi = doc.id.doi  # Accedemos al DOI
-
-                                # Extraer fecha de publicación
-                                pub_date = doc.publication_date
-                                pub_year = pub_date.year if pub_date else "Desconocido"
-
-                                # Acceder a los autores, reemplazando valores None por "Autor desconocido"
-                                authors = [author.name if author.name else "Autor desconocido" for author in doc.authors] if doc.authors else ["Autor desconocido"]
-                                authors_str = ", ".join(authors)  # Convertimos la lista en un string separado por comas
-
-                                # Agregar el artículo procesado a la lista filtrada
-                                filtered_articles.append({
-                                    "title": title,
-                                    "citation_count": doc.citation_count if doc.citation_count else 0,
-                                    "publication_year": pub_year,
-                                    "authors": authors_str,
-                                    "doi": doi,
-                                    "source": "crossref"
-                                })
-
-                    
-                    elif source == "scholar":
-                        print("Bienvenido a scholar......")
-                        scholar_articles = lit_study.get_scholar_articles(query=query, search_type=search_type, limit=10)
-                        print("Scholar articles:", scholar_articles)
-                        filtered_articles = []
-
-                        for article in scholar_articles:
-                            title = article.get("title", "Sin título")
-                            link = article.get("link", "No disponible")
-                            authors = ", ".join([author["name"] for author in article.get("authors", []) if isinstance(author, dict)] or ["Sin autores"])
-                            
-                            # Extraer h-index como un diccionario { "Autor1": h_index1, "Autor2": h_index2 }
-                            h_index_dict = article.get("h_index", {})
-                            citations = article.get("citations", 0)
-                            pub_year = int(article.get("year")) if article.get("year") else "Desconocido"
-                            author_id = article.get("author_id","")
-
-                            # ✅ Extraer keywords con verificación de tipo
-                            keywords_list = []
-                            for entry in article.get("keywords", []):
-                                if isinstance(entry, dict):  # 🔥 Verifica que entry sea un diccionario antes de usar `.get()`
-                                    keywords_list.extend(entry.get("keywords", []))  # 🔥 Extrae las keywords si existen
-
-                            filtered_articles.append({
-                                "title": title,
-                                "citation_count": citations,
-                                "publication_year": pub_year,
-                                "authors": authors,
-                                "h_index": h_index_dict,
-                                "keywords": keywords_list if keywords_list else ["No disponible"],  # Si está vacío, mostrar "No disponible"
-                                "link": link,
-                                "author_id": author_id,
-                                "source": "scholar"
-                            })
-
-
-
-                # Filtrar artículos por fecha si corresponde
-                final_articles = [
-                    article for article in filtered_articles 
-                    if isinstance(article["publication_year"], int)
-                    and ((not fecha_inicio or article["publication_year"] >= fecha_inicio) 
-                        and (not fecha_fin or article["publication_year"] <= fecha_fin))
-                ]
-
-                # Guardar artículos en la lista correspondiente
-                results[source] = final_articles  
+        # Consultar todas las fuentes en paralelo; una fuente lenta o con error
+        # no bloquea a las demás y se informa en "errors"
+        found, errors = run_with_timeouts(tasks, timeouts=ajustes.SOURCE_TIMEOUTS)
+        results.update(found)
+        if errors:
+            results["errors"] = errors
 
         return jsonify(results)
 
@@ -323,6 +334,35 @@ def search_and_rank():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/rank_store', methods=['POST'])
+def rank_store():
+    """
+    Ranking de todos los documentos del almacén columnar (volcados de CrossRef
+    y Scopus ingeridos con ``ingesta.py``); el orden se calcula sin consultar las APIs. Admite
+    ``top``, ``fechaInicio``, ``fechaFin`` y ``pesoGrafo`` (PageRank del grafo
+    de referencias del almacén).
+    """
+    data = request.get_json() or {}
+    try:
+        top = int(data.get('top', 100))
+        fecha_inicio = int(data['fechaInicio']) if data.get('fechaInicio') else None
+        fecha_fin = int(data['fechaFin']) if data.get('fechaFin') else None
+        peso_grafo = float(data.get('pesoGrafo') or 0.0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Los parámetros deben ser números válidos"}), 400
+    if top <= 0:
+        return jsonify({"error": "top debe ser un entero positivo"}), 400
+
+    try:
+        articles = lit_study.rank_store(
+            columnar_store, top_k=top, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, delta=peso_grafo
+        )
+        return jsonify({"articles": normalize_results("local", articles), "store": columnar_store.stats()})
+    except Exception as e:
+        print("❌ Error ordenando el almacén columnar:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/get_journal_metrics', methods=['GET'])
 def get_journal_metrics():
     issns = request.args.getlist('issns')
@@ -330,47 +370,145 @@ def get_journal_metrics():
     if not issns:
         return jsonify({"error": "No ISSNs provided"}), 400
 
-    all_info = [get_journal_metrics_single(issn) for issn in issns if issn]
+    # Todos los ISSN en una sola consulta en bloque (cada uno se pide una vez)
+    return jsonify(get_journal_metrics_many(issns))
 
-    return jsonify(all_info)
+GRAPH_FORMATS = ("html", "json")
 
-@app.route('/generate_citation_graph', methods=['POST'])
-def generate_citation_graph():
+
+def _graph_params(data):
     """
-    Endpoint para generar el grafo de citas y devolverlo como HTML interactivo.
+    Valida los parámetros del grafo de citas. Lanza ``ValueError`` si no son válidos.
     """
-    data = request.get_json()
     query = data.get('query', '')
-    source = data.get('source', 'scopus')  # ⬅️ Por defecto, usa Scopus si no se especifica
+    source = data.get('source', 'scopus').lower()  # ⬅️ Por defecto, usa Scopus si no se especifica
     limit = int(data.get('limit', 4))  # Limita la cantidad de referencias
 
     if not query:
-        return jsonify({"status": "error", "message": "No se proporcionó una consulta"}), 400
+        raise ValueError("No se proporcionó una consulta")
+    if source not in ("scopus", "crossref"):
+        raise ValueError(f"Fuente desconocida: {source}")
+
+    # Rastreo multinivel: profundidad, dirección y límites del recorrido
+    depth = int(data.get('depth', 1))
+    direction = data.get('direction', 'references')
+    if not 1 <= depth <= ajustes.CRAWL_MAX_DEPTH:
+        raise ValueError(f"La profundidad debe estar entre 1 y {ajustes.CRAWL_MAX_DEPTH}")
+    if direction not in CRAWL_DIRECTIONS:
+        raise ValueError(f"Dirección desconocida: {direction}")
+
+    # Formato de la respuesta: HTML de pyvis en base64 o nodos/aristas en JSON
+    graph_format = data.get('format', 'html')
+    if graph_format not in GRAPH_FORMATS:
+        raise ValueError(f"Formato desconocido: {graph_format}")
+
+    # Disposición: "server" (posiciones calculadas aquí), "browser" (físicas en el navegador) o automática
+    layout = data.get('layout')
+    if layout not in (None, "server", "browser"):
+        raise ValueError(f"Disposición desconocida: {layout}")
+
+    return {
+        "query": query, "source": source, "limit": limit,
+        "depth": depth, "direction": direction,
+        "format": graph_format,
+        "layout": layout,
+        "max_nodes": int(data.get('max_nodes', ajustes.CRAWL_MAX_NODES)),
+        "fan_out": int(data.get('fan_out', ajustes.CRAWL_FAN_OUT)),
+    }
+
+
+def _citation_graph(params, progress=None):
+    """
+    Busca los documentos y sus referencias y construye el grafo de citas.
+    Devuelve ``None`` si no se encontraron documentos.
+    """
+    query, source, limit = params["query"], params["source"], params["limit"]
+    print(f"📖 Buscando referencias en {source} para:", query)
 
-    try:
-        full_query = f"{query}"
-        print("Buscando referencias para:", full_query)
-        print(f"📖 Buscando referencias en {source} para:", query)
-
-        # 🚀 Elegir la función correcta según la fuente
-        if source.lower() == "scopus":
-            documents = get_refs_scopus(query, limit=limit) or []
-        elif source.lower() == "crossref":
-            documents = get_refs_crossref(query, limit=limit) or []
-        else:
-            return jsonify({"status": "error", "message": f"Fuente desconocida: {source}"}), 400
+    if progress:
+        progress(0, 3, "Buscando documentos")
 
-        if not documents:
-            return jsonify({"status": "error", "message": "No se encontraron documentos"}), 404
+    # 🚀 Elegir la función correcta según la fuente
+    if source == "scopus":
+        documents = get_refs_scopus(query, limit=limit) or []
+    else:
+        documents = get_refs_crossref(query, limit=limit) or []
+
+    if not isinstance(documents, list) or not documents:
+        return None
 
-        if not isinstance(documents, list) or not documents:
+    if params["depth"] > 1 or params["direction"] != "references":
+        if progress:
+            progress(1, 3, "Rastreando citas")
+        documents = crawl_citations(
+            documents, source,
+            depth=params["depth"], direction=params["direction"],
+            max_nodes=params["max_nodes"], fan_out=params["fan_out"],
+        )
+
+    if progress:
+        progress(1, 3, "Resolviendo referencias")
+
+    # Crear el grafo de citas
+    G = build_citation_graph(documents, source=source)
+
+    if progress:
+        progress(2, 3, "Dibujando el grafo")
+    return G
+
+
+def _graph_positions(G, params):
+    """
+    Posiciones de los nodos calculadas en el servidor (en caché por versión
+    del grafo), o ``None`` si el grafo se dispone en el navegador.
+    """
+    if not wants_server_layout(G, params.get("layout")):
+        return None
+    return get_layout(G)
+
+
+def _citation_graph_job(params, job):
+    G = _citation_graph(params, job.report)
+    if G is None:
+        raise ValueError("No se encontraron documentos")
+    positions = _graph_positions(G, params)
+    if params["format"] == "json":
+        graph = graph_to_json(G, positions)
+        return json.dumps(graph, ensure_ascii=False).encode("utf-8"), "application/json", "citation_graph.json"
+    return render_citation_graph_html(G, positions).encode("utf-8"), "text/html", "citation_graph.html"
+
+
+@app.route('/generate_citation_graph', methods=['POST'])
+def generate_citation_graph():
+    """
+    Endpoint para generar el grafo de citas y devolverlo como HTML interactivo.
+
+    Con ``depth`` > 1 se rastrean también las referencias de las referencias
+    (y/o los trabajos citantes con ``direction``: "citing" o "both"), limitado
+    por ``max_nodes`` y ``fan_out``. Para grafos grandes conviene usar /jobs/citation_graph.
+
+    Con ``"format": "json"`` devuelve solo los nodos y aristas (formato de
+    vis-network) para dibujarlos en el front con /lib/vis-9.1.2.
+
+    Con ``"layout": "server"`` (o automáticamente en grafos grandes) las
+    posiciones de los nodos se calculan aquí y se envían con las físicas desactivadas.
+    """
+    try:
+        params = _graph_params(request.get_json())
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        G = _citation_graph(params)
+        if G is None:
             return jsonify({"status": "error", "message": "No se encontraron documentos"}), 404
 
-        # Crear el grafo de citas
-        G = build_citation_graph(documents, source=source)
+        positions = _graph_positions(G, params)
+        if params["format"] == "json":
+            return jsonify({"status": "success", "graph": graph_to_json(G, positions)})
 
         # Convertir el grafo a HTML interactivo en base64
-        citation_graph_base64 = plot_citation_graph(G)
+        citation_graph_base64 = plot_citation_graph(G, positions)
 
         return jsonify({"status": "success", "graph_html": citation_graph_base64})
 
@@ -378,13 +516,113 @@ def generate_citation_graph():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route('/citation_analytics', methods=['POST'])
+def citation_analytics():
+    """
+    Métricas del grafo de citas con matrices dispersas: PageRank, grado de
+    entrada, co-citación y acoplamiento bibliográfico.
+
+    Con ``"scope": "store"`` se analiza todo el almacén persistente del grafo y
+    con ``"scope": "columnar"`` el de los volcados ingeridos; si no, se construye el grafo con los mismos parámetros que
+    /generate_citation_graph. ``top`` limita las listas de mejores nodos y
+    pares, y ``"full": true`` incluye el PageRank y el grado de todos los nodos.
+    """
+    data = request.get_json() or {}
+    try:
+        top = int(data.get('top', 20))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "top debe ser un número válido"}), 400
+    if top <= 0:
+        return jsonify({"status": "error", "message": "top debe ser un entero positivo"}), 400
+
+    try:
+        if data.get('scope') == 'store':
+            result = analyze_store(top)
+        elif data.get('scope') == 'columnar':
+            result = analyze_columnar(columnar_store, top)
+        else:
+            try:
+                params = _graph_params(data)
+            except ValueError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+
+            G = _citation_graph(params)
+            if G is None:
+                return jsonify({"status": "error", "message": "No se encontraron documentos"}), 404
+            result = analyze_graph(G, top)
+
+        if not data.get('full'):
+            result = {key: value for key, value in result.items() if key not in ("pagerank", "in_degree")}
+        return jsonify({"status": "success", "analytics": result})
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+JOB_KINDS = {
+    "report": (_report_params, _report_job),
+    "citation_graph": (_graph_params, _citation_graph_job),
+}
+
+
+@app.route('/jobs/<kind>', methods=['POST'])
+def submit_job(kind):
+    """
+    Encola un informe ("report") o un grafo de citas ("citation_graph") y
+    devuelve el identificador del trabajo. Acepta el mismo cuerpo que
+    /generate_report y /generate_citation_graph.
+    """
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"Tipo de trabajo desconocido: {kind}"}), 404
+
+    parse_params, run = JOB_KINDS[kind]
+    try:
+        params = parse_params(request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = job_queue.submit(kind, params, run)
+    return jsonify(job.to_dict()), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Devuelve el estado y el progreso de un trabajo.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Devuelve el resultado (CSV o HTML) de un trabajo terminado.
+    """
+    job = job_queue.get(job_id, with_result=True)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if job.status == ERROR:
+        return jsonify({"error": job.error}), 500
+    if job.status != DONE:
+        return jsonify(job.to_dict()), 409
+
+    return send_file(
+        io.BytesIO(job.result),
+        mimetype=job.mimetype,
+        as_attachment=job.mimetype == "text/csv",
+        download_name=job.filename,
+    )
+
 
 def get_article_details_scopus(doi):
     """Obtiene los detalles de un artículo desde Scopus."""
     url = f"{SCOPUS_BASE_URL}/article/doi/{doi}"
-    response = requests.get(url, headers=SCOPUS_HEADERS)
-    if response.status_code == 200:
-        return response.json().get("full-text-retrieval-response", {}).get("coredata", {})
+    data = http_get_json(url, headers=SCOPUS_HEADERS, endpoint="abstract_retrieval")
+    if data is not None:
+        return data.get("full-text-retrieval-response", {}).get("coredata", {})
     return None
 
 
@@ -392,34 +630,78 @@ def get_cited_by_scopus(doi):
     """Obtiene los artículos que citan un DOI desde Scopus."""
     url = f"{SCOPUS_BASE_URL}/search/scopus"
     params = {"query": f"REF({doi})", "field": "dc:identifier,dc:title,dc:creator", "count": 200}
-    response = requests.get(url, headers=SCOPUS_HEADERS, params=params)
-    if response.status_code == 200:
-        return response.json().get("search-results", {}).get("entry", [])
+    data = http_get_json(url, params=params, headers=SCOPUS_HEADERS, endpoint="scopus_search")
+    if data is not None:
+        return data.get("search-results", {}).get("entry", [])
     return []
 
 
 def get_article_details_crossref(doi):
     """Obtiene los detalles del artículo desde CrossRef a través de la API."""
-    url = f"https://api.crossref.org/works/{doi}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()["message"]
-    else:
-        return None
+    return crossref_work(doi)
 
 def get_cited_by_crossref(doi):
     """Obtiene los artículos que citan un artículo desde CrossRef."""
     url = f"https://api.crossref.org/works/{doi}/citations"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()["message"]["items"]
+    data = http_get_json(url, endpoint="crossref_work")
+    if data is not None:
+        return data["message"]["items"]
     else:
         return []
 
 
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """
+    Devuelve los aciertos/fallos y el tamaño de la caché de respuestas por endpoint.
+    """
+    return jsonify(response_cache.stats())
+
+
+@app.route('/rate_limits', methods=['GET'])
+def rate_limits():
+    """
+    Devuelve el estado de los limitadores de cada API (turnos, tasa y cuota restante).
+    """
+    return jsonify(rate_limiter.stats())
+
+
+@app.route('/mirror_stats', methods=['GET'])
+def mirror_stats():
+    """
+    Devuelve el número de registros y consultas (vigentes) del espejo local.
+    """
+    return jsonify(local_mirror.stats())
+
+
+@app.route('/author_index_stats', methods=['GET'])
+def author_index_stats():
+    """
+    Devuelve el número de autores y variantes de nombre del índice local de autores.
+    """
+    return jsonify(author_index.stats())
+
+
+@app.route('/graph_store_stats', methods=['GET'])
+def graph_store_stats():
+    """
+    Devuelve el número de nodos, aristas y documentos resueltos del almacén del
+    grafo de citas, y el tamaño del índice de identidades.
+    """
+    return jsonify({**citation_store.stats(), "identities": identity_index.stats()})
+
+
 @app.route('/')
 def serve_react():
     return send_from_directory('../frontend/build', 'index.html')
 
+
+@app.route('/lib/<path:filename>')
+def serve_lib(filename):
+    """
+    Sirve las librerías de ``lib/`` (vis-network) para dibujar el grafo en formato JSON.
+    """
+    return send_from_directory('lib', filename)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,303 @@
+"""
+Benchmarks del backend sin depender de Scopus, CrossRef ni SerpApi.
+
+Las APIs se sustituyen por ``sustituto.py`` (respuestas grabadas o, si no hay
+grabación, sintéticas) y cada benchmark se repite con las cachés vacías. Para
+cada uno se informa de la latencia (p50/p95/p99), las llamadas a cada API por
+iteración y el pico de memoria (``tracemalloc``, en una ejecución aparte).
+
+Uso (desde ``back-flask``):
+    python -m benchmarks.ejecutar
+    python -m benchmarks.ejecutar --solo rank_articles --iteraciones 10
+    python -m benchmarks.ejecutar --json actual.json --comparar base.json
+    python -m benchmarks.ejecutar --grabar      # graba las respuestas reales (necesita las claves)
+
+Con ``--comparar`` se marcan las regresiones (p50 o llamadas por encima de la
+base más el umbral) y el comando termina con código 1 si hay alguna.
+
+El repositorio no incluye ninguna grabación (grabar necesita las claves de las
+APIs). Mientras no exista ``fixtures/grabacion.json.gz``, todas las respuestas
+son sintéticas: los resultados miden el trabajo del backend con datos
+simulados, no los tiempos ni el tamaño de las respuestas reales. La salida y el
+JSON indican qué parte de las llamadas se respondió desde la grabación.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+
+import numpy as np
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "grabacion.json.gz")
+QUERY = "deep learning citation graphs"
+
+Benchmark = namedtuple("Benchmark", "name run setup")
+
+
+def _prepare_environment(args):
+    """
+    Las bases de datos locales van a un directorio temporal y, al reproducir,
+    los limitadores no frenan (las APIs no se consultan de verdad). Tiene que
+    hacerse antes de importar ``servicios``, que lee los ajustes al cargarse.
+    """
+    os.environ["REFERENCIAS_DATA_DIR"] = args.datos or tempfile.mkdtemp(prefix="benchmarks-")
+    if not args.grabar:
+        for bucket in ("scopus_search", "scopus_retrieval", "crossref", "serpapi", "http"):
+            os.environ[f"RATE_LIMIT_{bucket.upper()}"] = "1000000"
+
+
+def _synthetic_articles(size, seed=0):
+    from ranking.articulo import Article
+
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1950, 2026, size)
+    citations = (rng.pareto(1.2, size) * 3).astype(int)
+    return [
+        Article("crossref", title=f"Artículo {i}", doi=f"10.5555/b{i}", year=int(years[i]), citations=int(citations[i]))
+        for i in range(size)
+    ]
+
+
+def build_benchmarks():
+    from mapas.almacen_grafo import citation_store
+    from mapas.mapa_referencias import build_citation_graph, get_refs_crossref, plot_citation_graph
+    from ranking.espejo import local_mirror
+    from ranking.ranking import lit_study
+    from servicios.cache import response_cache
+
+    def cold():
+        # Cada iteración empieza sin respuestas en caché, sin espejo y sin grafo guardado
+        response_cache.clear()
+        local_mirror.clear()
+        citation_store.clear()
+
+    benchmarks = []
+
+    for source in ("scopus", "crossref", "scholar"):
+        benchmarks.append(Benchmark(
+            f"search_and_rank[{source}]",
+            lambda source=source: lit_study.search_and_rank(QUERY, source, "title", local_first=False),
+            cold,
+        ))
+
+    for size in (10, 1000, 100000):
+        articles = _synthetic_articles(size)
+        benchmarks.append(Benchmark(
+            f"rank_articles[{size}]",
+            lambda articles=articles: lit_study.rank_articles(articles, source="crossref"),
+            None,
+        ))
+
+    for documents in (10, 50, 200):
+        def run(documents=documents):
+            G = build_citation_graph(get_refs_crossref(QUERY, limit=documents), source="crossref")
+            plot_citation_graph(G)
+            return {"nodes": G.number_of_nodes(), "edges": G.number_of_edges()}
+
+        benchmarks.append(Benchmark(f"citation_graph[{documents} docs]", run, cold))
+
+    try:
+        from app import app
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar app.py, se omiten los benchmarks de los endpoints: {e}")
+        return benchmarks
+
+    client = app.test_client()
+
+    def post(path, body):
+        response = client.post(path, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} respondió {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return {"bytes": len(response.get_data())}
+
+    benchmarks.append(Benchmark(
+        "endpoint /search_and_rank",
+        lambda: post("/search_and_rank", {
+            "busqueda": QUERY, "tipoBusqueda": "title", "sources": ["scopus", "crossref", "scholar"], "localFirst": False,
+        }),
+        cold,
+    ))
+    for source, graph_format in (("crossref", "json"), ("scopus", "html")):
+        benchmarks.append(Benchmark(
+            f"endpoint /generate_citation_graph[{source}, {graph_format}]",
+            lambda source=source, graph_format=graph_format: post("/generate_citation_graph", {
+                "query": QUERY, "source": source, "limit": 20, "format": graph_format,
+            }),
+            cold,
+        ))
+    return benchmarks
+
+
+def measure(benchmark, stand_in, iterations, warmup=1, memory=True):
+    """
+    Ejecuta un benchmark y devuelve sus métricas.
+    """
+    for _ in range(warmup):
+        if benchmark.setup:
+            benchmark.setup()
+        benchmark.run()
+
+    latencies, calls, recorded, info = [], Counter(), Counter(), None
+    for _ in range(iterations):
+        if benchmark.setup:
+            benchmark.setup()
+        before, before_recorded = stand_in.snapshot(), stand_in.snapshot(replayed=True)
+        start = time.perf_counter()
+        info = benchmark.run()
+        latencies.append((time.perf_counter() - start) * 1000)
+        calls.update(stand_in.snapshot() - before)
+        recorded.update(stand_in.snapshot(replayed=True) - before_recorded)
+
+    peak = None
+    if memory:
+        if benchmark.setup:
+            benchmark.setup()
+        tracemalloc.start()
+        benchmark.run()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "name": benchmark.name,
+        "iterations": iterations,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(np.mean(latencies)), 2),
+        "upstream_calls": round(sum(calls.values()) / iterations, 1),
+        "recorded_calls": round(sum(recorded.values()) / iterations, 1),
+        "upstream_detail": {name: round(count / iterations, 1) for name, count in sorted(calls.items())},
+        "peak_memory_mb": round(peak, 1) if peak is not None else None,
+        "info": info if isinstance(info, dict) else None,
+    }
+
+
+def print_results(results):
+    header = f"{'benchmark':<48} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'llamadas':>9} {'memoria MB':>11}"
+    print("\n" + header)
+    print("-" * len(header))
+    for result in results:
+        memory = "-" if result["peak_memory_mb"] is None else f"{result['peak_memory_mb']:.1f}"
+        print(
+            f"{result['name']:<48} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['p99_ms']:>10.1f} "
+            f"{result['upstream_calls']:>9.1f} {memory:>11}"
+        )
+        if result["upstream_detail"]:
+            print("    " + ", ".join(f"{name}: {count}" for name, count in result["upstream_detail"].items()))
+
+    total = sum(result["upstream_calls"] for result in results)
+    recorded = sum(result["recorded_calls"] for result in results)
+    print(f"\nLlamadas a las APIs por iteración: {recorded:.1f} desde la grabación, {total - recorded:.1f} sintéticas")
+
+
+def data_kind(results):
+    """
+    "grabadas", "sintéticas" o "mixtas" según de dónde salieron las respuestas.
+    """
+    total = sum(result["upstream_calls"] for result in results)
+    recorded = sum(result.get("recorded_calls", 0) for result in results)
+    if recorded == 0:
+        return "sintéticas"
+    return "grabadas" if recorded == total else "mixtas"
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Compara con una ejecución anterior y devuelve el número de regresiones.
+    """
+    with open(baseline_path, encoding="utf-8") as handle:
+        saved = json.load(handle)
+    baseline = {result["name"]: result for result in saved["results"]}
+    if saved.get("data", "sintéticas") != data_kind(results):
+        print(f"⚠️ La base usó respuestas {saved.get('data', 'sintéticas')} y esta ejecución {data_kind(results)}")
+
+    regressions = 0
+    print(f"\nComparación con {baseline_path} (umbral {threshold:.0%}):")
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is None:
+            print(f"  {result['name']}: sin referencia")
+            continue
+        change = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"] if base["p50_ms"] else 0.0
+        calls = result["upstream_calls"] - base["upstream_calls"]
+        if change > threshold or calls > 0:
+            regressions += 1
+            status = "⚠️ regresión"
+        elif change < -threshold or calls < 0:
+            status = "✅ mejora"
+        else:
+            status = "= igual"
+        print(f"  {status:<13} {result['name']}: p50 {change:+.1%}, llamadas {calls:+.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del backend con las APIs externas sustituidas.")
+    parser.add_argument("--solo", action="append", help="ejecuta solo los benchmarks que empiezan por este nombre")
+    parser.add_argument("--iteraciones", type=int, default=5)
+    parser.add_argument("--calentamiento", type=int, default=1, help="ejecuciones previas que no se miden")
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir el pico de memoria")
+    parser.add_argument("--latencia", type=float, default=0.0, help="espera simulada por llamada a una API (ms)")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH, help="fichero de respuestas grabadas")
+    parser.add_argument("--sin-sinteticas", action="store_true", help="fallar si una petición no está grabada")
+    parser.add_argument("--grabar", action="store_true", help="consultar las APIs reales y grabar sus respuestas")
+    parser.add_argument("--datos", help="directorio para las bases de datos locales (por defecto, uno temporal)")
+    parser.add_argument("--json", help="guardar los resultados en este fichero")
+    parser.add_argument("--comparar", help="resultados anteriores con los que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="cambio relativo de p50 que cuenta como regresión")
+    args = parser.parse_args()
+
+    _prepare_environment(args)
+    from benchmarks.sustituto import UpstreamStandIn
+
+    stand_in = UpstreamStandIn(
+        args.fixtures, record=args.grabar, synthetic=not args.sin_sinteticas, latency=args.latencia / 1000,
+    ).install()
+    if args.grabar:
+        print(f"🧪 Grabando respuestas en {args.fixtures}")
+    elif stand_in.responses:
+        print(f"🧪 Reproduciendo {len(stand_in.responses)} respuestas grabadas (las que falten serán sintéticas)")
+    else:
+        print(f"⚠️ No hay grabación en {args.fixtures}: todas las respuestas serán sintéticas")
+
+    benchmarks = build_benchmarks()
+    if args.solo:
+        benchmarks = [b for b in benchmarks if any(b.name.startswith(prefix) for prefix in args.solo)]
+
+    results = []
+    try:
+        for benchmark in benchmarks:
+            print(f"⏱️ {benchmark.name}")
+            if args.grabar:
+                results.append(measure(benchmark, stand_in, 1, warmup=0, memory=False))
+            else:
+                results.append(measure(
+                    benchmark, stand_in, args.iteraciones, args.calentamiento, memory=not args.sin_memoria,
+                ))
+    finally:
+        stand_in.uninstall()
+
+    if args.grabar:
+        print(f"💾 {stand_in.save()} respuestas grabadas en {args.fixtures}")
+
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "data": data_kind(results), "results": results},
+                handle, indent=2, ensure_ascii=False,
+            )
+
+    if args.comparar and compare(results, args.comparar, args.umbral):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
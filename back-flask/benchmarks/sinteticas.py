@@ -0,0 +1,241 @@
+"""
+Respuestas sintéticas de las APIs externas para los benchmarks.
+
+Cuando una petición no está en las grabaciones, el sustituto (``sustituto.py``)
+genera aquí una respuesta con el mismo formato que la API real: búsquedas de
+Scopus paginadas, ``/works`` de CrossRef con cursores, perfiles de autor,
+revistas, documentos con referencias y resultados de SerpApi. Todo es
+determinista (la semilla sale de la propia petición), así que dos ejecuciones
+del mismo benchmark hacen exactamente el mismo trabajo.
+"""
+import json
+import random
+import zlib
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+
+# Tamaño de los resultados simulados
+SCOPUS_TOTAL = 500
+CROSSREF_TOTAL = 1000
+REFERENCES_PER_DOCUMENT = 15
+# Las referencias salen de un conjunto común para que los grafos compartan nodos
+REFERENCE_POOL = 5000
+ISSN_POOL = 40
+
+SURNAMES = ("García", "Smith", "Müller", "Rossi", "Tanaka", "Silva", "Novak", "Kowalski", "Dubois", "Chen")
+GIVEN_NAMES = ("Ana", "John", "Lena", "Marco", "Yuki", "Paulo", "Eva", "Jan", "Claire", "Wei")
+WORDS = ("learning", "graph", "citation", "network", "analysis", "deep", "model", "data", "ranking", "systems")
+
+
+def _rng(*parts):
+    return random.Random(zlib.crc32(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")))
+
+
+def _title(rng, query=""):
+    words = [word for word in str(query).replace('"', " ").split() if word.isalpha()][:3]
+    return " ".join(words + rng.sample(WORDS, 4)).capitalize()
+
+
+def _issn(n):
+    return f"{1000 + n % ISSN_POOL:04d}-{5000 + n % ISSN_POOL:04d}"
+
+
+# --- HTTP (requests) ---
+
+def _scopus_entry(rng, query, n):
+    authors = [
+        {"authid": str(7000000 + rng.randrange(20000)), "surname": rng.choice(SURNAMES),
+         "given-name": rng.choice(GIVEN_NAMES), "afid": [{"$": str(60000000 + rng.randrange(50))}]}
+        for _ in range(rng.randint(1, 4))
+    ]
+    return {
+        "eid": f"2-s2.0-{85000000000 + n}",
+        "prism:doi": f"10.5555/s{n}",
+        "dc:title": _title(rng, query),
+        "dc:creator": f"{authors[0]['surname']} {authors[0]['given-name'][0]}.",
+        "prism:coverDate": f"{rng.randint(1990, 2024)}-0{rng.randint(1, 9)}-01",
+        "prism:publicationName": f"Journal {n % ISSN_POOL}",
+        "prism:issn": _issn(n).replace("-", ""),
+        "citedby-count": str(int(rng.paretovariate(1.2) * 3)),
+        "author": authors,
+        "affiliation": [{"afid": author["afid"][0]["$"], "affilname": "Universidad"} for author in authors],
+        "authkeywords": " | ".join(rng.sample(WORDS, 3)),
+    }
+
+
+def _scopus_search(params):
+    query = params.get("query", "")
+    start, count = int(params.get("start", 0)), int(params.get("count", 25))
+    base = zlib.crc32(query.encode("utf-8")) % 100000 * 1000
+    entries = [
+        _scopus_entry(_rng("scopus", query, n), query, base + n)
+        for n in range(start, min(start + count, SCOPUS_TOTAL))
+    ]
+    return {"search-results": {"opensearch:totalResults": str(SCOPUS_TOTAL), "entry": entries}}
+
+
+def _crossref_reference(rng):
+    k = rng.randrange(REFERENCE_POOL)
+    return {
+        "key": f"ref{k}", "DOI": f"10.5555/r{k}", "article-title": f"Reference {k}",
+        "year": str(1980 + k % 40), "journal-title": f"Journal {k % ISSN_POOL}",
+    }
+
+
+def _crossref_item(rng, query, doi):
+    return {
+        "DOI": doi,
+        "title": [_title(rng, query)],
+        "author": [{"given": rng.choice(GIVEN_NAMES), "family": rng.choice(SURNAMES)} for _ in range(rng.randint(1, 4))],
+        "issued": {"date-parts": [[rng.randint(1990, 2024), rng.randint(1, 12)]]},
+        "is-referenced-by-count": int(rng.paretovariate(1.2) * 3),
+        "container-title": [f"Journal {zlib.crc32(doi.encode()) % ISSN_POOL}"],
+        "ISSN": [_issn(zlib.crc32(doi.encode()))],
+        "publisher": "Editorial",
+        "reference": [_crossref_reference(rng) for _ in range(REFERENCES_PER_DOCUMENT)],
+    }
+
+
+def _crossref_works(params):
+    query = params.get("query", "")
+    rows = int(params.get("rows", 20))
+    cursor = params.get("cursor", "*")
+    offset = 0 if cursor == "*" else int(cursor[1:])
+    base = zlib.crc32(query.encode("utf-8")) % 100000 * 10000
+    items = [
+        _crossref_item(_rng("crossref", query, n), query, f"10.5555/c{base + n}")
+        for n in range(offset, min(offset + rows, CROSSREF_TOTAL))
+    ]
+    next_cursor = f"c{offset + rows}" if offset + rows < CROSSREF_TOTAL else None
+    return {"status": "ok", "message": {"total-results": CROSSREF_TOTAL, "items": items, "next-cursor": next_cursor}}
+
+
+def http_response(method, url, params):
+    """
+    Devuelve ``(estado, cabeceras, cuerpo)`` para una petición HTTP.
+    """
+    parsed = urlparse(url)
+    if parsed.netloc == "api.elsevier.com" and parsed.path.startswith("/content/search/scopus"):
+        body = _scopus_search(params)
+    elif parsed.netloc == "api.crossref.org" and parsed.path.rstrip("/") == "/works":
+        body = _crossref_works(params)
+    elif parsed.netloc == "api.crossref.org" and parsed.path.startswith("/works/"):
+        doi = parsed.path[len("/works/"):]
+        body = {"status": "ok", "message": _crossref_item(_rng("work", doi), "", doi)}
+    else:
+        return 404, {}, b"{}"
+    return 200, {"Content-Type": "application/json"}, json.dumps(body).encode("utf-8")
+
+
+# --- pybliometrics y SerpApi ---
+
+def _author_retrieval(author_id, **kwargs):
+    rng = _rng("author", author_id)
+    return SimpleNamespace(
+        given_name=rng.choice(GIVEN_NAMES), surname=rng.choice(SURNAMES),
+        h_index=rng.randint(1, 60), cited_by_count=rng.randint(10, 20000),
+    )
+
+
+def _serial_title(issn, **kwargs):
+    rng = _rng("serial", issn)
+    return SimpleNamespace(
+        title=f"Journal {issn}", publisher="Editorial",
+        sjrlist=[("2023", round(rng.uniform(0.1, 5), 3))],
+        sniplist=[("2023", round(rng.uniform(0.1, 3), 3))],
+        citescoreyearinfolist=[("2023", round(rng.uniform(0.5, 15), 1))],
+    )
+
+
+def _abstract_retrieval(identifier, view="META_ABS", **kwargs):
+    rng = _rng("abstract", identifier)
+    identifier = str(identifier)
+    is_doi = not (identifier.startswith("2-s2.0-") or identifier.isdigit())
+    # Las referencias del conjunto común enlazan su DOI con el mismo Scopus ID que en las listas REF
+    n = int(identifier[len("10.5555/r"):]) if identifier.startswith("10.5555/r") else zlib.crc32(identifier.encode())
+    references = []
+    if view == "REF":
+        for _ in range(REFERENCES_PER_DOCUMENT):
+            k = rng.randrange(REFERENCE_POOL)
+            references.append(SimpleNamespace(
+                id=str(84000000000 + k), doi=f"10.5555/r{k}", title=f"Reference {k}",
+                sourcetitle=f"Journal {k % ISSN_POOL}", coverDate=f"{1980 + k % 40}-01-01",
+                authors=f"{SURNAMES[k % len(SURNAMES)]}, {GIVEN_NAMES[k % len(GIVEN_NAMES)][0]}.",
+            ))
+    return SimpleNamespace(
+        coverDate=f"{rng.randint(1990, 2024)}-01-01",
+        citedby_count=int(rng.paretovariate(1.2) * 3),
+        authors=[
+            SimpleNamespace(auid=str(7000000 + rng.randrange(20000)), surname=rng.choice(SURNAMES),
+                            given_name=rng.choice(GIVEN_NAMES))
+            for _ in range(rng.randint(1, 3))
+        ],
+        references=references,
+        doi=identifier if is_doi else None,
+        eid=f"2-s2.0-{84000000000 + n % 10 ** 9}" if is_doi else f"2-s2.0-{identifier.split('-')[-1]}",
+    )
+
+
+def _author_search(query, **kwargs):
+    rng = _rng("author_search", query)
+    return SimpleNamespace(authors=[
+        SimpleNamespace(
+            eid=f"9-s2.0-{7000000 + rng.randrange(20000)}", surname=rng.choice(SURNAMES),
+            givenname=rng.choice(GIVEN_NAMES), affiliation="Universidad", documents=str(rng.randint(1, 200)),
+        )
+        for _ in range(rng.randint(1, 5))
+    ])
+
+
+class SerpApiResult:
+    def __init__(self, data):
+        self.data = data
+
+    def get_dict(self):
+        return self.data
+
+
+def _google_search(params, **kwargs):
+    engine = params.get("engine")
+    rng = _rng("serpapi", {k: v for k, v in params.items() if k != "api_key"})
+    if engine == "google_scholar":
+        results = []
+        for n in range(int(params.get("num", 10))):
+            authors = [
+                {"name": f"{rng.choice(GIVEN_NAMES)[0]} {rng.choice(SURNAMES)}", "author_id": f"sch{rng.randrange(5000)}"}
+                for _ in range(rng.randint(1, 3))
+            ]
+            results.append({
+                "title": _title(rng, params.get("q", "")),
+                "link": f"https://example.org/{rng.randrange(10 ** 9)}",
+                "publication_info": {"authors": authors, "summary": f"Journal - {rng.randint(1990, 2024)} - example.org"},
+                "inline_links": {"cited_by": {"total": int(rng.paretovariate(1.2) * 3)}},
+            })
+        return SerpApiResult({"organic_results": results})
+    if engine == "google_scholar_author":
+        return SerpApiResult({"cited_by": {"table": [{"citations": {"all": 100}}, {"h_index": {"all": rng.randint(1, 60)}}]}})
+    if engine == "google_scholar_profiles":
+        return SerpApiResult({"profiles": [
+            {"name": params.get("mauthors"), "interests": [{"title": word} for word in rng.sample(WORDS, 3)]}
+        ]})
+    return SerpApiResult({"error": f"Motor no simulado: {engine}"})
+
+
+API_RESPONDERS = {
+    "AuthorRetrieval": _author_retrieval,
+    "SerialTitle": _serial_title,
+    "AbstractRetrieval": _abstract_retrieval,
+    "AuthorSearch": _author_search,
+    "GoogleSearch": _google_search,
+}
+
+
+def api_response(name, args, kwargs):
+    """
+    Devuelve el objeto que crearía la clase ``name`` de pybliometrics/SerpApi.
+    """
+    responder = API_RESPONDERS.get(name)
+    if responder is None:
+        raise KeyError(f"API no simulada: {name}")
+    return responder(*args, **kwargs)
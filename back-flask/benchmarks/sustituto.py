@@ -0,0 +1,252 @@
+"""
+Sustituto local de las APIs externas (Scopus, CrossRef y SerpApi) para los benchmarks.
+
+Se engancha en los dos únicos puntos por los que sale el backend a la red:
+
+- ``http_session`` (``servicios.cliente_http``): se monta un adaptador de
+  ``requests`` que responde sin abrir conexiones.
+- ``fuentes.set_api_factory``: los objetos de pybliometrics/SerpApi se crean
+  con una función que devuelve un objeto con los mismos atributos.
+
+En modo grabación las peticiones llegan a las APIs reales y cada respuesta se
+guarda (JSON comprimido, sin las claves de API). En modo reproducción se
+responde desde la grabación y, si una petición no está grabada, con las
+respuestas sintéticas de ``sinteticas.py``. En ambos modos se cuentan las
+llamadas a cada API.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from benchmarks import sinteticas
+from servicios import fuentes
+from servicios.cliente_http import http_session
+
+
+# Parámetros que no forman parte de la clave de una petición (ni se graban)
+SECRET_PARAMS = {"apikey", "apiKey", "api_key"}
+
+# Atributos que leen las funciones de ``fuentes`` de cada objeto de pybliometrics
+RECORDED_ATTRS = {
+    "AuthorRetrieval": ("given_name", "surname", "h_index", "cited_by_count"),
+    "SerialTitle": ("title", "publisher", "sjrlist", "sniplist", "citescoreyearinfolist"),
+    "AbstractRetrieval": ("coverDate", "citedby_count", "authors", "references", "doi", "eid"),
+    "AuthorSearch": ("authors",),
+}
+
+# Cabeceras de las respuestas HTTP que se graban (cuota y tipo de contenido)
+RECORDED_HEADERS = ("content-type", "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset",
+                    "x-rate-limit-limit", "x-rate-limit-interval")
+
+
+class MissingFixture(KeyError):
+    pass
+
+
+def _http_key(method, url):
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    return json.dumps(["http", method.upper(), f"{parts.scheme}://{parts.netloc}{parts.path}", params])
+
+
+def _api_key(name, args, kwargs):
+    if name == "GoogleSearch":
+        args = [{k: v for k, v in args[0].items() if k not in SECRET_PARAMS}]
+    kwargs = {k: v for k, v in kwargs.items() if k != "refresh"}
+    return json.dumps(["api", name, args, kwargs], sort_keys=True, default=str)
+
+
+def _encode(value):
+    """
+    Convierte la respuesta a JSON; los namedtuples de pybliometrics (que no se
+    pueden serializar tal cual) se guardan como registros con sus campos.
+    """
+    if hasattr(value, "_asdict"):
+        return {"__registro__": {k: _encode(v) for k, v in value._asdict().items()}}
+    if isinstance(value, SimpleNamespace):
+        return {"__registro__": {k: _encode(v) for k, v in vars(value).items()}}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+_record_types = {}
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if "__registro__" in value:
+            fields = value["__registro__"]
+            names = tuple(fields)
+            if names not in _record_types:
+                _record_types[names] = namedtuple("Registro", names)
+            return _record_types[names](**{k: _decode(v) for k, v in fields.items()})
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _snapshot(name, result):
+    if name == "GoogleSearch":
+        return _encode(result.get_dict())
+    attrs = {}
+    for attr in RECORDED_ATTRS.get(name, ()):
+        try:
+            attrs[attr] = _encode(getattr(result, attr))
+        except Exception:
+            attrs[attr] = None
+    return attrs
+
+
+def _build_response(request, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class _StandInAdapter(BaseAdapter):
+    def __init__(self, stand_in, real_adapter=None):
+        super().__init__()
+        self.stand_in = stand_in
+        self.real_adapter = real_adapter
+
+    def send(self, request, **kwargs):
+        return self.stand_in.http(request, self.real_adapter, **kwargs)
+
+    def close(self):
+        if self.real_adapter is not None:
+            self.real_adapter.close()
+
+
+class UpstreamStandIn:
+    def __init__(self, fixtures_path, record=False, synthetic=True, latency=0.0):
+        self.fixtures_path = fixtures_path
+        self.record = record
+        self.synthetic = synthetic
+        self.latency = latency
+        self.calls = Counter()
+        self.replayed = Counter()
+        self._lock = threading.Lock()
+        self._original_factory = None
+        self._original_adapters = None
+        self.responses = {}
+        if not record and fixtures_path and os.path.exists(fixtures_path):
+            with gzip.open(fixtures_path, "rt", encoding="utf-8") as handle:
+                self.responses = json.load(handle)["responses"]
+
+    def _count(self, name, replayed):
+        with self._lock:
+            self.calls[name] += 1
+            if replayed:
+                self.replayed[name] += 1
+
+    # --- HTTP ---
+
+    def http(self, request, real_adapter, **kwargs):
+        parts = urlsplit(request.url)
+        name = f"{parts.netloc}{parts.path.rstrip('/')}" if "/works/" not in parts.path else f"{parts.netloc}/works/{{doi}}"
+        key = _http_key(request.method, request.url)
+
+        if self.record:
+            response = real_adapter.send(request, **kwargs)
+            headers = {k: v for k, v in response.headers.items() if k.lower() in RECORDED_HEADERS}
+            with self._lock:
+                self.responses[key] = {"status": response.status_code, "headers": headers, "body": response.text}
+            self._count(name, replayed=False)
+            return response
+
+        if self.latency:
+            time.sleep(self.latency)
+        recorded = self.responses.get(key)
+        if recorded is not None:
+            self._count(name, replayed=True)
+            return _build_response(request, recorded["status"], recorded["headers"], recorded["body"].encode("utf-8"))
+        if not self.synthetic:
+            raise MissingFixture(key)
+        self._count(name, replayed=False)
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        status, headers, body = sinteticas.http_response(request.method, request.url, params)
+        return _build_response(request, status, headers, body)
+
+    # --- pybliometrics / SerpApi ---
+
+    def create(self, api_class, *args, **kwargs):
+        name = api_class.__name__
+        key = _api_key(name, args, kwargs)
+
+        if self.record:
+            result = self._original_factory(api_class, *args, **kwargs)
+            with self._lock:
+                self.responses[key] = _snapshot(name, result)
+            self._count(name, replayed=False)
+            return result
+
+        if self.latency:
+            time.sleep(self.latency)
+        recorded = self.responses.get(key)
+        if recorded is not None:
+            self._count(name, replayed=True)
+            if name == "GoogleSearch":
+                return sinteticas.SerpApiResult(_decode(recorded))
+            return SimpleNamespace(**{attr: _decode(value) for attr, value in recorded.items()})
+        if not self.synthetic:
+            raise MissingFixture(key)
+        self._count(name, replayed=False)
+        return sinteticas.api_response(name, args, kwargs)
+
+    # --- Instalación ---
+
+    def install(self):
+        self._original_adapters = dict(http_session.adapters)
+        for prefix in ("https://", "http://"):
+            http_session.mount(prefix, _StandInAdapter(self, self._original_adapters.get(prefix)))
+        self._original_factory = fuentes.set_api_factory(self.create)
+        return self
+
+    def uninstall(self):
+        if self._original_adapters is not None:
+            http_session.adapters.clear()
+            http_session.adapters.update(self._original_adapters)
+        if self._original_factory is not None:
+            fuentes.set_api_factory(self._original_factory)
+
+    def snapshot(self, replayed=False):
+        """
+        Copia de las llamadas contadas por API (solo las respondidas desde la
+        grabación con ``replayed``).
+        """
+        with self._lock:
+            return Counter(self.replayed if replayed else self.calls)
+
+    def save(self):
+        """
+        Guarda las respuestas grabadas (se combinan con las de una grabación anterior).
+        """
+        responses = {}
+        if os.path.exists(self.fixtures_path):
+            with gzip.open(self.fixtures_path, "rt", encoding="utf-8") as handle:
+                responses = json.load(handle)["responses"]
+        responses.update(self.responses)
+        os.makedirs(os.path.dirname(os.path.abspath(self.fixtures_path)), exist_ok=True)
+        with gzip.open(self.fixtures_path, "wt", encoding="utf-8") as handle:
+            json.dump({"recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"), "responses": responses}, handle)
+        return len(responses)
@@ -0,0 +1,42 @@
+"""
+Ingesta masiva de volcados bibliográficos en el almacén columnar (Parquet).
+
+Uso:
+    python ingesta.py crossref /ruta/snapshot-crossref/
+    python ingesta.py scopus-csv exportacion_scopus.csv
+    python ingesta.py scopus-json resultados_scopus.jsonl --salida datos/columnar
+
+Los ficheros se leen en streaming y se escriben por lotes, así que un volcado
+de millones de registros no se carga nunca entero en memoria. Después, el
+ranking (``/rank_store``) y el análisis del grafo (``/citation_analytics`` con
+``"scope": "columnar"``) trabajan directamente sobre el almacén.
+"""
+import argparse
+import time
+
+from ranking.almacen_columnar import FORMATS, ingest
+from servicios import ajustes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingiere volcados de CrossRef o Scopus en el almacén columnar.")
+    parser.add_argument("formato", choices=FORMATS, help="formato de los ficheros")
+    parser.add_argument("rutas", nargs="+", help="ficheros o directorios a ingerir")
+    parser.add_argument("--salida", default=ajustes.COLUMNAR_PATH, help="directorio del almacén columnar")
+    parser.add_argument("--lote", type=int, default=ajustes.INGEST_BATCH_SIZE, help="filas por grupo de Parquet")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(files, records):
+        print(f"📥 {files} ficheros, {records} documentos ({time.perf_counter() - start:.1f} s)")
+
+    result = ingest(args.rutas, args.formato, args.salida, args.lote, progress)
+    print(
+        f"✅ Ingesta terminada en {time.perf_counter() - start:.1f} s: {result['articles']} documentos, "
+        f"{result['edges']} referencias, {result['skipped']} registros sin DOI ni EID descartados"
+    )
+
+
+if __name__ == "__main__":
+    main()
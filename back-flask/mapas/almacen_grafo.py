@@ -0,0 +1,267 @@
+"""
+Almacén persistente (SQLite) del grafo de citas.
+
+Guarda los documentos y referencias ya resueltos (nodos con sus metadatos) y
+las listas de referencias de cada documento (aristas), indexados por la
+clave canónica del índice de identidades (DOI, EID y Scopus ID son alias). Las peticiones siguientes montan el grafo desde aquí y solo
+consultan las APIs para los nodos que faltan o han caducado.
+"""
+import json
+import time
+
+from servicios import ajustes
+from servicios.basedatos import SQLiteStore
+from servicios.identidad import identity_index
+
+
+def node_key(doi=None, scopus_id=None):
+    """
+    Clave canónica de un nodo según el índice de identidades: el mismo
+    documento visto por DOI, EID o Scopus ID tiene siempre la misma clave.
+    ``None`` si no hay identificador.
+    """
+    return identity_index.resolve(doi=doi, scopus_id=scopus_id)
+
+
+class CitationGraphStore(SQLiteStore):
+    def __init__(self, path, node_ttl=30 * ajustes.DAY):
+        self.node_ttl = node_ttl
+        super().__init__(path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS nodes (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS edges (
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (source, target)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_target ON edges (target)")
+        # Documentos cuya lista de referencias ya se ha resuelto
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS resolved (
+                key TEXT PRIMARY KEY,
+                resolved_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _fresh_since(self):
+        return time.time() - self.node_ttl
+
+    def get_nodes(self, keys):
+        """
+        Devuelve {clave: datos} de los nodos guardados y no caducados.
+        """
+        keys = [key for key in dict.fromkeys(keys) if key]
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, data FROM nodes WHERE key IN ({placeholders}) AND updated_at > ?",
+                (*chunk, self._fresh_since()),
+            ).fetchall()
+            found.update((key, json.loads(data)) for key, data in rows)
+        return found
+
+    def put_nodes(self, nodes):
+        """
+        Guarda o actualiza nodos ({clave: datos}); los campos nuevos se
+        combinan con los que ya existían.
+        """
+        nodes = {key: data for key, data in nodes.items() if key}
+        if not nodes:
+            return
+
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = list(nodes)
+            existing = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                existing.update(conn.execute(
+                    f"SELECT key, data FROM nodes WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+
+            for key, data in nodes.items():
+                merged = json.loads(existing[key]) if key in existing else {}
+                merged.update({field: value for field, value in data.items() if value is not None})
+                conn.execute(
+                    "INSERT OR REPLACE INTO nodes (key, data, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(merged, ensure_ascii=False, default=str), now),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_references(self, key):
+        """
+        Devuelve las claves de las referencias de un documento en su orden
+        original, o ``None`` si aún no se han resuelto (o han caducado).
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT 1 FROM resolved WHERE key = ? AND resolved_at > ?", (key, self._fresh_since())
+        ).fetchone()
+        if row is None:
+            return None
+
+        rows = conn.execute(
+            "SELECT target FROM edges WHERE source = ? ORDER BY position", (key,)
+        ).fetchall()
+        return [target for (target,) in rows]
+
+    def set_references(self, key, ref_keys):
+        """
+        Sustituye la lista de referencias de un documento y la marca como resuelta.
+        """
+        if not key:
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM edges WHERE source = ?", (key,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO edges (source, target, position) VALUES (?, ?, ?)",
+                [(key, ref_key, position) for position, ref_key in enumerate(ref_keys) if ref_key],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO resolved (key, resolved_at) VALUES (?, ?)", (key, time.time())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_reference_docs(self, key):
+        """
+        Devuelve las referencias de un documento en el formato de ``ref_docs``
+        de ``get_refs_scopus``, o ``None`` si no están (completas) en el almacén.
+        """
+        ref_keys = self.get_references(key) if key else None
+        if ref_keys is None:
+            return None
+
+        nodes = self.get_nodes(ref_keys)
+        if len(nodes) < len(set(ref_keys)):
+            return None
+
+        return [
+            {
+                "doi": nodes[ref_key].get("doi"),
+                "title": nodes[ref_key].get("title"),
+                "id": nodes[ref_key].get("scopus_id"),
+                "sourcetitle": nodes[ref_key].get("journal_name"),
+                "pub_date": nodes[ref_key].get("pub_date") or nodes[ref_key].get("pub_year"),
+                "authors": nodes[ref_key].get("authors"),
+            }
+            for ref_key in ref_keys
+        ]
+
+    def put_reference_docs(self, key, ref_docs):
+        """
+        Guarda las referencias recién obtenidas de un documento (``ref_docs``
+        de ``get_refs_scopus``). Un fallo del almacén no interrumpe el grafo.
+        """
+        nodes, ref_keys = {}, []
+        for ref in ref_docs:
+            ref_key = node_key(ref["doi"], ref["id"])
+            ref_keys.append(ref_key)
+            nodes[ref_key] = {
+                "doi": ref["doi"], "scopus_id": ref["id"], "title": ref["title"],
+                "journal_name": ref["sourcetitle"], "pub_date": ref["pub_date"], "authors": ref.get("authors"),
+            }
+
+        try:
+            self.put_nodes(nodes)
+            self.set_references(key, ref_keys)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar en el almacén las referencias de {key}: {e}")
+
+    def merge_nodes(self, old, new):
+        """
+        Mueve los datos y las aristas del nodo ``old`` al nodo ``new`` cuando
+        el índice de identidades descubre que son el mismo documento.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = dict(conn.execute(
+                "SELECT key, data FROM nodes WHERE key IN (?, ?)", (old, new)
+            ).fetchall())
+            if old in rows:
+                # Los datos del nodo canónico tienen preferencia
+                merged = {**json.loads(rows[old]), **json.loads(rows.get(new, "{}"))}
+                conn.execute(
+                    "INSERT OR REPLACE INTO nodes (key, data, updated_at) VALUES (?, ?, ?)",
+                    (new, json.dumps(merged, ensure_ascii=False, default=str), time.time()),
+                )
+                conn.execute("DELETE FROM nodes WHERE key = ?", (old,))
+
+            conn.execute("UPDATE OR IGNORE edges SET source = ? WHERE source = ?", (new, old))
+            conn.execute("UPDATE OR IGNORE edges SET target = ? WHERE target = ?", (new, old))
+            conn.execute("DELETE FROM edges WHERE source = ? OR target = ?", (old, old))
+            conn.execute("DELETE FROM edges WHERE source = target")
+            conn.execute("UPDATE OR IGNORE resolved SET key = ? WHERE key = ?", (new, old))
+            conn.execute("DELETE FROM resolved WHERE key = ?", (old,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def iter_edges(self, batch_size=10000):
+        """
+        Recorre todas las aristas (documento -> referencia) guardadas, por lotes.
+        """
+        cursor = self._connect().execute("SELECT source, target FROM edges")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    def version(self):
+        """
+        Identificador que cambia cada vez que se resuelven nuevas referencias.
+        """
+        conn = self._connect()
+        edges = conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+        last = conn.execute("SELECT MAX(resolved_at) FROM resolved").fetchone()[0]
+        return f"{edges}:{last or 0}"
+
+    def clear(self):
+        conn = self._connect()
+        for table in ("nodes", "edges", "resolved"):
+            conn.execute(f"DELETE FROM {table}")
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "nodes": conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0],
+            "edges": conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0],
+            "resolved_documents": conn.execute("SELECT COUNT(*) FROM resolved").fetchone()[0],
+        }
+
+
+citation_store = CitationGraphStore(ajustes.GRAPH_STORE_PATH, node_ttl=ajustes.GRAPH_NODE_TTL)
+identity_index.on_merge(citation_store.merge_nodes)
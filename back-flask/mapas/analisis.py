@@ -0,0 +1,235 @@
+"""
+Análisis del grafo de citas con álgebra lineal dispersa (SciPy).
+
+El grafo se convierte en una matriz de adyacencia dispersa ``A`` (``A[i, j] = 1``
+si el documento ``i`` cita a ``j``) y sobre ella se calculan:
+
+- PageRank por iteración de potencias.
+- Centralidad de grado de entrada (veces que se cita cada nodo).
+- Co-citación ``Aᵀ·A``: cuántos documentos citan a la vez a ``j`` y ``k``.
+- Acoplamiento bibliográfico ``A·Aᵀ``: cuántas referencias comparten ``i`` y ``k``.
+
+Los resultados se guardan en la caché por versión del grafo, y el PageRank
+del almacén persistente se puede usar como señal extra en el ranking.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from mapas.almacen_grafo import citation_store
+from mapas.disposicion import graph_version
+from servicios import ajustes
+from servicios.cache import make_key, response_cache
+
+
+def adjacency_from_edges(edges):
+    """
+    Construye la matriz dispersa (CSR) a partir de pares (origen, destino).
+    Devuelve ``(nodos, A)`` con los nodos en el orden de las filas.
+    """
+    index = {}
+    rows, cols = [], []
+    for source, target in edges:
+        rows.append(index.setdefault(source, len(index)))
+        cols.append(index.setdefault(target, len(index)))
+
+    n = len(index)
+    data = np.ones(len(rows), dtype=np.float64)
+    A = sp.csr_matrix((data, (rows, cols)), shape=(n, n))
+    A.data[:] = 1.0  # las aristas repetidas cuentan una sola vez
+    A.setdiag(0)
+    A.eliminate_zeros()
+    return list(index), A
+
+
+def adjacency_from_graph(G):
+    """
+    Matriz de adyacencia de un grafo de networkx (incluye los nodos aislados).
+    """
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    rows = [index[u] for u, v in G.edges()]
+    cols = [index[v] for u, v in G.edges()]
+    A = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(nodes), len(nodes)))
+    A.data[:] = 1.0
+    return nodes, A
+
+
+def pagerank(A, damping=0.85, tol=1e-10, max_iter=100):
+    """
+    PageRank por iteración de potencias. Los nodos sin referencias (colgantes)
+    reparten su peso de forma uniforme.
+    """
+    n = A.shape[0]
+    if n == 0:
+        return np.empty(0)
+
+    out_degree = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    inv_out = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    # Matriz de transición traspuesta: rank_nuevo = damping * Pᵀ·rank + ...
+    P_T = (sp.diags(inv_out) @ A).T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new_rank = damping * (P_T @ rank + rank[dangling].sum() / n) + (1.0 - damping) / n
+        if np.abs(new_rank - rank).sum() < tol * n:
+            rank = new_rank
+            break
+        rank = new_rank
+    return rank / rank.sum()
+
+
+def in_degree_centrality(A):
+    """
+    Grado de entrada normalizado por ``n - 1`` (igual que networkx).
+    """
+    n = A.shape[0]
+    in_degree = np.asarray(A.sum(axis=0)).ravel()
+    return in_degree / (n - 1) if n > 1 else in_degree
+
+
+def top_pairs(X, Y, nodes, top=20, block=2048):
+    """
+    Devuelve los ``top`` pares (i < j) con mayor peso de la matriz simétrica
+    ``X·Y`` sin materializarla entera: el producto se calcula por bloques de
+    filas y de cada bloque solo se guardan sus mejores candidatos.
+    """
+    n = X.shape[0]
+    rows, cols, weights = [], [], []
+    for start in range(0, n, block):
+        product = (X[start:start + block] @ Y).tocoo()
+        upper = product.col > product.row + start  # solo i < j
+        row, col, data = product.row[upper] + start, product.col[upper], product.data[upper]
+        if len(data) > top:
+            best = np.argpartition(-data, top - 1)[:top]
+            row, col, data = row[best], col[best], data[best]
+        rows.append(row)
+        cols.append(col)
+        weights.append(data)
+
+    if not weights:
+        return []
+    rows, cols, weights = np.concatenate(rows), np.concatenate(cols), np.concatenate(weights)
+    if len(weights) == 0:
+        return []
+
+    best = np.lexsort((cols, rows, -weights))[:top]
+    return [
+        {"a": nodes[rows[i]], "b": nodes[cols[i]], "weight": int(weights[i])}
+        for i in best
+    ]
+
+
+def _top_nodes(values, nodes, top):
+    k = min(top, len(values))
+    if k == 0:
+        return []
+    best = np.argpartition(-values, k - 1)[:k]
+    best = best[np.argsort(-values[best], kind="stable")]
+    return [{"node": nodes[i], "value": float(values[i])} for i in best]
+
+
+def _drop_hubs(A, axis, max_degree):
+    """
+    Quita de ``A`` las columnas (``axis=0``) o filas (``axis=1``) con más de
+    ``max_degree`` entradas. Devuelve la matriz y cuántas se han quitado.
+    """
+    degree = np.asarray(A.sum(axis=axis)).ravel()
+    hubs = degree > max_degree
+    if not hubs.any():
+        return A, 0
+    keep = sp.diags((~hubs).astype(np.float64))
+    return (A @ keep if axis == 0 else keep @ A).tocsr(), int(hubs.sum())
+
+
+def analyze(nodes, A, top=20, max_hub_degree=ajustes.ANALYTICS_MAX_HUB_DEGREE, damping=0.85):
+    """
+    Calcula todas las métricas de una matriz de adyacencia.
+
+    Para la co-citación y el acoplamiento se ignoran los nodos con más de
+    ``max_hub_degree`` conexiones: un documento citado por miles (o que cita a
+    miles) empareja a casi todos entre sí, no aporta similitud y el coste
+    crece con el cuadrado de su grado.
+    """
+    ranks = pagerank(A, damping)
+    in_degree = in_degree_centrality(A)
+
+    # Co-citación: sin los documentos que citan demasiado; acoplamiento: sin las referencias demasiado citadas
+    citing, citing_hubs = _drop_hubs(A, 1, max_hub_degree)
+    cited, cited_hubs = _drop_hubs(A, 0, max_hub_degree)
+
+    return {
+        "nodes": len(nodes),
+        "edges": int(A.nnz),
+        "pagerank": dict(zip(nodes, ranks.tolist())),
+        "in_degree": dict(zip(nodes, in_degree.tolist())),
+        "top_pagerank": _top_nodes(ranks, nodes, top),
+        "top_in_degree": _top_nodes(in_degree, nodes, top),
+        # (j, k) de Aᵀ·A: documentos que citan a ambos
+        "co_citation": top_pairs(citing.T.tocsr(), citing, nodes, top),
+        # (i, k) de A·Aᵀ: referencias compartidas
+        "bibliographic_coupling": top_pairs(cited, cited.T.tocsr(), nodes, top),
+        "ignored_hubs": {"citing": citing_hubs, "cited": cited_hubs},
+    }
+
+
+def _cached_analysis(scope, version, adjacency, top, max_hub_degree, damping):
+    """
+    Métricas de ``adjacency()`` (que devuelve ``(nodos, A)``) en la caché,
+    con una entrada por versión del grafo y por cada combinación de parámetros.
+    """
+    def compute():
+        nodes, A = adjacency()
+        return {"version": version, **analyze(nodes, A, top, max_hub_degree, damping)}
+
+    key = make_key("graph_analytics", scope, version, top=top, max_hub_degree=max_hub_degree, damping=damping)
+    return response_cache.get_or_fetch("graph_analytics", key, compute)
+
+
+def analyze_graph(G, top=20, max_hub_degree=ajustes.ANALYTICS_MAX_HUB_DEGREE, damping=0.85):
+    """
+    Métricas de un grafo de ``build_citation_graph``, en caché por versión del grafo.
+    """
+    return _cached_analysis(
+        "graph", graph_version(G), lambda: adjacency_from_graph(G), top, max_hub_degree, damping
+    )
+
+
+def analyze_store(top=20, max_hub_degree=ajustes.ANALYTICS_MAX_HUB_DEGREE, damping=0.85):
+    """
+    Métricas de todo el almacén persistente del grafo (nodos por DOI/Scopus ID),
+    en caché mientras no se resuelvan referencias nuevas.
+    """
+    return _cached_analysis(
+        "store", citation_store.version(), lambda: adjacency_from_edges(citation_store.iter_edges()),
+        top, max_hub_degree, damping,
+    )
+
+
+def analyze_columnar(store, top=20, max_hub_degree=ajustes.ANALYTICS_MAX_HUB_DEGREE, damping=0.85):
+    """
+    Métricas del grafo de referencias del almacén columnar (volcados
+    ingeridos), en caché hasta la siguiente ingesta.
+    """
+    def adjacency():
+        nodes, sources, targets = store.edge_arrays()
+        n = len(nodes)
+        A = sp.csr_matrix((np.ones(len(sources)), (sources, targets)), shape=(n, n))
+        A.data[:] = 1.0
+        A.setdiag(0)
+        A.eliminate_zeros()
+        return nodes, A
+
+    return _cached_analysis("columnar", store.version(), adjacency, top, max_hub_degree, damping)
+
+
+def store_pagerank():
+    """
+    PageRank de los nodos del almacén ({clave del nodo: valor}), para usarlo
+    como señal en el ranking. Vacío si el almacén no tiene aristas.
+    """
+    try:
+        return analyze_store()["pagerank"]
+    except Exception as e:
+        print(f"⚠️ No se pudo calcular el PageRank del almacén: {e}")
+        return {}
@@ -0,0 +1,132 @@
+"""
+Disposición (posiciones x/y) del grafo de citas calculada en el servidor.
+
+Para grafos grandes la simulación de físicas de vis-network bloquea el
+navegador. Aquí se calcula una disposición de fuerzas (Fruchterman-Reingold)
+vectorizada con NumPy: la atracción recorre las aristas de la matriz
+dispersa de adyacencia y la repulsión se aproxima al estilo Barnes-Hut con
+una rejilla (cada nodo se repele de los centroides de las celdas), así que
+cada iteración cuesta O(nodos x celdas) en lugar de O(nodos²). La
+disposición se guarda en la caché por versión del grafo y se envía con las
+físicas desactivadas para que el grafo se abra al instante.
+"""
+import math
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+from servicios import ajustes
+from servicios.cache import make_key, response_cache
+
+
+def graph_version(G):
+    """
+    Identificador estable del grafo (mismos nodos y aristas -> misma versión).
+    """
+    return make_key("graph", sorted(map(str, G.nodes())), sorted((str(u), str(v)) for u, v in G.edges()))
+
+
+def _force_layout(adjacency, iterations=50, seed=42, max_cells=1024, gravity=0.05):
+    """
+    Fruchterman-Reingold con repulsión aproximada por rejilla. ``adjacency`` es
+    la matriz dispersa (simétrica) del grafo; devuelve un array (n, 2).
+    """
+    n = adjacency.shape[0]
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+
+    edges = sp.coo_matrix(adjacency)
+    rows, cols = edges.row, edges.col
+
+    k = math.sqrt(1.0 / n)  # distancia ideal entre nodos
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    side = int(max(1, min(math.sqrt(max_cells), math.sqrt(n / 4))))
+    n_cells = side * side
+
+    for _ in range(iterations):
+        # Repartir los nodos en una rejilla de side x side celdas
+        low = pos.min(axis=0)
+        span = np.maximum(pos.max(axis=0) - low, 1e-9)
+        cell_xy = np.minimum(((pos - low) / span * side).astype(int), side - 1)
+        cell = cell_xy[:, 0] * side + cell_xy[:, 1]
+        mass = np.bincount(cell, minlength=n_cells).astype(float)
+        sums = np.stack([np.bincount(cell, pos[:, d], minlength=n_cells) for d in (0, 1)], axis=1)
+        occupied = mass > 0
+        centroids, masses = sums[occupied] / mass[occupied, None], mass[occupied]
+
+        # Repulsión k²/d desde el centroide de cada celda (por bloques para acotar la memoria)
+        displacement = np.zeros_like(pos)
+        block = max(1, 2_000_000 // len(masses))
+        for start in range(0, n, block):
+            delta = pos[start:start + block, None, :] - centroids[None, :, :]
+            dist2 = np.maximum((delta ** 2).sum(axis=-1), 1e-9)
+            displacement[start:start + block] += np.einsum("ijk,ij->ik", delta, (k * k) * masses / dist2)
+
+        # En la propia celda el nodo no debe repelerse a sí mismo: se cambia el
+        # término de la celda completa por el de la celda sin el nodo
+        own_mass = mass[cell]
+        delta = pos - sums[cell] / own_mass[:, None]
+        displacement -= delta * ((k * k) * own_mass / np.maximum((delta ** 2).sum(axis=1), 1e-9))[:, None]
+        rest = own_mass - 1
+        shared = rest > 0
+        delta = pos[shared] - (sums[cell][shared] - pos[shared]) / rest[shared, None]
+        displacement[shared] += delta * ((k * k) * rest[shared] / np.maximum((delta ** 2).sum(axis=1), 1e-9))[:, None]
+
+        # Atracción d²/k a lo largo de las aristas
+        delta = pos[rows] - pos[cols]
+        dist = np.sqrt((delta ** 2).sum(axis=1))
+        np.add.at(displacement, rows, -delta * (dist / k)[:, None])
+
+        # Gravedad suave hacia el centro para que los componentes sueltos no se alejen
+        displacement -= (pos - pos.mean(axis=0)) * (gravity / k)
+
+        # Limitar el desplazamiento por la temperatura, que se enfría en cada iteración
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 0.01)
+        pos += displacement * (temperature / length)[:, None]
+        temperature -= cooling
+
+    return pos
+
+
+def compute_layout(G, iterations=ajustes.LAYOUT_ITERATIONS, seed=42):
+    """
+    Devuelve {nodo: (x, y)} en píxeles. La escala crece con la raíz del
+    número de nodos para que los grafos grandes no queden apelmazados.
+    """
+    nodes = list(G.nodes())
+    if not nodes:
+        return {}
+    if len(nodes) == 1:
+        return {nodes[0]: (0.0, 0.0)}
+
+    # Sin dirección: la dirección de las aristas no importa para colocar los nodos
+    adjacency = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format="csr")
+    adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+
+    pos = _force_layout(adjacency, iterations=iterations, seed=seed)
+
+    scale = max(300.0, 40.0 * math.sqrt(len(nodes)))
+    pos -= pos.mean(axis=0)
+    pos *= scale / max(np.abs(pos).max(), 1e-9)
+    return {node: (round(float(x), 1), round(float(y), 1)) for node, (x, y) in zip(nodes, pos)}
+
+
+def get_layout(G):
+    """
+    Devuelve la disposición del grafo, calculándola solo si no está en la caché.
+    """
+    return response_cache.get_or_fetch("graph_layout", graph_version(G), lambda: compute_layout(G))
+
+
+def wants_server_layout(G, layout=None):
+    """
+    Decide si se calcula la disposición en el servidor: ``layout="server"`` lo
+    fuerza, ``"browser"`` lo desactiva y por defecto se usa con grafos grandes.
+    """
+    if layout == "server":
+        return True
+    if layout == "browser":
+        return False
+    return G.number_of_nodes() >= ajustes.LAYOUT_AUTO_NODES
@@ -1,55 +1,64 @@
-from pybliometrics.scopus import ScopusSearch, AbstractRetrieval, AuthorRetrieval
 import pybliometrics.scopus
 import networkx as nx
 import matplotlib.pyplot as plt
-import requests
 import base64
 from pyvis.network import Network
+from mapas.almacen_grafo import citation_store, node_key
+from servicios import ajustes
+from servicios.concurrencia import bounded_map
+from servicios.fuentes import (
+    CROSSREF_GRAPH_FIELDS, abstract_retrieval, author_retrieval, crossref_work, iter_crossref_works, iter_scopus_search,
+)
 
 
 pybliometrics.scopus.init()
 
 
 def get_refs_scopus(query: str, *, limit: int = 4):
-    all_documents = []
-
     try:
         # Realiza la búsqueda en Scopus
-        results = ScopusSearch(query, view="STANDARD")
-        
-        # Si se especifica un límite, recorta los resultados a ese límite
-        documents_to_process = results.results[:limit] if limit else results.results
+        # Solo se piden a Scopus los ``limit`` documentos que se van a procesar
+        documents_to_process = list(iter_scopus_search(query, limit=limit or None, view="STANDARD"))
+
+        # Referencias ya resueltas en el almacén del grafo
+        stored_refs = {doc.eid: citation_store.get_reference_docs(node_key(doc.doi, doc.eid)) for doc in documents_to_process}
+
+        # Recupera en paralelo las referencias de los documentos que faltan
+        eids = [doc.eid for doc in documents_to_process if stored_refs[doc.eid] is None]
+        documents, errors = bounded_map(lambda eid: abstract_retrieval(eid, view="REF"), eids, ajustes.FETCH_WORKERS)
+        for eid, e in errors.items():
+            print(f"Error procesando el documento {eid}: {e}")
 
-        # Itera sobre los documentos obtenidos
+        all_documents = []
         for doc in documents_to_process:
-            try:
-                doc_dict = doc._asdict()
-                eid = doc_dict["eid"]
-
-                # Recupera las referencias para el documento
-                document = AbstractRetrieval(eid, view="REF")
-                print(document)
-                refs = []
-
-                # Extrae las referencias del documento
-                for ref in document.references:
-                    ref_doc = {
-                        "doi": ref.doi,
-                        "title": ref.title,
-                        "id": ref.id,
-                        "sourcetitle": ref.sourcetitle,
-                        "pub_date": ref.coverDate  # Incluye la fecha de publicación de la referencia
-                    }
-                    refs.append(ref_doc)
-
-                doc_dict["ref_docs"] = refs
-                doc_dict["coverDate"] = document.coverDate  # Incluye la fecha de publicación del documento principal
-
-                # Agrega el documento a la lista de resultados
+            doc_dict = doc._asdict()
+
+            if stored_refs[doc.eid] is not None:
+                doc_dict["ref_docs"] = stored_refs[doc.eid]
                 all_documents.append(doc_dict)
-                
-            except Exception as e:
-                print(f"Error procesando el documento {doc_dict.get('eid', 'unknown')}: {e}")
+                continue
+
+            document = documents.get(doc.eid)
+            if document is None:
+                continue
+
+            # Extrae las referencias del documento
+            doc_dict["ref_docs"] = [
+                {
+                    "doi": ref.doi,
+                    "title": ref.title,
+                    "id": ref.id,
+                    "sourcetitle": ref.sourcetitle,
+                    "pub_date": ref.coverDate,  # Incluye la fecha de publicación de la referencia
+                    "authors": ref.authors,
+                }
+                for ref in document.references
+            ]
+            doc_dict["coverDate"] = document.coverDate  # Incluye la fecha de publicación del documento principal
+            citation_store.put_reference_docs(node_key(doc.doi, doc.eid), doc_dict["ref_docs"])
+
+            # Agrega el documento a la lista de resultados
+            all_documents.append(doc_dict)
         
         return all_documents
 
@@ -61,14 +70,10 @@ def get_refs_crossref(query, limit=50):
     """
     Busca referencias en CrossRef basándose en el título.
     """
-    url = f"https://api.crossref.org/works?query={query}&rows={limit}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
         documents = []
-        for item in data.get("message", {}).get("items", []):
+        # Página a página con cursor y solo los campos que usa el grafo
+        for item in iter_crossref_works(query, limit=limit, select=CROSSREF_GRAPH_FIELDS):
             # 🛠 Manejo robusto de los autores
             authors = item.get("author", [])
             if authors:
@@ -78,11 +83,11 @@ def get_refs_crossref(query, limit=50):
                 creator = "Desconocido"
 
             documents.append({
-                "title": item.get("title", ["Título desconocido"])[0],
+                "title": (item.get("title") or ["Título desconocido"])[0],
                 "creator": creator,
                 "doi": item.get("DOI", ""),
                 "coverDisplayDate": extract_year(item.get("issued", {}).get("date-parts", [[None]])),
-                "publicationName": item.get("container-title", ["Revista desconocida"])[0],
+                "publicationName": (item.get("container-title") or ["Revista desconocida"])[0],
                 "ref_docs": item.get("reference", []),
             })
 
@@ -130,18 +135,16 @@ def get_citation_count(doi=None, scopus_id=None, source='scopus'):
     try:
         if source.lower() == 'scopus':
             if scopus_id:
-                abstract = AbstractRetrieval(scopus_id, view="FULL")
+                abstract = abstract_retrieval(scopus_id, view="FULL")
                 return abstract.citedby_count or 0
             elif doi:
-                abstract = AbstractRetrieval(doi, view="FULL")
+                abstract = abstract_retrieval(doi, view="FULL")
                 return abstract.citedby_count or 0
         elif source.lower() == 'crossref':
             if doi:
-                url = f"https://api.crossref.org/works/{doi}"
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['message'].get('is-referenced-by-count', 0)
+                work = crossref_work(doi)
+                if work is not None:
+                    return work.get('is-referenced-by-count', 0)
                 return 0
         else:
             return "Desconocido"
@@ -153,11 +156,9 @@ def get_author_from_crossref(doi):
     """
     Obtiene el autor de un artículo usando su DOI desde CrossRef.
     """
-    url = f"https://api.crossref.org/works/{doi}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        authors = data['message'].get('author', [])
+    work = crossref_work(doi)
+    if work is not None:
+        authors = work.get('author', [])
         print(authors)
         if authors:
             return extract_last_name(authors[0]['family'])
@@ -173,11 +174,11 @@ def get_author_from_scopus(doi=None, scopus_id=None):
         if doi:
             # Si se pasa el DOI, obtenemos la información correspondiente
             print(f"Obteniendo autor por DOI: {doi}")
-            abstract = AbstractRetrieval(doi)
+            abstract = abstract_retrieval(doi)
         elif scopus_id:
             # Si se pasa el Scopus ID, obtenemos la información correspondiente
             print(f"Obteniendo autor por Scopus ID: {scopus_id}")
-            author = AuthorRetrieval(scopus_id)
+            author = author_retrieval(scopus_id)
             
             # Retornar el nombre del autor (usualmente el primer autor)
             first_author = author.given_name + " " + author.surname
@@ -201,201 +202,336 @@ def get_author_from_scopus(doi=None, scopus_id=None):
         return "Desconocido"
 
 
-def build_citation_graph(documents, source='None'):
+def _parse_reference(ref, source):
     """
-    Crea un grafo de citas a partir de los documentos, usando 'Apellido - Año' en los nodos.
+    Extrae los campos de una referencia según la fuente (CrossRef o Scopus).
     """
-    G = nx.DiGraph()
+    if source == 'crossref':
+        return {
+            "doi": ref.get("DOI"),  # CrossRef usa "DOI"
+            "scopus_id": None,
+            "pub_year": ref.get("year", "Desconocido"),  # CrossRef usa "year"
+            "journal_name": ref.get("journal-title", "Revista desconocida"),  # CrossRef usa "journal-title"
+            "title": ref.get("article-title", "Título desconocido"),  # CrossRef usa "article-title"
+        }
+
+    ref_pub_date = ref.get("pub_date", "Desconocido")  # Scopus usa "pub_date"
+    return {
+        "doi": ref.get("doi"),  # Scopus usa "doi"
+        "scopus_id": ref.get("id"),
+        "pub_year": str(ref_pub_date)[:4] if ref_pub_date else "Desconocido",  # Extrae el año de "pub_date"
+        "journal_name": ref.get("sourcetitle", "Revista desconocida"),  # Scopus usa "sourcetitle"
+        "title": ref.get("title", "Título desconocido"),  # Scopus usa "title"
+    }
+
+
+def _enrich_reference(identifier, source):
+    """
+    Obtiene las citas y el autor de una referencia identificada por (doi, scopus_id).
+    """
+    ref_doi, ref_scopus_id = identifier
+    citation_count = get_citation_count(ref_doi, ref_scopus_id)
+    author = get_author_from_crossref(ref_doi) if source == 'crossref' else get_author_from_scopus(ref_doi, ref_scopus_id)
+    return citation_count, author
+
+
+def _is_resolved(citation_count):
+    # get_citation_count devuelve "Desconocido" cuando falla: no se guarda para reintentarlo
+    return citation_count != "Desconocido"
+
+
+def _doc_ids(doc):
+    """
+    (doi, scopus_id) de un documento principal; los de Scopus traen el EID.
+    """
+    return doc.get("doi") or None, doc.get("id") or doc.get("eid") or None
+
+
+def _enrich_documents(main_docs, source, max_workers):
+    """
+    Devuelve las citas de los documentos principales y (citas, autor) de las
+    referencias, ambos indexados por su clave canónica. Cada documento se
+    resuelve una sola vez aunque aparezca por DOI y por Scopus ID. Lo que ya
+    está en el almacén del grafo se reutiliza; el resto se consulta en
+    paralelo y se guarda.
+    """
+    # Clave canónica -> (doi, scopus_id) con el que se consultará
+    main_ids, ref_ids = {}, {}
+    for doc, refs in main_docs:
+        if doc["key"]:
+            main_ids.setdefault(doc["key"], _doc_ids(doc))
+        for ref in refs:
+            if ref["key"]:
+                ref_ids.setdefault(ref["key"], (ref["doi"], ref["scopus_id"]))
+
+    stored = citation_store.get_nodes(list(main_ids) + list(ref_ids))
+
+    main_citations, ref_details = {}, {}
+    for key in main_ids:
+        data = stored.get(key, {})
+        if "citation_count" in data:
+            main_citations[key] = data["citation_count"]
+    for key in ref_ids:
+        data = stored.get(key, {})
+        if "citation_count" in data and "author" in data:
+            ref_details[key] = (data["citation_count"], data["author"])
+
+    missing_main = [key for key in main_ids if key not in main_citations]
+    missing_refs = [key for key in ref_ids if key not in ref_details]
+    print(f"🔎 Grafo: {len(main_citations) + len(ref_details)} nodos desde el almacén, "
+          f"{len(missing_main) + len(missing_refs)} por consultar")
+
+    fetched_main, errors = bounded_map(lambda key: get_citation_count(*main_ids[key]), missing_main, max_workers)
+    fetched_refs, ref_errors = bounded_map(lambda key: _enrich_reference(ref_ids[key], source), missing_refs, max_workers)
+    for key, error in {**errors, **ref_errors}.items():
+        print(f"⚠️ Error enriqueciendo {key}: {error}")
+
+    main_citations.update(fetched_main)
+    ref_details.update(fetched_refs)
+
+    # Guardar en el almacén los nodos nuevos y las referencias de cada documento
+    new_nodes = {}
+    for doc, refs in main_docs:
+        key = doc["key"]
+        if key in fetched_main and _is_resolved(fetched_main[key]):
+            doi, scopus_id = main_ids[key]
+            new_nodes[key] = {
+                "doi": doi, "scopus_id": scopus_id, "title": doc.get("title"),
+                "creator": doc.get("creator"), "publicationName": doc.get("publicationName"),
+                "citation_count": fetched_main[key],
+            }
+        for ref in refs:
+            ref_key = ref["key"]
+            if ref_key in fetched_refs and _is_resolved(fetched_refs[ref_key][0]):
+                citation_count, author = fetched_refs[ref_key]
+                new_nodes[ref_key] = {
+                    **{field: value for field, value in ref.items() if field != "key"},
+                    "citation_count": citation_count, "author": author,
+                }
+
+    try:
+        citation_store.put_nodes(new_nodes)
+        for doc, refs in main_docs:
+            citation_store.set_references(doc["key"], [ref["key"] for ref in refs])
+    except Exception as e:
+        print(f"⚠️ No se pudo actualizar el almacén del grafo: {e}")
+
+    return main_citations, ref_details
+
+
+def _document_url(doi, scopus_id):
+    if doi:
+        return f"https://doi.org/{doi}"
+    if scopus_id:
+        return f"https://www.scopus.com/record/display.uri?eid={scopus_id}"
+    return None
 
-    # Diccionario para almacenar las referencias ya agregadas por su etiqueta
-    nodes_set = set()
 
-    # Iterar sobre todos los documentos principales
+def build_citation_graph(documents, source='None', max_workers=ajustes.FETCH_WORKERS):
+    """
+    Crea un grafo de citas a partir de los documentos. Cada nodo es un
+    documento identificado por su clave canónica (DOI/EID/Scopus ID) y se
+    muestra con la etiqueta 'Apellido - Año'.
+
+    Primero se recogen todas las referencias, después se enriquecen (citas y
+    autor) reutilizando el almacén persistente del grafo y consultando en
+    paralelo solo las que faltan, y por último se monta el grafo.
+    """
+    G = nx.DiGraph()
+
+    # 1) Recoger documentos principales y referencias sin llamar a ninguna API
+    main_docs = []
     for doc in documents:
-        print("\n🔹 Documento principal:", doc)  # ✅ Depuración
+        doc = {**doc, "key": node_key(*_doc_ids(doc))}
+        refs = []
+        for ref in doc.get("ref_docs", []):
+            ref = _parse_reference(ref, source)
+            ref["key"] = node_key(ref["doi"], ref["scopus_id"])
+            refs.append(ref)
+        main_docs.append((doc, refs))
 
-        creator = doc.get("creator", "")
-        doi = doc.get("doi", "")
-        cover_display_date = doc.get("coverDisplayDate", "")
-        scopus_id = doc.get("id", "")
-        
-        main_author = extract_last_name(creator)
-        main_pub_year = extract_year(cover_display_date)
-        if doi:
-            url = f"https://doi.org/{doi}"
-        elif scopus_id:
-            url = f"https://www.scopus.com/record/display.uri?eid={scopus_id}"
-        else:
-            url = None
+    # 2) Citas de los documentos principales y citas + autor de las referencias
+    main_citations, ref_details = _enrich_documents(main_docs, source, max_workers)
+
+    # 3) Montar el grafo
+    for doc, refs in main_docs:
+        main_key = doc["key"]
+        doi, scopus_id = _doc_ids(doc)
+        url = _document_url(doi, scopus_id)
+
+        # Sin identificador no se puede enlazar el documento ni sus referencias
+        if not main_key or not url:
+            continue
+
+        main_author = extract_last_name(doc.get("creator", ""))
+        main_pub_year = extract_year(doc.get("coverDisplayDate", ""))
 
-        # 🔥 Obtener el número de citas
-        citation_count = get_citation_count(doi, scopus_id)
+        # 🔥 Número de citas
+        citation_count = main_citations.get(main_key, "Desconocido")
 
         # Etiqueta del nodo principal
         main_label = f"{main_author} - {main_pub_year}"
 
-        # Obtener información de la revista
-        journal_name = doc.get("publicationName", "Revista desconocida")
-        volume = doc.get("volume", "No disponible")
-        issue = doc.get("issueIdentifier", "No disponible")
-        article_number = doc.get("article_number", "No disponible")
-        issn = doc.get("issn", "No disponible")
-        eissn = doc.get("eIssn", "No disponible")
-
-        if url:
-            if main_label not in nodes_set:
-                # Asegurarnos de que el nodo principal sea añadido con color rojo
-                G.add_node(main_label, 
-                           label=main_label, 
-                           title=doc.get("title", "Título desconocido"),
-                           citation_count=citation_count,
-                           color="red",  # Color rojo para documento principal
-                           size=20,
-                           url=url,
-                           publicationName=journal_name, 
-                           volume=volume, 
-                           issueIdentifier=issue, 
-                           article_number=article_number, 
-                           issn=issn, 
-                           eIssn=eissn)
-                nodes_set.add(main_label)
+        # Un documento que ya estaba como referencia pasa a ser principal
+        if G.nodes.get(main_key, {}).get("color") in (None, "blue"):
+            G.add_node(main_key,
+                       label=main_label,
+                       title=doc.get("title", "Título desconocido"),
+                       citation_count=citation_count,
+                       # Rojo para los documentos de la búsqueda, naranja para los expandidos en el rastreo
+                       color="red" if not doc.get("depth") else "orange",
+                       size=20 if not doc.get("depth") else 17,
+                       depth=doc.get("depth", 0),
+                       url=url,
+                       publicationName=doc.get("publicationName", "Revista desconocida"),
+                       volume=doc.get("volume", "No disponible"),
+                       issueIdentifier=doc.get("issueIdentifier", "No disponible"),
+                       article_number=doc.get("article_number", "No disponible"),
+                       issn=doc.get("issn", "No disponible"),
+                       eIssn=doc.get("eIssn", "No disponible"))
 
         # Procesar referencias para este documento
-        for ref in doc.get("ref_docs", []):
-            print("\n   🔹 Referencia encontrada:", ref)  # ✅ Depuración
-
-            # Intentar obtener el autor de la referencia
-            ref_author = "Desconocido"
-            # Definir ref_scopus_id antes del if
-            ref_scopus_id = None  
-
-            # Comprobar si la fuente es CrossRef o Scopus y obtener el DOI correctamente
-            if source == 'crossref':
-                ref_doi = ref.get("DOI")  # CrossRef usa "DOI"
-                ref_pub_year = ref.get("year", "Desconocido")  # CrossRef usa "year"
-                ref_journal_name = ref.get("journal-title", "Revista desconocida")  # CrossRef usa "journal-title"
-                ref_title = ref.get("article-title", "Título desconocido")  # CrossRef usa "article-title"
-            else:
-                ref_doi = ref.get("doi")  # Scopus usa "doi"
-                ref_pub_date = ref.get("pub_date", "Desconocido")  # Scopus usa "pub_date"
-                ref_pub_year = str(ref_pub_date)[:4] if ref_pub_date else "Desconocido"  # Extrae el año de "pub_date"
-                ref_journal_name = ref.get("sourcetitle", "Revista desconocida")  # Scopus usa "sourcetitle"
-                ref_title = ref.get("title", "Título desconocido")  # Scopus usa "title"
-                ref_scopus_id = ref.get("id")
-
-            # 🔥 Obtener citas de la referencia
-            ref_citation_count = get_citation_count(ref_doi, ref_scopus_id)
-
-            # Obtener el autor dependiendo de la fuente
-            ref_author = get_author_from_crossref(ref_doi) if source == 'crossref' else get_author_from_scopus(ref_doi, ref_scopus_id)
-
-            # Etiqueta de la referencia
-            ref_label = f"{ref_author} - {ref_pub_year}"
-
-            if ref_doi:
-                ref_url = f"https://doi.org/{ref_doi}"
-            elif ref_scopus_id:
-                ref_url = f"https://www.scopus.com/record/display.uri?eid={ref_scopus_id}"
-            else:
-                ref_url = None  # Si no tiene identificador, no agregarlo
-
-            # Si no se ha agregado la referencia al grafo
-            if ref_pub_year != "Desconocido" and ref_url:
-                # Verifica si la referencia ya existe
-                if ref_label not in nodes_set:
-                    # Si no existe, la agrega
-                    G.add_node(ref_label, 
-                            label=ref_label, 
-                            title=ref_title,  # Usar el título correcto según la fuente
-                            color="blue",  # Color azul para referencias
-                            size=15,
-                            url=ref_url,
-                            citation_count=ref_citation_count,
-                            publicationName=ref_journal_name)
-
-                    nodes_set.add(ref_label)
-
-                # Crear el arco (edge) entre el documento principal y la referencia
-                G.add_edge(main_label, ref_label)
+        for ref in refs:
+            ref_key = ref["key"]
+            ref_pub_year = ref["pub_year"]
+            ref_url = _document_url(ref["doi"], ref["scopus_id"])
+
+            # Si no tiene identificador o año, no se agrega
+            if not ref_key or ref_pub_year == "Desconocido" or not ref_url or ref_key == main_key:
+                continue
+
+            if ref_key not in G:
+                # 🔥 Citas y autor de la referencia (ya obtenidos en paralelo)
+                ref_citation_count, ref_author = ref_details.get(ref_key, ("Desconocido", "Desconocido"))
+                G.add_node(ref_key,
+                           label=f"{ref_author} - {ref_pub_year}",
+                           title=ref["title"],  # Usar el título correcto según la fuente
+                           color="blue",  # Color azul para referencias
+                           size=15,
+                           url=ref_url,
+                           citation_count=ref_citation_count,
+                           publicationName=ref["journal_name"])
+
+            # Crear el arco (edge) entre el documento principal y la referencia
+            G.add_edge(main_key, ref_key)
 
     return G
 
 
-def plot_citation_graph(G): 
+def _hover_text(data):
     """
-    Crea un grafo interactivo con pyvis donde los nodos muestran "Título"
+    Texto (HTML) que se muestra al pasar el ratón por un nodo: título, autor,
+    año, citas y revista; los documentos principales añaden volumen, número e ISSN.
+    """
+    # Obtener título y autor
+    title = data.get("title", "Título desconocido")
+    label_parts = data["label"].split(" - ")  # "Autor - Año"
+    author = label_parts[0] if len(label_parts) > 1 else "Desconocido"
+    year = label_parts[1] if len(label_parts) > 1 else "Desconocido"
+    citation_count = data.get("citation_count", "Desconocido")
+
+    # Obtener información de la revista
+    journal_name = data.get("publicationName", "Revista desconocida")
+    url = data.get("url", "#")
+
+    # Verificar si el nodo es azul (referencia) y eliminar campos innecesarios
+    if data.get("color") == "blue":
+        return f"""
+        <b>Título:</b> {title} <br>
+        <b>Autor:</b> {author} <br>
+        <b> Año:</b> {year} <br>
+        <b> Citas:</b> {citation_count} <br>
+        <b> Revista:</b> {journal_name} <br>
+        <a href="{url}" target="_blank">Ver artículo</a> 
+        """
+
+    volume = data.get("volume", "No disponible")
+    issue = data.get("issueIdentifier", "No disponible")
+    article_number = data.get("article_number", "No disponible")
+    issn = data.get("issn", "No disponible")
+    eissn = data.get("eIssn", "No disponible")
+
+    return f"""
+        <b>Título:</b> {title} <br>
+        <b>Autor:</b> {author} <br>
+        <b>Año:</b> {year} <br>
+        <b> Citas:</b> {citation_count} <br>
+        <b>Revista:</b> {journal_name} <br>
+        <b>Volumen:</b> {volume} <br>
+        <b>Número:</b> {issue} <br>
+        <b>Artículo:</b> {article_number} <br>
+        <b>ISSN:</b> {issn} <br>
+        <b>eISSN:</b> {eissn} <br>
+        <a href="{url}" target="_blank">Ver artículo</a>
+        """
+
+
+def render_citation_graph_html(G, positions=None):
+    """
+    Crea un grafo interactivo con pyvis donde los nodos muestran "Autor - Año"
     pero revelan información completa al hacer hover (Título, Autor, Año, Revista, Volumen...).
+    Devuelve el HTML generado en memoria, sin escribir ningún fichero.
+
+    Con ``positions`` ({nodo: (x, y)}) los nodos se colocan ahí y se
+    desactivan las físicas, así el navegador no simula nada al abrirlo.
     """
     net = Network(height="700px", width="100%", directed=True)
-    net.toggle_physics(True)
+    net.toggle_physics(positions is None)
 
     # Añadir nodos con información detallada
     for node, data in G.nodes(data=True):
-        # Obtener título y autor
-        title = data.get("title", "Título desconocido")
-        label_parts = data["label"].split(" - ")  # "Autor - Año"
-        author = label_parts[0] if len(label_parts) > 1 else "Desconocido"
-        year = label_parts[1] if len(label_parts) > 1 else "Desconocido"
-        citation_count = data.get("citation_count", "Desconocido")
-
-        # Obtener información de la revista
-        journal_name = data.get("publicationName", "Revista desconocida")
-        url = data.get("url", "#")
-
-        # Verificar si el nodo es azul (referencia) y eliminar campos innecesarios
-        if data.get("color") == "blue":
-            hover_text = f"""
-            <b>Título:</b> {title} <br>
-            <b>Autor:</b> {author} <br>
-            <b> Año:</b> {year} <br>
-            <b> Citas:</b> {citation_count} <br>
-            <b> Revista:</b> {journal_name} <br>
-            <a href="{url}" target="_blank">Ver artículo</a> 
-            """
-        else:
-            volume = data.get("volume", "No disponible")
-            issue = data.get("issueIdentifier", "No disponible")
-            article_number = data.get("article_number", "No disponible")
-            issn = data.get("issn", "No disponible")
-            eissn = data.get("eIssn", "No disponible")
-
-            hover_text = f"""
-            <b>Título:</b> {title} <br>
-            <b>Autor:</b> {author} <br>
-            <b>Año:</b> {year} <br>
-            <b> Citas:</b> {citation_count} <br>
-            <b>Revista:</b> {journal_name} <br>
-            <b>Volumen:</b> {volume} <br>
-            <b>Número:</b> {issue} <br>
-            <b>Artículo:</b> {article_number} <br>
-            <b>ISSN:</b> {issn} <br>
-            <b>eISSN:</b> {eissn} <br>
-            <a href="{url}" target="_blank">Ver artículo</a>
-            """
-
-        label_with_link = f'{data["label"]}'
-        # Añadir el nodo con la información completa en el hover
+        extra = {}
+        if positions and node in positions:
+            extra["x"], extra["y"] = positions[node]
         net.add_node(
             node,
-            label=label_with_link,  # Solo "Título"
-            title=hover_text,  # Información completa en el hover
+            label=data["label"],
+            title=_hover_text(data),  # Información completa en el hover
             color=data["color"],
             size=data["size"],
-            href=url
+            href=data.get("url", "#"),
+            **extra
         )
 
     # Añadir los bordes (aristas) entre los nodos
     for edge in G.edges():
         net.add_edge(edge[0], edge[1])
 
-    # Guardar el grafo en un archivo HTML
-    graph_path = "citation_graph.html"
-    net.save_graph(graph_path)
+    return net.generate_html()
+
 
-    # Leer el archivo HTML generado por pyvis
-    with open(graph_path, "r", encoding="utf-8") as f:
-        graph_html = f.read()
+def plot_citation_graph(G, positions=None): 
+    """
+    Devuelve el HTML interactivo del grafo codificado en base64 (formato
+    histórico de /generate_citation_graph).
+    """
+    return base64.b64encode(render_citation_graph_html(G, positions).encode()).decode("utf-8")
 
-    # Convertir el HTML a base64 para enviarlo en una API o para usarlo de otra manera
-    return base64.b64encode(graph_html.encode()).decode("utf-8")
 
+def graph_to_json(G, positions=None):
+    """
+    Convierte el grafo en listas compactas de nodos y aristas con el formato
+    de vis-network (``id``/``label``/``title`` y ``from``/``to``), para que el
+    front lo dibuje sin recibir la plantilla HTML de pyvis en cada llamada.
+    Con ``positions`` cada nodo lleva su ``x``/``y`` y ``physics`` es ``False``.
+    """
+    nodes = [
+        {
+            "id": node,
+            "label": data["label"],
+            "title": _hover_text(data),
+            "color": data["color"],
+            "size": data["size"],
+            "url": data.get("url"),
+            "citation_count": data.get("citation_count"),
+            "depth": data.get("depth", 0),
+        }
+        for node, data in G.nodes(data=True)
+    ]
+    if positions:
+        for node in nodes:
+            if node["id"] in positions:
+                node["x"], node["y"] = positions[node["id"]]
+
+    edges = [{"from": source, "to": target} for source, target in G.edges()]
+    return {"nodes": nodes, "edges": edges, "physics": not positions}
@@ -0,0 +1,250 @@
+"""
+Rastreo multinivel (BFS) del grafo de citas.
+
+Parte de los documentos que devuelven ``get_refs_scopus``/``get_refs_crossref``
+(nivel 0) y, nivel a nivel, expande sus referencias y/o los trabajos que los
+citan. La frontera se deduplica por la clave canónica del documento, cada documento aporta como
+mucho ``fan_out`` vecinos al siguiente nivel, el total de nodos está limitado
+por ``max_nodes`` y cada nivel se consulta en paralelo con ``bounded_map``.
+
+El resultado es una lista de documentos con el mismo formato que la de
+``get_refs_*`` (cada uno con sus ``ref_docs`` y su ``depth``), lista para
+``build_citation_graph``.
+"""
+from mapas.almacen_grafo import citation_store, node_key
+from mapas.mapa_referencias import extract_year
+from servicios import ajustes
+from servicios.concurrencia import bounded_map
+from servicios.fuentes import abstract_retrieval, crossref_work, iter_scopus_search
+
+
+DIRECTIONS = ("references", "citing", "both")
+
+
+def _ref_ids(ref, source):
+    """
+    Devuelve (doi, scopus_id) de una referencia en el formato de la fuente.
+    """
+    if source == "crossref":
+        return ref.get("DOI"), None
+    return ref.get("doi"), ref.get("id")
+
+
+def _doc_ids(doc):
+    scopus_id = doc.get("id") or doc.get("eid") or None
+    return doc.get("doi") or None, scopus_id
+
+
+def _as_eid(scopus_id):
+    scopus_id = str(scopus_id)
+    return scopus_id if scopus_id.startswith("2-s2.0-") else f"2-s2.0-{scopus_id}"
+
+
+def _first_author_surname(authors):
+    """
+    Apellido del primer autor de una referencia de Scopus; ``authors`` viene
+    como "Apellido, I.; Apellido2, I2.".
+    """
+    if not authors:
+        return None
+    return authors.split(";")[0].split(",")[0].strip() or None
+
+
+def _expand_scopus(ids, ref):
+    """
+    Recupera las referencias de un documento de Scopus (desde el almacén si ya
+    están resueltas) y lo devuelve en el formato de ``get_refs_scopus``.
+    """
+    doi, scopus_id = ids
+    key = node_key(doi, scopus_id)
+    creator, cover_date = None, ref.get("pub_date")
+
+    ref_docs = citation_store.get_reference_docs(key)
+    if ref_docs is None:
+        record = abstract_retrieval(_as_eid(scopus_id) if scopus_id else doi, view="REF")
+        ref_docs = [
+            {
+                "doi": r.doi, "title": r.title, "id": r.id, "sourcetitle": r.sourcetitle,
+                "pub_date": r.coverDate, "authors": r.authors,
+            }
+            for r in record.references
+        ]
+        citation_store.put_reference_docs(key, ref_docs)
+        if record.authors:
+            creator = record.authors[0].surname
+        cover_date = record.coverDate or cover_date
+
+    return {
+        "doi": doi,
+        "id": scopus_id,
+        "title": ref.get("title"),
+        "creator": creator or _first_author_surname(ref.get("authors")),
+        "coverDisplayDate": str(cover_date)[:4] if cover_date else "",
+        "publicationName": ref.get("sourcetitle"),
+        "ref_docs": ref_docs,
+    }
+
+
+def _expand_crossref(ids, ref):
+    """
+    Recupera las referencias de un trabajo de CrossRef (la respuesta ya está en
+    la caché de ``crossref_work`` si se consultó antes).
+    """
+    doi, _ = ids
+    work = crossref_work(doi) if doi else None
+    if work is None:
+        return None
+
+    authors = work.get("author") or [{}]
+    return {
+        "doi": doi,
+        "id": None,
+        "title": (work.get("title") or [ref.get("article-title", "Título desconocido")])[0],
+        "creator": authors[0].get("family") or authors[0].get("name", "Desconocido"),
+        "coverDisplayDate": extract_year(work.get("issued", {}).get("date-parts", [[None]])),
+        "publicationName": (work.get("container-title") or [ref.get("journal-title", "Revista desconocida")])[0],
+        "ref_docs": work.get("reference", []),
+    }
+
+
+def _citing_scopus(ids, limit=None):
+    """
+    Devuelve como mucho ``limit`` documentos de Scopus que citan al documento
+    (doi, scopus_id), empezando por los más citados.
+    """
+    doi, scopus_id = ids
+    if scopus_id:
+        query = f"REFEID({_as_eid(scopus_id)})"
+    elif doi:
+        query = f"REF({doi})"
+    else:
+        return []
+    return list(iter_scopus_search(query, limit=limit, sort="-citedby-count", view="STANDARD"))
+
+
+def _as_ref(doc):
+    """
+    Convierte un documento en una referencia de Scopus (para la arista citante -> citado).
+    """
+    return {
+        "doi": doc.get("doi"),
+        "title": doc.get("title"),
+        "id": doc.get("id") or doc.get("eid"),
+        "sourcetitle": doc.get("publicationName"),
+        "pub_date": doc.get("coverDisplayDate") or doc.get("coverDate"),
+        "authors": doc.get("author_names"),
+    }
+
+
+def crawl_citations(seeds, source, depth=2, direction="references",
+                    max_nodes=ajustes.CRAWL_MAX_NODES, fan_out=ajustes.CRAWL_FAN_OUT,
+                    max_workers=ajustes.FETCH_WORKERS, progress=None):
+    """
+    Recorre el grafo de citas en anchura desde ``seeds`` hasta ``depth`` niveles.
+
+    - ``depth=1`` equivale al comportamiento de siempre (documentos y sus referencias).
+    - ``direction``: "references", "citing" (solo Scopus) o "both".
+    - ``max_nodes``: número máximo de nodos distintos en el grafo.
+    - ``fan_out``: vecinos nuevos que aporta cada documento al siguiente nivel.
+    - ``progress(hechos, total, mensaje)`` se llama al terminar cada nivel.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Dirección desconocida: {direction}")
+    if direction != "references" and source != "scopus":
+        print(f"⚠️ {source} no ofrece trabajos citantes; solo se siguen las referencias")
+        direction = "references"
+
+    expand = _expand_scopus if source == "scopus" else _expand_crossref
+    follow_refs = direction in ("references", "both")
+    follow_citing = direction in ("citing", "both")
+
+    # Documentos del grafo por clave (los citantes pueden completarse al expandirlos)
+    documents = {}
+    seen = set()
+
+    def admit(key):
+        # Añade un nodo nuevo si queda presupuesto; los ya vistos siempre se admiten
+        if key in seen:
+            return True
+        if len(seen) >= max_nodes:
+            return False
+        seen.add(key)
+        return True
+
+    def add_document(doc, level):
+        doc["depth"] = level
+        key = node_key(*_doc_ids(doc)) or f"doc:{len(documents)}"
+        # Solo se conservan las referencias que caben en el presupuesto
+        doc["ref_docs"] = [
+            ref for ref in doc.get("ref_docs", [])
+            if (ref_key := node_key(*_ref_ids(ref, source))) and admit(ref_key)
+        ]
+        previous = documents.get(key)
+        if previous is not None:
+            doc["depth"] = min(previous["depth"], level)
+        documents[key] = doc
+        return doc
+
+    seen.update(key for key in (node_key(*_doc_ids(seed)) for seed in seeds) if key)
+    current = [add_document(seed, 0) for seed in seeds]
+
+    for level in range(1, depth):
+        if progress:
+            progress(level, depth, f"Nivel {level}: {len(current)} documentos en la frontera")
+
+        # Siguiente frontera (clave canónica -> (ids, referencia)): referencias
+        # y/o citantes no expandidos todavía; un documento visto por DOI y por
+        # Scopus ID se expande una sola vez
+        frontier = {}
+        if follow_refs:
+            for doc in current:
+                for ref in doc["ref_docs"][:fan_out]:
+                    ids = _ref_ids(ref, source)
+                    key = node_key(*ids)
+                    if key and key not in documents and key not in frontier:
+                        frontier[key] = (ids, ref)
+
+        if follow_citing:
+            citing, errors = bounded_map(
+                lambda ids: _citing_scopus(ids, fan_out), [_doc_ids(doc) for doc in current], max_workers
+            )
+            for ids, error in errors.items():
+                print(f"⚠️ Error buscando citantes de {ids}: {error}")
+            for doc in current:
+                cited_ref = _as_ref(doc)
+                for result in citing.get(_doc_ids(doc), [])[:fan_out]:
+                    citing_doc = result._asdict()
+                    citing_ids = _doc_ids(citing_doc)
+                    key = node_key(*citing_ids)
+                    if key in documents or not admit(key):
+                        continue
+                    # El citante entra con la arista hacia el citado; si se expande se completa
+                    citing_doc["ref_docs"] = [cited_ref]
+                    add_document(citing_doc, level)
+                    frontier.setdefault(key, (citing_ids, _as_ref(citing_doc)))
+
+        if not frontier:
+            break
+
+        expanded, errors = bounded_map(lambda key: expand(*frontier[key]), list(frontier), max_workers)
+        for key, error in errors.items():
+            print(f"⚠️ Error expandiendo {key}: {error}")
+
+        current = []
+        for key in frontier:
+            doc = expanded.get(key)
+            if doc is None:
+                continue
+            previous = documents.get(key)
+            if previous is not None:
+                # Conservar la arista citante -> citado además de las referencias completas
+                doc["ref_docs"] = previous["ref_docs"] + doc["ref_docs"]
+                doc = {**previous, **{k: v for k, v in doc.items() if v}}
+            current.append(add_document(doc, level))
+
+        print(f"🕸️ Nivel {level}: {len(current)} documentos expandidos, {len(seen)} nodos en total")
+        if len(seen) >= max_nodes:
+            print("⚠️ Se alcanzó el número máximo de nodos del rastreo")
+            break
+
+    return list(documents.values())
@@ -0,0 +1,550 @@
+"""
+Almacén columnar (Parquet) para rankings masivos a partir de volcados bibliográficos.
+
+La ingesta (``ingesta.py``) recorre los ficheros del volcado registro a registro
+(snapshots JSON de CrossRef, exportaciones CSV/JSON de Scopus) y los escribe
+por lotes en ficheros Parquet dentro de ``COLUMNAR_PATH``:
+
+- ``articles/``: un registro por documento con los campos que usa
+  ``rank_articles`` (clave, título, DOI, EID, año, citas, autores, ISSN...).
+- ``edges/``: pares (documento, referencia) con las claves ``doi:<doi>`` o
+  ``scopus:<id>``; solo los volcados de CrossRef traen referencias con DOI.
+
+Cada ingesta añade ficheros nuevos (``part-<fecha>.parquet``) sin reescribir
+los anteriores. La lectura abre los ficheros con memoria mapeada y los recorre
+por lotes, así que ni la ingesta ni el ranking cargan el volcado entero en RAM.
+"""
+import csv
+import glob
+import gzip
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ranking.articulo import Article, crossref_year, to_int
+from ranking.puntuacion import score_batch, top_k_indices, valid_year_mask
+from servicios import ajustes
+from servicios.fuentes import entry_to_scopus_document
+from servicios.identidad import alias_keys
+
+
+ARTICLE_SCHEMA = pa.schema([
+    ("key", pa.string()),
+    ("source", pa.string()),
+    ("title", pa.string()),
+    ("doi", pa.string()),
+    ("eid", pa.string()),
+    ("year", pa.int32()),
+    ("citations", pa.int64()),
+    ("author_names", pa.list_(pa.string())),
+    ("author_ids", pa.list_(pa.string())),
+    ("keywords", pa.string()),
+    ("issn", pa.string()),
+    ("publication_name", pa.string()),
+])
+
+EDGE_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("target", pa.string()),
+])
+
+FORMATS = ("crossref", "scopus-csv", "scopus-json")
+
+
+def record_key(doi=None, eid=None):
+    """
+    Clave del documento con el mismo formato que los alias del índice de
+    identidades (``doi:<doi>`` si lo hay, si no ``scopus:<id>``).
+    """
+    aliases = alias_keys(doi=doi, eid=eid)
+    return aliases[0] if aliases else None
+
+
+# --- Lectura de los volcados (generadores de (registro, referencias)) ---
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+# Tamaño de los bloques en que se leen los ficheros JSON
+JSON_CHUNK_SIZE = 1 << 20
+
+_NOT_SPACE = re.compile(r"\S")
+# Lo que puede quedar de un número cortado al final del búfer ("1." de "1.5")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+_INCOMPLETE = object()
+
+
+class _JSONStream:
+    """
+    Lector incremental de JSON: decodifica valor a valor con ``raw_decode`` sobre
+    un búfer que se rellena por bloques, así que en memoria solo hay el bloque
+    actual y el valor que se está leyendo, no el fichero entero.
+    """
+    decoder = json.JSONDecoder()
+
+    def __init__(self, handle, chunk_size=JSON_CHUNK_SIZE):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        if self.eof:
+            return False
+        chunk = self.handle.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Se descarta lo ya leído para que el búfer no crezca con el fichero
+        self.buffer, self.pos = self.buffer[self.pos:] + chunk, 0
+        return True
+
+    def peek(self):
+        """
+        Siguiente carácter que no es un espacio ("" al final del fichero).
+        """
+        while True:
+            match = _NOT_SPACE.search(self.buffer, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buffer[self.pos]
+            self.pos = len(self.buffer)
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON no válido: se esperaba {char!r} y hay {self.peek()!r}")
+        self.pos += 1
+
+    def value(self, buffered_only=False):
+        """
+        Decodifica el siguiente valor. Con ``buffered_only`` no se leen más
+        bloques si el valor no cabe en el búfer: se devuelve ``_INCOMPLETE``.
+        """
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # Un número al final del búfer puede seguir en el bloque siguiente
+                if self.eof or not _NUMBER_TAIL.fullmatch(self.buffer, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                if buffered_only:
+                    return _INCOMPLETE
+            # Cada reintento vuelve a decodificar desde el principio del valor,
+            # así que los bloques crecen para que un valor grande no cueste O(n²)
+            self._fill(size)
+            size *= 2
+
+
+def _unwrap(data, containers):
+    for container in containers:
+        if isinstance(data, dict):
+            data = data.get(container, data)
+    yield from (data if isinstance(data, list) else [data])
+
+
+def _iter_json_array(stream):
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.pos += 1
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() != ",":
+            stream.expect("]")
+            return
+        stream.pos += 1
+
+
+def _iter_json_object(stream, containers):
+    """
+    Recorre un objeto clave a clave y entra en la primera de ``containers`` que
+    aparezca (p. ej. "message" y luego "items"). Si no tiene ninguna, el objeto
+    entero es un elemento.
+    """
+    stream.expect("{")
+    fields, found = {}, False
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key in containers and stream.peek() in ("[", "{"):
+            found = True
+            if stream.peek() == "[":
+                yield from _iter_json_array(stream)
+            else:
+                yield from _iter_json_object(stream, containers[containers.index(key) + 1:])
+        else:
+            fields[key] = stream.value()
+        if stream.peek() != ",":
+            break
+        stream.pos += 1
+    stream.expect("}")
+    if not found:
+        yield fields
+
+
+def _iter_json_items(path, *containers):
+    """
+    Elementos de un fichero JSON: una lista, una lista dentro de ``containers``
+    (p. ej. "items") o varios valores seguidos (JSON Lines). Se lee en
+    streaming; los valores pequeños (líneas de JSON Lines, respuestas de una
+    página) se decodifican de una vez y los grandes se recorren elemento a
+    elemento.
+    """
+    with _open_text(path) as handle:
+        stream = _JSONStream(handle)
+        while True:
+            char = stream.peek()
+            if not char:
+                return
+            if char == "[":
+                yield from _iter_json_array(stream)
+            elif char == "{":
+                value = stream.value(buffered_only=True)
+                if value is _INCOMPLETE:
+                    yield from _iter_json_object(stream, containers)
+                else:
+                    yield from _unwrap(value, containers)
+            else:
+                raise ValueError(f"JSON no válido: se esperaba una lista o un objeto y hay {char!r}")
+
+
+def _crossref_record(item):
+    doi = item.get("DOI")
+    authors = [
+        " ".join(part for part in (author.get("given"), author.get("family")) if part) or author.get("name")
+        for author in item.get("author") or []
+    ]
+    record = {
+        "key": record_key(doi=doi),
+        "source": "crossref",
+        "title": (item.get("title") or [None])[0],
+        "doi": doi,
+        "eid": None,
+        "year": crossref_year(item),
+        "citations": to_int(item.get("is-referenced-by-count")) or 0,
+        "author_names": [name or "Autor desconocido" for name in authors],
+        "author_ids": [],
+        "keywords": "; ".join(item.get("subject") or []) or None,
+        "issn": (item.get("ISSN") or [None])[0],
+        "publication_name": (item.get("container-title") or [None])[0],
+    }
+    refs = [record_key(doi=ref.get("DOI")) for ref in item.get("reference") or [] if ref.get("DOI")]
+    return record, refs
+
+
+def iter_crossref(path):
+    """
+    Trabajos de un fichero del snapshot de CrossRef (``{"items": [...]}``,
+    respuesta de la API o JSON Lines, con o sin gzip).
+    """
+    for item in _iter_json_items(path, "message", "items"):
+        yield _crossref_record(item)
+
+
+def _scopus_record(doc):
+    cover_date = doc.coverDate
+    return {
+        "key": record_key(doi=doc.doi, eid=doc.eid),
+        "source": "scopus",
+        "title": doc.title,
+        "doi": doc.doi,
+        "eid": doc.eid,
+        "year": to_int(str(cover_date)[:4]) if cover_date else None,
+        "citations": to_int(doc.citedby_count) or 0,
+        "author_names": [name.strip() for name in (doc.author_names or "").split(";") if name.strip()],
+        "author_ids": [author_id.strip() for author_id in (doc.author_ids or "").split(";") if author_id.strip()],
+        "keywords": doc.authkeywords,
+        "issn": doc.issn,
+        "publication_name": doc.publicationName,
+    }, []
+
+
+def iter_scopus_json(path):
+    """
+    Documentos de una exportación JSON de la Scopus Search API (respuestas
+    completas, lista de entradas o JSON Lines).
+    """
+    for entry in _iter_json_items(path, "search-results", "entry"):
+        if "error" not in entry:
+            yield _scopus_record(entry_to_scopus_document(entry))
+
+
+def iter_scopus_csv(path):
+    """
+    Documentos de una exportación CSV de Scopus. Las referencias del CSV son
+    texto libre sin identificadores, así que no se generan aristas.
+    """
+    with _open_text(path) as handle:
+        for row in csv.DictReader(handle):
+            doi, eid = row.get("DOI") or None, row.get("EID") or None
+            names = row.get("Author full names") or row.get("Authors") or ""
+            yield {
+                "key": record_key(doi=doi, eid=eid),
+                "source": "scopus",
+                "title": row.get("Title") or None,
+                "doi": doi,
+                "eid": eid,
+                "year": to_int(row.get("Year")),
+                "citations": to_int(row.get("Cited by")) or 0,
+                "author_names": [name.strip() for name in names.split(";") if name.strip()],
+                "author_ids": [
+                    author_id.strip() for author_id in (row.get("Author(s) ID") or "").split(";") if author_id.strip()
+                ],
+                "keywords": row.get("Author Keywords") or None,
+                "issn": row.get("ISSN") or None,
+                "publication_name": row.get("Source title") or None,
+            }, []
+
+
+READERS = {
+    "crossref": iter_crossref,
+    "scopus-csv": iter_scopus_csv,
+    "scopus-json": iter_scopus_json,
+}
+
+
+def expand_paths(paths):
+    """
+    Ficheros a ingerir: los directorios se recorren enteros, en orden.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(
+                file for file in glob.glob(os.path.join(path, "**", "*"), recursive=True) if os.path.isfile(file)
+            )
+        else:
+            yield path
+
+
+# --- Escritura ---
+
+class _PartWriter:
+    """
+    Acumula filas y las escribe como grupos de filas de un fichero Parquet.
+    """
+    def __init__(self, path, schema, batch_size):
+        self.path = path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.rows = []
+        self.written = 0
+        self._writer = None
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        self._writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+        self.written += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def ingest(paths, fmt, out_dir=ajustes.COLUMNAR_PATH, batch_size=ajustes.INGEST_BATCH_SIZE, progress=None):
+    """
+    Ingiere los ficheros de ``paths`` (formato ``fmt``) en el almacén columnar.
+    ``progress(ficheros, registros)`` se llama al terminar cada fichero.
+    Devuelve el número de documentos y aristas escritos.
+    """
+    if fmt not in READERS:
+        raise ValueError(f"Formato desconocido: {fmt}")
+
+    reader = READERS[fmt]
+    part = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.parquet"
+    articles = _PartWriter(os.path.join(out_dir, "articles", part), ARTICLE_SCHEMA, batch_size)
+    edges = _PartWriter(os.path.join(out_dir, "edges", part), EDGE_SCHEMA, batch_size)
+    skipped = 0
+
+    try:
+        for files, path in enumerate(expand_paths(paths), 1):
+            try:
+                for record, refs in reader(path):
+                    if not record["key"]:
+                        skipped += 1
+                        continue
+                    articles.add(record)
+                    for ref in refs:
+                        if ref and ref != record["key"]:
+                            edges.add({"source": record["key"], "target": ref})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Error leyendo {path}: {e}")
+            if progress:
+                progress(files, articles.written + len(articles.rows))
+    finally:
+        articles.close()
+        edges.close()
+
+    return {"articles": articles.written, "edges": edges.written, "skipped": skipped}
+
+
+# --- Lectura del almacén ---
+
+def _top_unique(scores, keys, k):
+    """
+    Índices de las ``k`` mejores puntuaciones sin repetir clave (de cada artículo
+    se queda su mejor puntuación; las filas sin clave no se agrupan). ``keys`` es
+    la columna de claves de Arrow alineada con ``scores``.
+    """
+    size = k
+    while True:
+        candidates = top_k_indices(scores, size)
+        candidate_keys = keys.take(pa.array(candidates)).to_pylist() if len(candidates) else []
+        seen, keep = set(), []
+        for index, key in zip(candidates, candidate_keys):
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            keep.append(index)
+            if len(keep) == k:
+                break
+        # Con claves repetidas entre los candidatos puede faltar alguno: se amplía la búsqueda
+        if k is None or len(keep) == k or size >= len(scores):
+            return np.asarray(keep, dtype=np.intp)
+        size *= 2
+
+
+class ColumnarStore:
+    def __init__(self, path=ajustes.COLUMNAR_PATH, batch_size=ajustes.INGEST_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+
+    def _files(self, table):
+        return sorted(glob.glob(os.path.join(self.path, table, "*.parquet")))
+
+    def iter_batches(self, table="articles", columns=None):
+        """
+        Recorre una tabla por lotes (``RecordBatch``) con los ficheros mapeados en memoria.
+        """
+        for path in self._files(table):
+            parquet = pq.ParquetFile(path, memory_map=True)
+            yield from parquet.iter_batches(batch_size=self.batch_size, columns=columns)
+
+    def version(self):
+        """
+        Identificador que cambia con cada ingesta (ficheros, tamaño y fecha).
+        """
+        files = self._files("articles") + self._files("edges")
+        stats = [os.stat(path) for path in files]
+        return f"{len(files)}:{sum(s.st_size for s in stats)}:{max((s.st_mtime for s in stats), default=0)}"
+
+    def edge_arrays(self):
+        """
+        Devuelve ``(nodos, origenes, destinos)``: la lista de claves y, para cada
+        arista, los índices de sus extremos (codificados con diccionario de Arrow,
+        sin pasar por Python arista a arista).
+        """
+        sources, targets = [], []
+        for batch in self.iter_batches("edges"):
+            sources.append(batch.column("source"))
+            targets.append(batch.column("target"))
+        if not sources:
+            return [], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        keys = pa.chunked_array(sources + targets).combine_chunks()
+        encoded = pc.dictionary_encode(keys)
+        indices = encoded.indices.to_numpy().astype(np.int64)
+        n_edges = sum(len(chunk) for chunk in sources)
+        return encoded.dictionary.to_pylist(), indices[:n_edges], indices[n_edges:]
+
+    def stats(self):
+        counts = {}
+        for table in ("articles", "edges"):
+            counts[table] = sum(pq.ParquetFile(path).metadata.num_rows for path in self._files(table))
+        return {**counts, "files": len(self._files("articles")), "path": self.path}
+
+    @staticmethod
+    def _to_articles(table):
+        return [
+            Article(
+                row["source"], title=row["title"], doi=row["doi"], eid=row["eid"], year=row["year"],
+                citations=row["citations"] or 0, author_names=row["author_names"] or (),
+                author_ids=row["author_ids"] or (), keywords=row["keywords"], issn=row["issn"],
+                publication_name=row["publication_name"],
+            )
+            for row in table.to_pylist()
+        ]
+
+    def rank(self, alpha=0.7, beta=0.2, gamma=0.1, top_k=100, fecha_inicio=None, fecha_fin=None,
+             delta=0.0, ranks=None):
+        """
+        Ordena todo el almacén con la misma puntuación que ``rank_articles`` y
+        devuelve los ``top_k`` mejores como ``Article`` (todos con ``top_k=None``).
+        Cada lote se puntúa con NumPy y solo se conservan sus mejores candidatos,
+        así que la memoria no depende del tamaño del almacén. Un artículo que
+        aparece en varios ficheros ingeridos cuenta una sola vez. ``ranks`` ({clave: PageRank}) se suma
+        con peso ``delta``, normalizado por el mayor del grafo.
+        """
+        top_rank = max(ranks.values(), default=0.0) if (delta and ranks) else 0.0
+        best_scores, best_rows = np.empty(0), None
+
+        for batch in self.iter_batches("articles"):
+            years = batch.column("year").to_numpy(zero_copy_only=False).astype(np.float64)
+            citations = batch.column("citations").to_numpy(zero_copy_only=False).astype(np.float64)
+
+            mask = valid_year_mask(years)
+            with np.errstate(invalid="ignore"):
+                if fecha_inicio:
+                    mask &= years >= fecha_inicio
+                if fecha_fin:
+                    mask &= years <= fecha_fin
+            valid = np.flatnonzero(mask)
+            if len(valid) == 0:
+                continue
+
+            scores = score_batch(citations[valid], years[valid], alpha, beta, gamma)
+            keys = batch.column("key").take(pa.array(valid))
+            if top_rank:
+                scores = scores + delta * np.fromiter(
+                    (ranks.get(key, 0.0) / top_rank for key in keys.to_pylist()), dtype=np.float64, count=len(keys)
+                )
+
+            keep = _top_unique(scores, keys, top_k)
+            rows = pa.Table.from_batches([batch.take(pa.array(valid[keep]))])
+            best_scores = np.concatenate([best_scores, scores[keep]])
+            best_rows = rows if best_rows is None else pa.concat_tables([best_rows, rows])
+
+            # Quedarse solo con los ``top_k`` mejores hasta ahora, sin repetir artículo entre lotes
+            if top_k is not None:
+                keep = _top_unique(best_scores, best_rows.column("key"), top_k)
+                best_scores, best_rows = best_scores[keep], best_rows.take(pa.array(keep))
+
+        if best_rows is None:
+            return []
+
+        order = _top_unique(best_scores, best_rows.column("key"), top_k)
+        articles = self._to_articles(best_rows.take(pa.array(order)))
+        for article, score in zip(articles, best_scores[order]):
+            article.score = float(score)
+        return articles
+
+
+columnar_store = ColumnarStore()
@@ -0,0 +1,154 @@
+"""
+Registro compacto y común para los artículos de Scopus, CrossRef y Google Scholar.
+
+Cada fuente tiene un adaptador que rellena el registro una sola vez; a partir
+de ahí la puntuación, el filtrado y la serialización trabajan solo con
+``Article``, sin conservar el objeto original de la API.
+"""
+from litstudy.sources.crossref import CrossRefDocument
+
+
+class Article:
+    __slots__ = (
+        "source", "title", "doi", "eid", "year", "citations",
+        "author_names", "author_ids", "keywords", "issn", "publication_name",
+        "link", "author_h_index", "scholar_author_id",
+        "score", "scimago_rank", "snip", "journal_h_index", "publisher",
+    )
+
+    def __init__(self, source, title=None, doi=None, eid=None, year=None, citations=0,
+                 author_names=(), author_ids=(), keywords=None, issn=None, publication_name=None,
+                 link=None, author_h_index=None, scholar_author_id=None):
+        self.source = source
+        self.title = title
+        self.doi = doi
+        self.eid = eid
+        self.year = year
+        self.citations = citations
+        self.author_names = tuple(author_names)
+        self.author_ids = tuple(author_ids)
+        self.keywords = keywords
+        self.issn = issn
+        self.publication_name = publication_name
+        self.link = link
+        self.author_h_index = author_h_index
+        self.scholar_author_id = scholar_author_id
+
+        # Se rellenan al ordenar (rank_articles)
+        self.score = 0.0
+        self.scimago_rank = None
+        self.snip = None
+        self.journal_h_index = None
+        self.publisher = "Desconocido"
+
+    def __repr__(self):
+        return f"Article(source={self.source!r}, title={self.title!r}, year={self.year!r}, citations={self.citations!r})"
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _split(value, sep=";"):
+    return tuple(part.strip() for part in value.split(sep)) if value else ()
+
+
+def from_scopus(doc):
+    """
+    Adapta un documento de ``ScopusSearch`` (namedtuple).
+    """
+    cover_date = getattr(doc, "coverDate", None)
+    return Article(
+        "scopus",
+        title=getattr(doc, "title", None),
+        doi=getattr(doc, "doi", None),
+        eid=getattr(doc, "eid", None),
+        year=to_int(str(cover_date)[:4]) if cover_date else None,
+        citations=to_int(getattr(doc, "citedby_count", None)) or 0,
+        author_names=_split(getattr(doc, "author_names", None)),
+        author_ids=_split(getattr(doc, "author_ids", None)),
+        keywords=getattr(doc, "authkeywords", None),
+        issn=getattr(doc, "issn", None),
+        publication_name=getattr(doc, "publicationName", None),
+    )
+
+
+def crossref_year(entry):
+    """
+    Año de publicación de un trabajo de CrossRef. ``publication_date`` de
+    litstudy solo mira "published-print" (y falla con el formato
+    ``[[año, mes]]``), así que se prueban también "issued" y "published".
+    """
+    for field in ("published-print", "issued", "published"):
+        try:
+            return to_int(entry[field]["date-parts"][0][0])
+        except (KeyError, IndexError, TypeError):
+            continue
+    return None
+
+
+def from_crossref(doc):
+    """
+    Adapta un ``CrossRefDocument`` de litstudy.
+    """
+    pub_date = doc.publication_date
+    entry = doc.entry or {}
+    return Article(
+        "crossref",
+        title=doc.title,
+        doi=doc.id.doi,
+        year=pub_date.year if pub_date else crossref_year(entry),
+        citations=doc.citation_count or 0,
+        author_names=[author.name if author.name else "Autor desconocido" for author in (doc.authors or [])],
+        issn=(entry.get("ISSN") or [None])[0],
+        publication_name=(entry.get("container-title") or [None])[0],
+    )
+
+
+def from_scholar(result):
+    """
+    Adapta un resultado de Google Scholar ya procesado por ``get_scholar_articles``.
+    """
+    keywords = []
+    for entry in result.get("keywords", []):
+        if isinstance(entry, dict):
+            keywords.extend(entry.get("keywords", []))
+
+    return Article(
+        "scholar",
+        title=result.get("title"),
+        year=to_int(result.get("year")),
+        citations=to_int(result.get("citations")) or 0,
+        author_names=[author["name"] for author in result.get("authors", []) if isinstance(author, dict)],
+        keywords=keywords,
+        publication_name=result.get("source"),
+        link=result.get("link"),
+        author_h_index=result.get("h_index") or {},
+        scholar_author_id=result.get("author_id"),
+    )
+
+
+ADAPTERS = {
+    "scopus": from_scopus,
+    "crossref": from_crossref,
+    "scholar": from_scholar,
+}
+
+
+def to_article(item, source):
+    """
+    Convierte un resultado de cualquier fuente en ``Article`` (si ya lo es, lo devuelve tal cual).
+    Devuelve ``None`` si el resultado no es del tipo esperado.
+    """
+    if isinstance(item, Article):
+        return item
+    if source == "crossref" and not isinstance(item, CrossRefDocument):
+        return None
+    if source == "scholar" and not isinstance(item, dict):
+        return None
+
+    adapter = ADAPTERS.get(source)
+    return adapter(item) if adapter else None
@@ -0,0 +1,247 @@
+"""
+Espejo local (SQLite + FTS5) de los artículos obtenidos de las fuentes.
+
+Cada búsqueda en vivo guarda sus ``Article`` (título, autores, keywords, año,
+DOI, citas...) en la tabla ``records`` y en el índice de texto completo
+``records_fts``, y recuerda qué registros devolvió cada consulta. Con eso:
+
+- una consulta repetida se responde desde el espejo mientras no haya caducado
+  (``MIRROR_TTL``) y solo se vuelve a la API cuando los datos están viejos;
+- la fuente ``local`` busca por título, keywords o autor en todo lo guardado,
+  sin consultar ninguna API.
+"""
+import json
+import time
+
+from ranking.articulo import Article
+from servicios import ajustes
+from servicios.basedatos import SQLiteStore
+from servicios.identidad import identity_index
+
+
+# Campos de ``Article`` que se guardan (los de la puntuación se recalculan al ordenar)
+RECORD_FIELDS = (
+    "source", "title", "doi", "eid", "year", "citations", "author_names", "author_ids",
+    "keywords", "issn", "publication_name", "link", "author_h_index", "scholar_author_id",
+)
+
+# Columnas del índice de texto completo en las que busca cada tipo de búsqueda
+SEARCH_COLUMNS = {
+    "title": "title",
+    "keywords": "{title keywords}",
+    "author": "authors",
+}
+
+# Preferencia al quitar duplicados del mismo documento entre fuentes
+SOURCE_PREFERENCE = ("scopus", "crossref", "scholar")
+
+
+def normalize_query(query):
+    return " ".join(str(query or "").lower().split())
+
+
+def fts_query(query, search_type="title"):
+    """
+    Expresión MATCH de FTS5: todas las palabras de la consulta (entre comillas,
+    para que no se interpreten como operadores) en las columnas del tipo de búsqueda.
+    """
+    words = "".join(char if char.isalnum() else " " for char in str(query or "")).split()
+    if not words:
+        return None
+    terms = " AND ".join(f'"{word}"' for word in words)
+    return f"{SEARCH_COLUMNS.get(search_type, 'title')} : ({terms})"
+
+
+def _keywords_text(keywords):
+    if not keywords:
+        return ""
+    if isinstance(keywords, str):
+        return keywords.replace("|", " ")
+    return " ".join(str(keyword) for keyword in keywords)
+
+
+class LocalMirror(SQLiteStore):
+    def __init__(self, path, ttl=ajustes.DAY):
+        self.ttl = ttl
+        super().__init__(path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                canonical TEXT,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5("
+            "title, keywords, authors, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        # Consultas en vivo ya hechas y los registros que devolvieron, en orden
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS queries (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                search_type TEXT NOT NULL,
+                query TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                UNIQUE (source, search_type, query)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_results (
+                query_id INTEGER NOT NULL,
+                record_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (query_id, position)
+            )
+            """
+        )
+
+    @staticmethod
+    def _record_key(article):
+        canonical = identity_index.resolve(doi=article.doi, eid=article.eid)
+        if canonical:
+            return f"{article.source}:{canonical}", canonical
+        # Resultados de Scholar sin DOI: el enlace (o el título) identifica el registro
+        fallback = article.link or normalize_query(article.title)
+        return (f"{article.source}:{fallback}", None) if fallback else (None, None)
+
+    @staticmethod
+    def _to_article(data):
+        return Article(**{field: data[field] for field in RECORD_FIELDS if field in data})
+
+    def _fresh_since(self):
+        return time.time() - self.ttl
+
+    def store(self, articles, source, search_type, query):
+        """
+        Guarda (o actualiza) los artículos de una búsqueda en vivo y la lista de
+        registros que devolvió la consulta.
+        """
+        rows = []
+        for article in articles:
+            key, canonical = self._record_key(article)
+            if not key:
+                continue
+            data = {field: getattr(article, field) for field in RECORD_FIELDS}
+            for field in ("author_names", "author_ids"):
+                data[field] = list(data[field])
+            authors_text = " ".join(article.author_names or ())
+            rows.append((key, canonical, data, authors_text))
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            record_ids = []
+            for key, canonical, data, authors_text in rows:
+                conn.execute(
+                    "INSERT INTO records (key, canonical, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET canonical = excluded.canonical, "
+                    "data = excluded.data, updated_at = excluded.updated_at",
+                    (key, canonical, json.dumps(data, ensure_ascii=False, default=str), now),
+                )
+                record_id = conn.execute("SELECT id FROM records WHERE key = ?", (key,)).fetchone()[0]
+                conn.execute("DELETE FROM records_fts WHERE rowid = ?", (record_id,))
+                conn.execute(
+                    "INSERT INTO records_fts (rowid, title, keywords, authors) VALUES (?, ?, ?, ?)",
+                    (record_id, data.get("title") or "", _keywords_text(data.get("keywords")), authors_text),
+                )
+                record_ids.append(record_id)
+
+            conn.execute(
+                "INSERT INTO queries (source, search_type, query, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source, search_type, query) DO UPDATE SET fetched_at = excluded.fetched_at",
+                (source, search_type, normalize_query(query), now),
+            )
+            query_id = conn.execute(
+                "SELECT id FROM queries WHERE source = ? AND search_type = ? AND query = ?",
+                (source, search_type, normalize_query(query)),
+            ).fetchone()[0]
+            conn.execute("DELETE FROM query_results WHERE query_id = ?", (query_id,))
+            conn.executemany(
+                "INSERT INTO query_results (query_id, record_id, position) VALUES (?, ?, ?)",
+                [(query_id, record_id, position) for position, record_id in enumerate(dict.fromkeys(record_ids))],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def cached_results(self, source, search_type, query):
+        """
+        Artículos que devolvió la misma consulta en vivo, o ``None`` si no se
+        ha hecho nunca o ha caducado (entonces hay que ir a la fuente).
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id FROM queries WHERE source = ? AND search_type = ? AND query = ? AND fetched_at > ?",
+            (source, search_type, normalize_query(query), self._fresh_since()),
+        ).fetchone()
+        if row is None:
+            return None
+
+        rows = conn.execute(
+            "SELECT r.data FROM query_results q JOIN records r ON r.id = q.record_id "
+            "WHERE q.query_id = ? ORDER BY q.position",
+            (row[0],),
+        ).fetchall()
+        return [self._to_article(json.loads(data)) for (data,) in rows]
+
+    def search(self, query, search_type="title", sources=None, limit=ajustes.MIRROR_SEARCH_LIMIT):
+        """
+        Busca en todos los registros guardados con FTS5 (los más relevantes
+        según bm25 primero). Un mismo documento que está en varias fuentes se
+        devuelve una sola vez, preferentemente el de Scopus.
+        """
+        match = fts_query(query, search_type)
+        if not match:
+            return []
+
+        sql = (
+            "SELECT r.canonical, r.data FROM records_fts f JOIN records r ON r.id = f.rowid "
+            "WHERE records_fts MATCH ?"
+        )
+        params = [match]
+        if sources:
+            sql += f" AND json_extract(r.data, '$.source') IN ({','.join('?' * len(sources))})"
+            params.extend(sources)
+        sql += " ORDER BY bm25(records_fts) LIMIT ?"
+        params.append(limit)
+
+        found = {}
+        for position, (canonical, data) in enumerate(self._connect().execute(sql, params)):
+            article = self._to_article(json.loads(data))
+            key = canonical or f"record:{position}"
+            previous = found.get(key)
+            if previous is None or (
+                SOURCE_PREFERENCE.index(article.source) < SOURCE_PREFERENCE.index(previous.source)
+            ):
+                found[key] = article
+        return list(found.values())
+
+    def clear(self):
+        conn = self._connect()
+        for table in ("records", "records_fts", "queries", "query_results"):
+            conn.execute(f"DELETE FROM {table}")
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "records": conn.execute("SELECT COUNT(*) FROM records").fetchone()[0],
+            "queries": conn.execute("SELECT COUNT(*) FROM queries").fetchone()[0],
+            "fresh_queries": conn.execute(
+                "SELECT COUNT(*) FROM queries WHERE fetched_at > ?", (self._fresh_since(),)
+            ).fetchone()[0],
+        }
+
+
+local_mirror = LocalMirror(ajustes.MIRROR_PATH, ttl=ajustes.MIRROR_TTL)
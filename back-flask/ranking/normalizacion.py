@@ -0,0 +1,133 @@
+"""
+Serialización de los ``Article`` ya ordenados por ``LitStudy.rank_articles`` al
+formato que devuelve ``/search_and_rank``.
+
+Cada fuente se recorre una sola vez: los artículos que llegan aquí son los
+mismos que se ordenaron, sin volver a consultar la API.
+"""
+from servicios.autores import author_resolver
+
+
+def normalize_scopus(ranked_articles):
+    """
+    Normaliza artículos de Scopus, resolviendo el h-index de cada autor distinto una sola vez.
+    """
+    author_profiles = author_resolver.resolve(
+        author_id for article in ranked_articles for author_id in article.author_ids
+    )
+
+    normalized = []
+    for article in ranked_articles:
+        if not article.title or not article.author_names:
+            continue
+
+        journal_h_index = [
+            {"year": getattr(item, "year", "Desconocido"), "citescore": getattr(item, "citescore", "No disponible")}
+            for item in (article.journal_h_index or []) if item is not None
+        ]
+
+        # 🔹 Asegurar que los IDs correspondan con los nombres en orden
+        author_data = {}
+        for author_name, author_id in zip(article.author_names, article.author_ids):
+            if author_id:
+                author = author_profiles.get(author_id)
+                author_data[author_id] = {
+                    "name": author_name,
+                    "h_index": author.h_index if author else "No disponible"
+                }
+
+        normalized.append({
+            "title": article.title,
+            "citation_count": article.citations,
+            "publication_year": article.year or "Desconocido",
+            "authors": author_data,
+            "h_index": {},
+            "keywords": article.keywords or 'No disponibles',
+            "journal_h_index": journal_h_index,
+            "scimago_rank": article.scimago_rank,
+            "doi": article.doi or 'No disponibles',
+            "snip": article.snip,
+            "source": "scopus"
+        })
+
+    return normalized
+
+
+def normalize_crossref(ranked_articles):
+    """
+    Normaliza artículos de CrossRef.
+    """
+    return [
+        {
+            "title": article.title,
+            "citation_count": article.citations,
+            "publication_year": article.year or "Desconocido",
+            "authors": ", ".join(article.author_names or ["Autor desconocido"]),
+            "doi": article.doi,
+            "source": "crossref"
+        }
+        for article in ranked_articles
+    ]
+
+
+def normalize_scholar(ranked_articles):
+    """
+    Normaliza los resultados de Google Scholar.
+    """
+    return [
+        {
+            "title": article.title or "Sin título",
+            "citation_count": article.citations,
+            "publication_year": article.year or "Desconocido",
+            "authors": ", ".join(article.author_names or ["Sin autores"]),
+            "h_index": article.author_h_index or {},
+            "keywords": article.keywords or ["No disponible"],  # Si está vacío, mostrar "No disponible"
+            "link": article.link or "No disponible",
+            "author_id": article.scholar_author_id or "",
+            "source": "scholar"
+        }
+        for article in ranked_articles
+    ]
+
+
+def normalize_local(ranked_articles):
+    """
+    Normaliza los artículos del espejo local, cada uno con el formato de su
+    fuente original y conservando el orden.
+    """
+    # Los de Scopus sin título o autores se descartan igual que en normalize_scopus
+    ranked_articles = [
+        article for article in ranked_articles
+        if article.source in NORMALIZERS and (article.source != "scopus" or (article.title and article.author_names))
+    ]
+    by_source = {}
+    for article in ranked_articles:
+        by_source.setdefault(article.source, []).append(article)
+
+    normalized = {source: iter(NORMALIZERS[source](articles)) for source, articles in by_source.items()}
+    return [next(normalized[article.source]) for article in ranked_articles]
+
+
+NORMALIZERS = {
+    "scopus": normalize_scopus,
+    "crossref": normalize_crossref,
+    "scholar": normalize_scholar,
+}
+
+
+def normalize_results(source, ranked_articles, fecha_inicio=None, fecha_fin=None):
+    """
+    Aplica el filtro de años a los artículos ordenados de una fuente y los
+    convierte al formato de la respuesta. El filtro va primero para no
+    enriquecer artículos que se van a descartar.
+    """
+    normalizer = normalize_local if source == "local" else NORMALIZERS.get(source)
+    if normalizer is None or not ranked_articles:
+        return []
+
+    return normalizer([
+        article for article in ranked_articles
+        if article.year is not None
+        and (not fecha_inicio or article.year >= fecha_inicio)
+        and (not fecha_fin or article.year <= fecha_fin)
+    ])
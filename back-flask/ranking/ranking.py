@@ -1,11 +1,14 @@
-from datetime import datetime
-from pybliometrics.scopus import AuthorRetrieval, ScopusSearch
-from litstudy import search_crossref, refine_crossref
 from litstudy.sources.crossref import CrossRefDocument
+import numpy as np
 import pybliometrics
-from pybliometrics.scopus import SerialTitle
-from serpapi import GoogleSearch
-import requests
+from ranking.articulo import to_article
+from ranking.espejo import local_mirror
+from mapas.analisis import analyze_columnar, store_pagerank
+from ranking.puntuacion import extract_features, graph_signal, score_batch, top_k_indices, valid_year_mask
+from servicios.fuentes import CROSSREF_RANKING_FIELDS, author_retrieval, google_search, iter_crossref_works, iter_scopus_search
+from servicios.identidad import identity_index
+from servicios.indice_autores import author_index
+from servicios.revistas import journal_metrics, normalize_issn
 
 # Inicialización de la API de pybliometrics
 pybliometrics.scopus.init()
@@ -14,9 +17,11 @@ class LitStudy:
     def __init__(self, api_key):
         self.api_key = api_key
 
-    def get_scopus_articles(self, query, search_type="title", limit=100):
+    def get_scopus_articles(self, query, search_type="title", limit=100, sort="-citedby-count"):
         """
         Realiza una búsqueda en Scopus y retorna los artículos encontrados.
+        Solo se descargan las páginas necesarias para los ``limit`` primeros
+        según ``sort`` (por defecto, los más citados).
         """
 
         if search_type == "author":
@@ -28,15 +33,15 @@ class LitStudy:
         elif search_type == "title":
             query = f'TITLE("{query}")'
 
-        search = ScopusSearch(query, download=True)
+        results = list(iter_scopus_search(query, limit=limit, sort=sort))
 
-        if not search.results:
+        if not results:
             print("No se encontraron artículos para esta consulta.")
             return []
 
         articles = []
 
-        for article in search.results[:limit]:
+        for article in results:
             # Extraer y mostrar detalles básicos del artículo
             title = getattr(article, "title", "Sin título")
             doi = getattr(article, "doi", "Sin DOI")
@@ -58,7 +63,7 @@ class LitStudy:
         Obtiene el h-index de un autor desde Scopus usando su AUID.
         """
         try:
-            author = AuthorRetrieval(auid)
+            author = author_retrieval(auid)
             return author.h_index
         except Exception as e:
             print(f"Error al obtener el h-index de Scopus para el AUID {auid}: {e}")
@@ -67,13 +72,14 @@ class LitStudy:
     def get_crossref_articles(self, query, rows=100):
         """
         Busca artículos en CrossRef y extrae correctamente los autores y DOI.
+        Es un generador: los artículos se piden por páginas (cursor) y se
+        entregan según llegan, sin cargar toda la búsqueda en memoria.
         """
-        articles = search_crossref(query=query, limit=rows)
-        found, not_found = refine_crossref(articles)
+        found = 0
+        for item in iter_crossref_works(query, limit=rows, select=CROSSREF_RANKING_FIELDS):
+            article = CrossRefDocument(item)
+            found += 1
 
-        print(f"Artículos encontrados en CrossRef: {len(found)}, no encontrados: {len(not_found)}")
-
-        for article in found:
             pub_year = article.publication_date.year if article.publication_date else "Desconocido"
             # Extraer DOI
             doi = article.entry.get("DOI", "No disponible")
@@ -102,11 +108,10 @@ class LitStudy:
             print(f"Citas: {citation_count}")
             print(f"DOI: {doi}")  # Imprime el DOI
 
-        return found  # Devuelve los artículos
-    
+            yield article  # Devuelve los artículos según llegan
 
+        print(f"Artículos encontrados en CrossRef: {found}")
     
-    from serpapi import GoogleSearch
 
     def get_scholar_articles(self,query, search_type="title", limit=10):
         """
@@ -128,19 +133,18 @@ class LitStudy:
         params = {
             "engine": "google_scholar",
             "q": search_query,
-            "api_key": "813709d154c03e80cb6e34ea14964cff575713bc24ea0f42ea1dce046261e0f7",
             "num": limit
         }
         
         # Hacer la consulta a SerpApi
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        results = google_search(params)
         
         if not results.get("organic_results"):
             print("No se encontraron artículos para esta consulta.")
             return []
         
         articles = []
+        scholar_authors = []
         
         for result in results.get("organic_results", [])[:limit]:
             title = result.get("title", "Sin título")
@@ -162,6 +166,7 @@ class LitStudy:
             # Obtener h-index de los autores si tienen author_id
             h_index_data = {}
             keywords_data = []
+            author_id = None
 
             for author in authors:
                 author_name = author.get("name", "").strip()
@@ -169,6 +174,7 @@ class LitStudy:
                 if author_id:
                     h_index = self.get_h_index_scholar(author_id)
                     h_index_data[author["name"]] = h_index
+                    scholar_authors.append({"source": "scholar", "id": author_id, "name": author_name, "h_index": h_index})
                 # Solo buscar keywords si no se han obtenido aún
                 if not keywords_data:
                     keywords_data = self.get_scholar_keywords(author_name)
@@ -184,17 +190,21 @@ class LitStudy:
                 "keywords": keywords_data if keywords_data else ["No disponible"],
                 "h_index": h_index_data  # Diccionario con h-index de cada autor
             })
+
+        # Los autores de Scholar también alimentan el índice local de autores
+        try:
+            author_index.add_many(scholar_authors)
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el índice de autores: {e}")
         
         return articles
 
     def get_h_index_scholar(self,author_id):
         params = {
             "engine": "google_scholar_author",
-            "author_id": author_id,
-            "api_key": "813709d154c03e80cb6e34ea14964cff575713bc24ea0f42ea1dce046261e0f7"
+            "author_id": author_id
         }
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        results = google_search(params)
         h_index = None
         for entry in results.get("cited_by", {}).get("table", []):
             if "h_index" in entry:
@@ -210,12 +220,10 @@ class LitStudy:
         params = {
             "engine": "google_scholar_profiles",
             "mauthors": author_name,
-            "hl": "en",
-            "api_key": "813709d154c03e80cb6e34ea14964cff575713bc24ea0f42ea1dce046261e0f7"
+            "hl": "en"
         }
 
-        search = GoogleSearch(params)
-        data = search.get_dict()
+        data = google_search(params)
 
         # Extraer los keywords (interests)
         keywords = []
@@ -239,8 +247,10 @@ class LitStudy:
         Obtiene el CiteScore de una revista en Scopus dado su source_id.
         """
         try:
-            journal = SerialTitle(source_id)
-            return journal.citescoreyear_info.get("citeScore", "No disponible")
+            journal = journal_metrics.get(source_id)
+            if journal is None or journal.citescore is None:
+                return "No disponible"
+            return journal.citescore
         except Exception as e:
             print(f"Error al obtener el CiteScore para source_id {source_id}: {e}")
             return "Error"
@@ -252,7 +262,7 @@ class LitStudy:
         Obtiene el h-index de un autor desde Scopus usando su AUID.
         """
         try:
-            author = AuthorRetrieval(auid)
+            author = author_retrieval(auid)
             return author.h_index
         except Exception as e:
             print(f"Error al obtener el h-index de Scopus para el AUID {auid}: {e}")
@@ -262,34 +272,10 @@ class LitStudy:
         """
         Calcula la puntuación del artículo en función de citas, antigüedad y novedad.
         """
-        current_year = datetime.now().year
-
-        if source == "scopus":
-            citations = int(getattr(article, "citation_count", 0))
-            pub_year = None
-            if hasattr(article, "coverDate") and article.coverDate:
-                try:
-                    pub_year = int(article.coverDate[:4])  
-                except ValueError:
-                    pub_year = None
-
-        elif source == "crossref":
-            citations = article.citation_count or 0
-            pub_year = article.publication_date.year if article.publication_date else None
-
-        else:
-            pub_year = None
-
-        if pub_year is None:
-            return 0
+        citations, years = extract_features([to_article(article, source)])
+        return float(score_batch(citations, years, alpha, beta, gamma)[0])
 
-        novelty_divisor = max(current_year - pub_year + 1, 1)
-        novelty = 1 / novelty_divisor
-        antiquity = current_year - pub_year
-
-        return (alpha * citations) + (beta * novelty) + (gamma * antiquity)
-
-    def rank_articles(self, articles, alpha=0.7, beta=0.2, gamma=0.1, source="scopus"):
+    def rank_articles(self, articles, alpha=0.7, beta=0.2, gamma=0.1, source="scopus", top_k=None, delta=0.0):
         """
         Ordena los artículos en función de su puntuación y obtiene métricas de la revista (si aplica).
 
@@ -298,85 +284,53 @@ class LitStudy:
         :param beta: Peso para la antigüedad del artículo.
         :param gamma: Peso para el ranking de la revista.
         :param source: Fuente de los artículos ("scopus", "crossref", "scholar").
-        :return: Lista de artículos ordenados por relevancia.
+        :param top_k: Si se indica, solo se devuelven (y se enriquecen) los ``top_k`` mejores.
+        :param delta: Peso del PageRank del artículo en el almacén del grafo de citas (0 = sin usar).
+        :return: Lista de ``Article`` ordenados por relevancia, con ``score`` y las métricas de la revista.
         """
+        articles = [article for article in (to_article(item, source) for item in articles) if article is not None]
+        citations, years = extract_features(articles)
 
-        filtered_articles = []
-        current_year = datetime.now().year
-
-        for article in articles:
-            if source == "scopus":
-                pub_year = None
-                if hasattr(article, "coverDate") and article.coverDate:
-                    try:
-                        pub_year = int(article.coverDate[:4])
-                    except ValueError:
-                        pub_year = None
-
-            elif source == "crossref":
-                pub_year = article.publication_date.year if article.publication_date else None
-
-            elif source == "scholar":
-                # Google Scholar no tiene un campo claro para el año, lo extraemos de la fuente
-                pub_year = None
-                if "year" in article and article["year"]:
-                    try:
-                        pub_year = int(article["year"])
-                    except ValueError:
-                        pub_year = None
-
-            else:
-                pub_year = None
+        # Filtrar solo los artículos publicados en años válidos y puntuarlos todos de una vez
+        valid = np.flatnonzero(valid_year_mask(years))
+        scores = score_batch(citations[valid], years[valid], alpha, beta, gamma)
 
-            # Filtrar solo los artículos publicados en años válidos
-            if pub_year is not None and 1900 <= pub_year <= current_year:
-                filtered_articles.append(article)
+        # Señal opcional del grafo: PageRank del artículo entre los documentos ya rastreados
+        if delta:
+            # Solo lectura: los artículos de una búsqueda no se registran en el índice de identidades
+            keys = [identity_index.find(doi=articles[i].doi, eid=articles[i].eid) for i in valid]
+            scores = scores + delta * graph_signal(keys, store_pagerank())
 
         ranked_articles = []
-
-        for article in filtered_articles:
-            # Calcular la puntuación del artículo
-            score = self._calculate_score(article, alpha, beta, gamma, source)
-
-            # Obtener métricas de la revista solo para Scopus
-            if source == "scopus" and hasattr(article, "issn"):
-                issn = article.issn
-                scimago_rank, snip, journal_h_index, publisher = None, None, None, "Desconocido"
-                
-                if issn:
-                    try:
-                        journal = SerialTitle(issn)
-                        scimago_rank = journal.sjrlist[0][1] if journal.sjrlist else None
-                        snip = journal.sniplist[0][1] if journal.sniplist else None
-                        journal_h_index = journal.citescoreyearinfolist
-                        publisher = journal.publisher
-                    except Exception as e:
-                        print(f"Error al obtener métricas del ISSN {issn}: {e}")
-                
-                ranked_articles.append({
-                    "article": article,
-                    "score": score,
-                    "scimago_rank": scimago_rank,
-                    "snip": snip,
-                    "journal_h_index": journal_h_index,
-                    "publisher": publisher
-                })
-
-            else:
-                # Para Google Scholar y CrossRef, dejamos en None las métricas que no aplican
-                ranked_articles.append({
-                    "article": article,
-                    "score": score,
-                    "scimago_rank": None,
-                    "snip": None,
-                    "journal_h_index": None,
-                    "publisher": "Desconocido"
-                })
-
-        # Ordenar los artículos según la puntuación de mayor a menor
-        ranked_articles.sort(key=lambda x: x["score"], reverse=True)
+        for i in top_k_indices(scores, top_k):
+            article = articles[valid[i]]
+            article.score = float(scores[i])
+            ranked_articles.append(article)
+
+        # Métricas de la revista solo para los artículos de Scopus (también los del
+        # espejo local), todas de una vez (un ISSN distinto = una consulta)
+        scopus_articles = [article for article in ranked_articles if article.source == "scopus"]
+        if scopus_articles:
+            journals = journal_metrics.get_many(article.issn for article in scopus_articles)
+            for article in scopus_articles:
+                journal = journals.get(normalize_issn(article.issn))
+                if journal:
+                    article.scimago_rank = journal.sjr
+                    article.snip = journal.snip
+                    article.journal_h_index = journal.citescoreyearinfolist
+                    article.publisher = journal.publisher
 
         return ranked_articles
+    def rank_store(self, store, alpha=0.7, beta=0.2, gamma=0.1, top_k=100, fecha_inicio=None, fecha_fin=None,
+                   delta=0.0):
+        """
+        Ordena todos los documentos del almacén columnar (volcados ingeridos) sin
+        consultar ninguna API. Con ``delta`` se suma el PageRank del grafo de
+        referencias del propio almacén.
+        """
+        ranks = analyze_columnar(store)["pagerank"] if delta else None
+        return store.rank(alpha, beta, gamma, top_k, fecha_inicio, fecha_fin, delta=delta, ranks=ranks)
+
     def display_author_h_index(self, author_name, auid=None):
         """
         Muestra el índice h de un autor en Google Scholar y Scopus (si aplica).
@@ -385,10 +339,26 @@ class LitStudy:
             h_index_scopus = self.get_scopus_h_index(auid)
             print(f"Índice h en Scopus para {author_name} (AUID: {auid}): {h_index_scopus}")
 
-    def search_and_rank(self, query, source, search_type, alpha=0.7, beta=0.2, gamma=0.1):
+    def search_and_rank(self, query, source, search_type, alpha=0.7, beta=0.2, gamma=0.1, delta=0.0,
+                        local_first=False):
         """
         Busca artículos en una fuente y los ordena.
+
+        La fuente ``local`` busca solo en el espejo local. Con ``local_first``, una
+        consulta ya hecha a una fuente en vivo se responde desde el espejo
+        mientras no haya caducado; si no, se consulta la fuente y se guarda.
         """
+        if source == "local":
+            articles = local_mirror.search(query, search_type)
+            print(f"Artículos encontrados en el espejo local: {len(articles)}")
+            return self.rank_articles(articles, alpha, beta, gamma, source, delta=delta) if articles else None
+
+        if local_first:
+            articles = local_mirror.cached_results(source, search_type, query)
+            if articles is not None:
+                print(f"💾 {source}: {len(articles)} artículos desde el espejo local")
+                return self.rank_articles(articles, alpha, beta, gamma, source, delta=delta) if articles else None
+
         if source == "scopus":
             articles = self.get_scopus_articles(query,search_type)
         elif source == "crossref":
@@ -401,8 +371,15 @@ class LitStudy:
             print(f"Fuente desconocida: {source}")
             return None
 
+        # Guardar lo obtenido en el espejo local (para repeticiones y la fuente "local")
+        articles = [article for article in (to_article(item, source) for item in articles or []) if article is not None]
+        try:
+            local_mirror.store(articles, source, search_type, query)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la búsqueda en el espejo local: {e}")
+
         if articles:
-            ranked_articles = self.rank_articles(articles, alpha, beta, gamma, source)
+            ranked_articles = self.rank_articles(articles, alpha, beta, gamma, source, delta=delta)
             return ranked_articles
         else:
             print(f"No se encontraron artículos en {source}.")
@@ -417,23 +394,17 @@ class LitStudy:
         if source == "crossref":
             print(f"\nMejores artículos de {source.capitalize()}:")
             if ranked_articles:
-                for idx, entry in enumerate(ranked_articles[:top_n], 1):
-                    article = entry["article"]
-                    score = entry["score"]
-                    scimago_rank = entry["scimago_rank"]
-                    snip = entry["snip"]
-                    journal_h_index = entry["journal_h_index"]
-                    publisher = entry["publisher"]
-
-                    title = getattr(article, "title", "Sin título")
-
-                    # Intentamos obtener los autores de CrossRef
-                    authors = "Sin autores"
-                    if hasattr(article, 'authors') and article.authors:
-                        authors = ", ".join([f"{author.given} {author.family}" if hasattr(author, 'given') and hasattr(author, 'family') else "Autor desconocido" for author in article.authors]) 
-
-                    citations = getattr(article, "citation_count", 0)
-                    pub_year = getattr(article, "publication_date", "Desconocido")
+                for idx, article in enumerate(ranked_articles[:top_n], 1):
+                    score = article.score
+                    scimago_rank = article.scimago_rank
+                    snip = article.snip
+                    journal_h_index = article.journal_h_index
+                    publisher = article.publisher
+
+                    title = article.title or "Sin título"
+                    authors = ", ".join(article.author_names) or "Sin autores"
+                    citations = article.citations
+                    pub_year = article.year or "Desconocido"
 
                     # Formatear salida de autores con su H-index
                     print(f"{idx}. {title}")
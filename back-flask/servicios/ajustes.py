@@ -0,0 +1,146 @@
+"""
+Ajustes compartidos por los servicios del backend (rutas de datos, TTLs, límites).
+
+Todos los valores pueden sobrescribirse con variables de entorno para no tener
+que tocar el código al desplegar.
+"""
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Directorio donde se guardan las bases de datos locales (caché, índices...)
+DATA_DIR = os.getenv(
+    "REFERENCIAS_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datos"),
+)
+
+# Caché de respuestas de las APIs externas
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(DATA_DIR, "cache_respuestas.sqlite3"))
+CACHE_MAX_ENTRIES = _env_int("CACHE_MAX_ENTRIES", 50000)
+
+DAY = 24 * 60 * 60
+
+# TTL (en segundos) por endpoint externo. Se puede cambiar con CACHE_TTL_<ENDPOINT>.
+CACHE_TTLS = {
+    endpoint: _env_int(f"CACHE_TTL_{endpoint.upper()}", ttl)
+    for endpoint, ttl in {
+        "scopus_search": 1 * DAY,
+        "author_retrieval": 7 * DAY,
+        "serial_title": 180 * DAY,
+        "author_search": 7 * DAY,
+        "abstract_retrieval": 7 * DAY,
+        "crossref_search": 1 * DAY,
+        "crossref_work": 7 * DAY,
+        "serpapi": 1 * DAY,
+        "http": 1 * DAY,
+        "graph_layout": 30 * DAY,
+        "graph_analytics": 30 * DAY,
+    }.items()
+}
+CACHE_DEFAULT_TTL = _env_int("CACHE_DEFAULT_TTL", 1 * DAY)
+
+# Clave de Scopus para las llamadas directas a la API (si no está en el entorno, la de config.py)
+def _config_scopus_key():
+    try:
+        from config import SCOPUS_API_KEY
+        return SCOPUS_API_KEY
+    except ImportError:
+        return ""
+
+
+SCOPUS_API_KEY = os.getenv("SCOPUS_API_KEY") or _config_scopus_key()
+# Vista de la búsqueda de Scopus: COMPLETE (autores y keywords, requiere suscripción) o STANDARD
+SCOPUS_SEARCH_VIEW = os.getenv("SCOPUS_SEARCH_VIEW", "COMPLETE")
+
+SERPAPI_KEY = os.getenv(
+    "SERPAPI_KEY", "813709d154c03e80cb6e34ea14964cff575713bc24ea0f42ea1dce046261e0f7"
+)
+
+# Concurrencia de las búsquedas en varias fuentes
+SOURCE_WORKERS = _env_int("SOURCE_WORKERS", 12)
+SOURCE_TIMEOUTS = {
+    source: _env_int(f"SOURCE_TIMEOUT_{source.upper()}", timeout)
+    for source, timeout in {"scopus": 90, "crossref": 45, "scholar": 45}.items()
+}
+SOURCE_DEFAULT_TIMEOUT = _env_int("SOURCE_DEFAULT_TIMEOUT", 60)
+
+# Número máximo de consultas simultáneas al enriquecer resultados (autores, revistas, referencias)
+FETCH_WORKERS = _env_int("FETCH_WORKERS", 8)
+
+# Límites de peticiones por API: (peticiones por segundo, ráfaga máxima). Con RATE_LIMIT_<API>=n se cambia la tasa
+RATE_LIMITS_PATH = os.getenv("RATE_LIMITS_PATH", os.path.join(DATA_DIR, "limites.sqlite3"))
+RATE_LIMITS = {
+    bucket: (_env_int(f"RATE_LIMIT_{bucket.upper()}", rate), burst)
+    for bucket, (rate, burst) in {
+        "scopus_search": (6, 6),
+        "scopus_retrieval": (6, 6),
+        "crossref": (5, 5),
+        "serpapi": (1, 2),
+        "http": (10, 10),
+    }.items()
+}
+# Espera máxima para conseguir turno; si la cuota está agotada más tiempo, se lanza un error
+RATE_LIMIT_MAX_WAIT = _env_int("RATE_LIMIT_MAX_WAIT", 60)
+# Peticiones de la cuota (semanal) de la clave que se reservan y no se gastan
+QUOTA_RESERVE = _env_int("QUOTA_RESERVE", 0)
+
+# Paginación de CrossRef con cursor (CrossRef admite como mucho 1000 filas por página)
+CROSSREF_PAGE_SIZE = min(_env_int("CROSSREF_PAGE_SIZE", 100), 1000)
+
+# Cliente HTTP compartido: tiempos máximos (conexión, lectura), reintentos y conexiones por host
+HTTP_CONNECT_TIMEOUT = _env_int("HTTP_CONNECT_TIMEOUT", 5)
+HTTP_READ_TIMEOUT = _env_int("HTTP_READ_TIMEOUT", 30)
+HTTP_RETRIES = _env_int("HTTP_RETRIES", 3)
+HTTP_POOL_SIZE = _env_int("HTTP_POOL_SIZE", 2 * FETCH_WORKERS)
+# Correo de contacto para el "polite pool" de CrossRef (recomendado en producción)
+CROSSREF_MAILTO = os.getenv("CROSSREF_MAILTO", "")
+
+# Cola de trabajos en segundo plano (informes y grafos)
+JOB_WORKERS = _env_int("JOB_WORKERS", 4)
+JOB_RESULT_TTL = _env_int("JOB_RESULT_TTL", 60 * 60)
+JOBS_PATH = os.getenv("JOBS_PATH", os.path.join(DATA_DIR, "trabajos.sqlite3"))
+# Tamaño máximo del resultado de un trabajo (bytes)
+JOB_MAX_RESULT_BYTES = _env_int("JOB_MAX_RESULT_BYTES", 50 * 2 ** 20)
+# Un trabajo sin progreso durante este tiempo se da por abandonado (su worker terminó)
+JOB_STALE_AFTER = _env_int("JOB_STALE_AFTER", 10 * 60)
+
+# Almacén persistente del grafo de citas
+GRAPH_STORE_PATH = os.getenv("GRAPH_STORE_PATH", os.path.join(DATA_DIR, "grafo_citas.sqlite3"))
+GRAPH_NODE_TTL = _env_int("GRAPH_NODE_TTL", 30 * DAY)
+
+# Índice de identidades de documentos (DOI / EID / Scopus ID)
+IDENTITY_PATH = os.getenv("IDENTITY_PATH", os.path.join(DATA_DIR, "identidades.sqlite3"))
+
+# Índice local de autores (búsqueda por nombre sin consultar Scopus)
+AUTHOR_INDEX_PATH = os.getenv("AUTHOR_INDEX_PATH", os.path.join(DATA_DIR, "autores.sqlite3"))
+# Similitud mínima (Jaccard de trigramas) para las coincidencias aproximadas
+AUTHOR_MIN_SIMILARITY = float(os.getenv("AUTHOR_MIN_SIMILARITY", 0.4))
+
+# Espejo local (FTS5) de los artículos ya obtenidos: una consulta repetida se
+# responde desde aquí durante MIRROR_TTL segundos (MIRROR_LOCAL_FIRST=0 lo desactiva)
+MIRROR_PATH = os.getenv("MIRROR_PATH", os.path.join(DATA_DIR, "espejo.sqlite3"))
+MIRROR_TTL = _env_int("MIRROR_TTL", 1 * DAY)
+MIRROR_LOCAL_FIRST = os.getenv("MIRROR_LOCAL_FIRST", "1") != "0"
+MIRROR_SEARCH_LIMIT = _env_int("MIRROR_SEARCH_LIMIT", 500)
+
+# Almacén columnar (Parquet) de los volcados bibliográficos para rankings masivos
+COLUMNAR_PATH = os.getenv("COLUMNAR_PATH", os.path.join(DATA_DIR, "columnar"))
+INGEST_BATCH_SIZE = _env_int("INGEST_BATCH_SIZE", 50000)
+
+# Rastreo multinivel del grafo de citas
+CRAWL_MAX_DEPTH = _env_int("CRAWL_MAX_DEPTH", 3)
+CRAWL_MAX_NODES = _env_int("CRAWL_MAX_NODES", 300)
+CRAWL_FAN_OUT = _env_int("CRAWL_FAN_OUT", 15)
+
+# Disposición del grafo calculada en el servidor (a partir de este número de nodos se usa siempre)
+LAYOUT_AUTO_NODES = _env_int("LAYOUT_AUTO_NODES", 500)
+LAYOUT_ITERATIONS = _env_int("LAYOUT_ITERATIONS", 50)
+
+# Análisis del grafo: nodos con más conexiones se ignoran en co-citación y acoplamiento
+ANALYTICS_MAX_HUB_DEGREE = _env_int("ANALYTICS_MAX_HUB_DEGREE", 1000)
@@ -0,0 +1,40 @@
+"""
+Resolución de métricas de autores de Scopus (h-index, citas) para un conjunto de resultados.
+"""
+from servicios import ajustes
+from servicios.concurrencia import bounded_map
+from servicios.fuentes import author_retrieval
+
+
+class AuthorMetricsResolver:
+    def __init__(self, max_workers=ajustes.FETCH_WORKERS):
+        self.max_workers = max_workers
+
+    def resolve(self, author_ids):
+        """
+        Recupera una sola vez cada autor distinto de ``author_ids`` (en paralelo y
+        a través de la caché compartida) y devuelve {author_id: AuthorProfile}.
+        Los autores que no se pudieron recuperar no aparecen en el resultado.
+        """
+        unique_ids = [str(author_id).strip() for author_id in author_ids if author_id and str(author_id).strip()]
+        profiles, errors = bounded_map(author_retrieval, unique_ids, self.max_workers)
+
+        for author_id, error in errors.items():
+            print(f"Error al obtener el autor {author_id} de Scopus: {error}")
+
+        return profiles
+
+    @staticmethod
+    def collect_ids(articles):
+        """
+        Devuelve los AU-ID de todos los autores de una lista de documentos de Scopus.
+        """
+        author_ids = []
+        for article in articles:
+            ids = getattr(article, "author_ids", None)
+            if ids:
+                author_ids.extend(author_id.strip() for author_id in ids.split(";"))
+        return author_ids
+
+
+author_resolver = AuthorMetricsResolver()
@@ -0,0 +1,29 @@
+"""
+Base común para los almacenes locales en SQLite (caché, grafo de citas, índices).
+"""
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._create_schema(self._connect())
+
+    def _create_schema(self, conn):
+        raise NotImplementedError
+
+    def _connect(self):
+        # Una conexión por hilo: sqlite3 no permite compartirlas entre hilos
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,179 @@
+"""
+Caché persistente (SQLite) para las respuestas de las APIs externas.
+
+Cada entrada se guarda por endpoint con su propio TTL. Cuando la tabla supera
+``max_entries`` se eliminan primero las entradas caducadas y después las menos
+usadas recientemente. Los aciertos/fallos se cuentan por endpoint.
+"""
+import hashlib
+import json
+import pickle
+import threading
+import time
+
+from servicios import ajustes
+from servicios.basedatos import SQLiteStore
+
+
+_MISSING = object()
+
+
+def make_key(*parts, **kwargs):
+    """
+    Genera una clave estable a partir de los argumentos de una llamada.
+    """
+    raw = json.dumps([parts, kwargs], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(SQLiteStore):
+    def __init__(self, path, ttls=None, default_ttl=ajustes.DAY, max_entries=50000):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._writes = 0
+        super().__init__(path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries (expires_at)")
+
+    def _count(self, endpoint, field):
+        with self._lock:
+            counters = self._counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+            counters[field] += 1
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, endpoint, key, default=None):
+        """
+        Devuelve el valor guardado o ``default`` si no existe o ha caducado.
+        """
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+
+        if row is None:
+            self._count(endpoint, "misses")
+            return default
+
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            print(f"⚠️ Entrada de caché corrupta para {endpoint}: {e}")
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(endpoint, "misses")
+            return default
+
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(endpoint, "hits")
+        return value
+
+    def set(self, endpoint, key, value, ttl=None):
+        now = time.time()
+        ttl = self.ttl_for(endpoint) if ttl is None else ttl
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._connect().execute(
+            "INSERT OR REPLACE INTO entries (key, endpoint, value, created_at, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, endpoint, blob, now, now + ttl, now),
+        )
+
+        with self._lock:
+            self._writes += 1
+            check = self._writes % 100 == 0
+        if check:
+            self.evict()
+
+    def get_or_fetch(self, endpoint, key, fetch, ttl=None, cacheable=None):
+        """
+        Devuelve el valor en caché o llama a ``fetch()`` y guarda el resultado.
+
+        Las excepciones de ``fetch`` no se guardan. ``cacheable(valor)`` permite
+        descartar respuestas que no deben cachearse (por ejemplo, errores).
+        """
+        value = self.get(endpoint, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = fetch()
+        if cacheable is None or cacheable(value):
+            try:
+                self.set(endpoint, key, value, ttl)
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar en caché la respuesta de {endpoint}: {e}")
+        return value
+
+    def evict(self):
+        """
+        Elimina las entradas caducadas y, si se supera el tamaño máximo,
+        las menos usadas recientemente hasta dejar un 10% de margen.
+        """
+        conn = self._connect()
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+
+        total = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if total > self.max_entries:
+            excess = total - int(self.max_entries * 0.9)
+            conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self, endpoint=None):
+        conn = self._connect()
+        if endpoint:
+            conn.execute("DELETE FROM entries WHERE endpoint = ?", (endpoint,))
+        else:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """
+        Devuelve los contadores de aciertos/fallos y el número de entradas por endpoint.
+        """
+        rows = self._connect().execute(
+            "SELECT endpoint, COUNT(*) FROM entries WHERE expires_at > ? GROUP BY endpoint",
+            (time.time(),),
+        ).fetchall()
+        sizes = dict(rows)
+
+        with self._lock:
+            counters = {endpoint: dict(values) for endpoint, values in self._counters.items()}
+
+        endpoints = set(sizes) | set(counters)
+        return {
+            endpoint: {
+                "hits": counters.get(endpoint, {}).get("hits", 0),
+                "misses": counters.get(endpoint, {}).get("misses", 0),
+                "entries": sizes.get(endpoint, 0),
+                "ttl": self.ttl_for(endpoint),
+            }
+            for endpoint in sorted(endpoints)
+        }
+
+
+response_cache = ResponseCache(
+    ajustes.CACHE_PATH,
+    ttls=ajustes.CACHE_TTLS,
+    default_ttl=ajustes.CACHE_DEFAULT_TTL,
+    max_entries=ajustes.CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,83 @@
+"""
+Cliente HTTP compartido para las llamadas directas a las APIs.
+
+Una sola ``requests.Session`` con conexiones persistentes (keep-alive) por
+host, tiempo máximo por defecto en todas las peticiones y reintentos con
+espera exponencial ante 429 y errores 5xx. Los reintentos por estado se hacen
+en la sesión y no en urllib3, así que cada intento pasa por el limitador (toma
+su turno y respeta el ``Retry-After`` de la API); urllib3 solo reintenta los
+errores de conexión. El User-Agent identifica la aplicación ante CrossRef para
+usar su "polite pool".
+"""
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from servicios import ajustes
+from servicios.limitador import PAUSE_STATUSES, bucket_for_url, rate_limiter, retry_after
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = frozenset({"GET", "HEAD"})
+
+USER_AGENT = "Proyecto-Referencias/1.0 (https://github.com/pabloCanoContreras/Proyecto-Referencias{mailto})"
+
+
+class TimeoutSession(requests.Session):
+    """
+    ``Session`` que aplica un tiempo máximo por defecto cuando la llamada no
+    indica ninguno (litstudy, por ejemplo, no lo hace) y pasa cada petición
+    por el limitador de la API correspondiente.
+    """
+    def __init__(self, timeout, retries=0, backoff_factor=0.5):
+        super().__init__()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        bucket = bucket_for_url(url)
+        attempts = self.retries + 1 if method.upper() in RETRY_METHODS else 1
+
+        for attempt in range(attempts):
+            # Cada intento toma su turno en el limitador y registra la cuota que anuncia la respuesta
+            rate_limiter.acquire(bucket)
+            response = super().request(method, url, **kwargs)
+            rate_limiter.observe(bucket, response.headers, response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                return response
+
+            # Con Retry-After el limitador ya ha pausado el cubo y el siguiente
+            # ``acquire`` espera lo necesario; si no, espera exponencial (0.5 s, 1 s, 2 s...)
+            if not (response.status_code in PAUSE_STATUSES and retry_after(response.headers) is not None):
+                time.sleep(self.backoff_factor * 2 ** attempt)
+            response.close()
+
+
+def create_session(retries=ajustes.HTTP_RETRIES, pool_size=ajustes.HTTP_POOL_SIZE,
+                   timeout=(ajustes.HTTP_CONNECT_TIMEOUT, ajustes.HTTP_READ_TIMEOUT)):
+    # urllib3 solo reintenta los errores de conexión; los 429/5xx los reintenta
+    # la sesión para que cada intento pase por el limitador
+    retry = Retry(
+        total=retries,
+        read=1,  # un servidor colgado no debe multiplicar la espera
+        status=0,
+        backoff_factor=0.5,  # 0.5 s, 1 s, 2 s...
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = TimeoutSession(timeout, retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    mailto = f"; mailto:{ajustes.CROSSREF_MAILTO}" if ajustes.CROSSREF_MAILTO else ""
+    session.headers["User-Agent"] = USER_AGENT.format(mailto=mailto)
+    return session
+
+
+http_session = create_session()
@@ -0,0 +1,83 @@
+"""
+Utilidades para lanzar llamadas a las fuentes externas en paralelo.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from servicios import ajustes
+
+
+# Pool compartido para las consultas por fuente. Una fuente que supera su
+# timeout sigue ocupando un hilo hasta terminar, por eso el pool es holgado.
+source_executor = ThreadPoolExecutor(max_workers=ajustes.SOURCE_WORKERS, thread_name_prefix="fuente")
+
+
+def iter_completed(tasks, timeouts=None, default_timeout=ajustes.SOURCE_DEFAULT_TIMEOUT):
+    """
+    Ejecuta en paralelo las funciones de ``tasks`` ({nombre: callable}) y va
+    devolviendo ``(nombre, resultado, error)`` según terminan. Cada tarea
+    tiene como máximo su timeout (contado desde el inicio común); si falla o
+    no termina a tiempo, ``resultado`` es ``None`` y ``error`` un mensaje.
+    """
+    timeouts = timeouts or {}
+    start = time.monotonic()
+    pending = {source_executor.submit(task): name for name, task in tasks.items()}
+    deadlines = {future: start + timeouts.get(name, default_timeout) for future, name in pending.items()}
+
+    while pending:
+        remaining = max(min(deadlines[future] for future in pending) - time.monotonic(), 0)
+        done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name = pending.pop(future)
+            try:
+                yield name, future.result(), None
+            except Exception as e:
+                print(f"⚠️ Error en {name}: {e}")
+                yield name, None, str(e)
+
+        now = time.monotonic()
+        for future in [future for future in pending if deadlines[future] <= now]:
+            name = pending.pop(future)
+            future.cancel()
+            error = f"Tiempo de espera agotado ({timeouts.get(name, default_timeout)} s)"
+            print(f"⚠️ {name}: {error}")
+            yield name, None, error
+
+
+def run_with_timeouts(tasks, timeouts=None, default_timeout=ajustes.SOURCE_DEFAULT_TIMEOUT):
+    """
+    Igual que ``iter_completed`` pero espera a todas las tareas.
+
+    :return: tupla ``(resultados, errores)``; ``errores`` es {nombre: mensaje}
+             para las tareas que fallaron o no terminaron a tiempo.
+    """
+    results, errors = {}, {}
+    for name, result, error in iter_completed(tasks, timeouts, default_timeout):
+        if error is None:
+            results[name] = result
+        else:
+            errors[name] = error
+    return results, errors
+
+
+def bounded_map(fn, items, max_workers=8):
+    """
+    Aplica ``fn`` a cada elemento con como mucho ``max_workers`` llamadas en
+    vuelo y devuelve {elemento: resultado}. Los elementos que fallan se
+    devuelven en un segundo dict {elemento: excepción}.
+    """
+    items = list(dict.fromkeys(items))
+    results, errors = {}, {}
+    if not items:
+        return results, errors
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="consulta") as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        for future, item in futures.items():
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                errors[item] = e
+
+    return results, errors
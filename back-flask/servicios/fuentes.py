@@ -0,0 +1,445 @@
+"""
+Punto único de acceso a las APIs externas (Scopus, CrossRef y SerpApi).
+
+Todas las llamadas pasan por la caché de respuestas y devuelven estructuras
+simples (namedtuples, dicts) que se pueden serializar sin problemas.
+"""
+from collections import namedtuple
+
+from pybliometrics.scopus import AbstractRetrieval, AuthorRetrieval, AuthorSearch, SerialTitle
+from serpapi import GoogleSearch
+
+from servicios import ajustes
+from servicios.cache import make_key, response_cache
+from servicios.cliente_http import http_session
+from servicios.identidad import identity_index, normalize_doi
+from servicios.indice_autores import author_index
+from servicios.limitador import rate_limiter
+
+
+# Mismos campos que devuelve ``ScopusSearch.results`` en pybliometrics
+ScopusDocument = namedtuple(
+    "ScopusDocument",
+    "eid doi pii pubmed_id title subtype subtypeDescription creator afid affilname "
+    "affiliation_city affiliation_country author_count author_names author_ids "
+    "author_afids coverDate coverDisplayDate publicationName issn source_id eIssn "
+    "aggregationType volume issueIdentifier article_number pageRange description "
+    "authkeywords citedby_count openaccess freetoread freetoreadLabel fund_acr "
+    "fund_no fund_sponsor",
+)
+
+AuthorProfile = namedtuple("AuthorProfile", "identifier given_name surname h_index cited_by_count")
+AuthorCandidate = namedtuple("AuthorCandidate", "identifier surname given_name affiliation documents")
+
+CiteScoreYear = namedtuple("CiteScoreYear", "year citescore")
+JournalProfile = namedtuple("JournalProfile", "issn title publisher sjrlist sniplist citescoreyearinfolist")
+
+AbstractAuthor = namedtuple("AbstractAuthor", "auid surname given_name")
+Reference = namedtuple("Reference", "id doi title sourcetitle coverDate authors", defaults=(None,))
+AbstractRecord = namedtuple(
+    "AbstractRecord", "identifier coverDate citedby_count authors references doi eid", defaults=(None, None)
+)
+
+
+def _create(api_class, *args, **kwargs):
+    return api_class(*args, **kwargs)
+
+
+_api_factory = _create
+
+
+def set_api_factory(factory=None):
+    """
+    Sustituye la función que crea los objetos de pybliometrics/SerpApi
+    (``factory(api_class, *args, **kwargs)``), p. ej. para responder desde
+    grabaciones en los benchmarks. Sin argumentos vuelve a la normal.
+    Devuelve la que había antes.
+    """
+    global _api_factory
+    previous, _api_factory = _api_factory, factory or _create
+    return previous
+
+
+def _limited(bucket, api_class, *args, **kwargs):
+    """
+    Crea el objeto de pybliometrics/SerpApi (que hace la petición) tras
+    conseguir turno en el limitador, y guarda la cuota que anuncia la respuesta.
+    """
+    rate_limiter.acquire(bucket)
+    result = _api_factory(api_class, *args, **kwargs)
+    rate_limiter.observe(bucket, getattr(result, "_header", None))
+    return result
+
+
+def _index_authors(add, *args):
+    # El índice de autores se alimenta de paso; un fallo no debe romper la consulta
+    try:
+        add(*args)
+    except Exception as e:
+        print(f"⚠️ No se pudo actualizar el índice de autores: {e}")
+
+
+def _safe(obj, attr):
+    # Algunas propiedades de pybliometrics lanzan excepciones según la vista
+    try:
+        return getattr(obj, attr)
+    except Exception:
+        return None
+
+
+SCOPUS_SEARCH_URL = "https://api.elsevier.com/content/search/scopus"
+# Máximo de resultados por página que admite cada vista de la Scopus Search API
+SCOPUS_PAGE_SIZES = {"STANDARD": 200, "COMPLETE": 25}
+# La paginación por ``start`` no admite desplazamientos mayores
+SCOPUS_MAX_OFFSET = 5000
+
+
+def _joined(items, field, sep=";"):
+    values = [str(item.get(field) or "") for item in items or []]
+    return sep.join(values) if any(values) else None
+
+
+def entry_to_scopus_document(entry):
+    """
+    Convierte una entrada JSON de la Scopus Search API al mismo ``ScopusDocument``
+    que genera ``ScopusSearch`` de pybliometrics.
+    """
+    authors = entry.get("author") or []
+    affiliations = entry.get("affiliation") or []
+
+    def to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    return ScopusDocument(
+        eid=entry.get("eid"),
+        doi=entry.get("prism:doi"),
+        pii=entry.get("pii"),
+        pubmed_id=entry.get("pubmed-id"),
+        title=entry.get("dc:title"),
+        subtype=entry.get("subtype"),
+        subtypeDescription=entry.get("subtypeDescription"),
+        creator=entry.get("dc:creator"),
+        afid=_joined(affiliations, "afid"),
+        affilname=_joined(affiliations, "affilname"),
+        affiliation_city=_joined(affiliations, "affiliation-city"),
+        affiliation_country=_joined(affiliations, "affiliation-country"),
+        author_count=to_int((entry.get("author-count") or {}).get("$")),
+        author_names=";".join(
+            ", ".join(part for part in (a.get("surname"), a.get("given-name")) if part) for a in authors
+        ) or None,
+        author_ids=_joined(authors, "authid"),
+        author_afids=";".join(
+            "-".join(afid.get("$", "") for afid in (a.get("afid") or [])) for a in authors
+        ) or None,
+        coverDate=entry.get("prism:coverDate"),
+        coverDisplayDate=entry.get("prism:coverDisplayDate"),
+        publicationName=entry.get("prism:publicationName"),
+        issn=entry.get("prism:issn"),
+        source_id=entry.get("source-id"),
+        eIssn=entry.get("prism:eIssn"),
+        aggregationType=entry.get("prism:aggregationType"),
+        volume=entry.get("prism:volume"),
+        issueIdentifier=entry.get("prism:issueIdentifier"),
+        article_number=entry.get("article-number"),
+        pageRange=entry.get("prism:pageRange"),
+        description=entry.get("dc:description"),
+        authkeywords=entry.get("authkeywords"),
+        citedby_count=to_int(entry.get("citedby-count")),
+        openaccess=to_int(entry.get("openaccess")),
+        freetoread=entry.get("freetoread"),
+        freetoreadLabel=entry.get("freetoreadLabel"),
+        fund_acr=entry.get("fund-acr"),
+        fund_no=entry.get("fund-no"),
+        fund_sponsor=entry.get("fund-sponsor"),
+    )
+
+
+def _scopus_page(query, view, sort, start, count):
+    """
+    Descarga una página de la Scopus Search API. Devuelve (total, documentos)
+    o ``None`` si la respuesta no es válida (por ejemplo, vista no autorizada).
+    """
+    params = {"query": query, "view": view, "start": start, "count": count}
+    if sort:
+        params["sort"] = sort
+    headers = {"X-ELS-APIKey": ajustes.SCOPUS_API_KEY, "Accept": "application/json"}
+
+    response = http_session.get(SCOPUS_SEARCH_URL, params=params, headers=headers)
+    if response.status_code != 200:
+        print(f"⚠️ Scopus respondió {response.status_code} a la búsqueda ({view}): {response.text[:200]}")
+        return None
+
+    results = response.json().get("search-results", {})
+    total = int(results.get("opensearch:totalResults") or 0)
+    # Sin resultados Scopus devuelve una entrada con "error"
+    entries = [entry for entry in results.get("entry", []) if "error" not in entry]
+    return total, [entry_to_scopus_document(entry) for entry in entries]
+
+
+def iter_scopus_search(query, limit=None, sort=None, view=None, page_size=None):
+    """
+    Generador de documentos de Scopus que solo pide las páginas necesarias
+    para llegar a ``limit``. La primera página trae el número total de
+    resultados; con ``sort`` (p. ej. "-citedby-count" o "-coverDate") los
+    primeros ``limit`` son los mejores según ese orden.
+
+    Cada página se guarda en la caché. Si la clave no tiene acceso a la
+    vista COMPLETE se repite con STANDARD.
+    """
+    view = (view or ajustes.SCOPUS_SEARCH_VIEW).upper()
+    page_size = min(page_size or SCOPUS_PAGE_SIZES.get(view, 25), SCOPUS_PAGE_SIZES.get(view, 25))
+
+    start, total = 0, None
+    while limit is None or start < limit:
+        count = page_size if limit is None else min(page_size, limit - start)
+        key = make_key("scopus_page", query, view, sort, start, count)
+        page = response_cache.get("scopus_search", key)
+        if page is None:
+            page = _scopus_page(query, view, sort, start, count)
+            if page is None:
+                if view == "COMPLETE" and start == 0:
+                    yield from iter_scopus_search(query, limit, sort, "STANDARD", page_size)
+                return
+            response_cache.set("scopus_search", key, page)
+            _index_authors(author_index.add_scopus_documents, page[1])
+
+        total, documents = page
+        if start == 0:
+            print(f"🔎 Scopus: {total} resultados para {query!r}, se piden como mucho {limit or total}")
+        yield from documents
+
+        start += len(documents)
+        if not documents or start >= total:
+            return
+        if start >= SCOPUS_MAX_OFFSET:
+            print(f"⚠️ Scopus no permite paginar más allá de {SCOPUS_MAX_OFFSET} resultados")
+            return
+
+
+def author_retrieval(author_id):
+    """
+    Recupera el perfil de un autor de Scopus (nombre, h-index y citas).
+    """
+    def fetch():
+        author = _limited("scopus_retrieval", AuthorRetrieval, author_id, refresh=True)
+        profile = AuthorProfile(
+            identifier=str(author_id),
+            given_name=_safe(author, "given_name"),
+            surname=_safe(author, "surname"),
+            h_index=_safe(author, "h_index"),
+            cited_by_count=_safe(author, "cited_by_count"),
+        )
+        _index_authors(author_index.add_many, [dict(
+            source="scopus", id=profile.identifier, surname=profile.surname, given_name=profile.given_name,
+            h_index=profile.h_index, cited_by_count=profile.cited_by_count,
+        )])
+        return profile
+
+    return response_cache.get_or_fetch(
+        "author_retrieval", make_key("author_retrieval", str(author_id)), fetch
+    )
+
+
+def author_search(query):
+    """
+    Busca autores en Scopus (``AuthorSearch``) y los registra en el índice local.
+    Solo se usa cuando el índice no tiene ninguna coincidencia.
+    """
+    def fetch():
+        search = _limited("scopus_search", AuthorSearch, query, refresh=True)
+        candidates = [
+            AuthorCandidate(
+                identifier=str(author.eid).split("-")[-1],
+                surname=author.surname,
+                given_name=author.givenname,
+                affiliation=author.affiliation,
+                documents=int(author.documents or 0),
+            )
+            for author in (search.authors or [])
+        ]
+        _index_authors(author_index.add_many, [
+            dict(
+                source="scopus", id=candidate.identifier, surname=candidate.surname,
+                given_name=candidate.given_name, affiliation=candidate.affiliation, documents=candidate.documents,
+            )
+            for candidate in candidates
+        ])
+        return candidates
+
+    return response_cache.get_or_fetch("author_search", make_key("author_search", query), fetch)
+
+
+def serial_title(issn):
+    """
+    Recupera las métricas de una revista de Scopus a partir de su ISSN.
+    """
+    def fetch():
+        journal = _limited("scopus_retrieval", SerialTitle, issn, refresh=True)
+        citescores = [
+            CiteScoreYear(*entry) for entry in (_safe(journal, "citescoreyearinfolist") or []) if entry
+        ]
+        return JournalProfile(
+            issn=str(issn),
+            title=_safe(journal, "title"),
+            publisher=_safe(journal, "publisher"),
+            sjrlist=_safe(journal, "sjrlist"),
+            sniplist=_safe(journal, "sniplist"),
+            citescoreyearinfolist=citescores or None,
+        )
+
+    return response_cache.get_or_fetch("serial_title", make_key("serial_title", str(issn)), fetch)
+
+
+def abstract_retrieval(identifier, view="META_ABS"):
+    """
+    Recupera un documento de Scopus (fecha, citas, autores y referencias).
+    """
+    def fetch():
+        document = _limited("scopus_retrieval", AbstractRetrieval, identifier, view=view, refresh=True)
+        authors = [
+            AbstractAuthor(auid=a.auid, surname=a.surname, given_name=a.given_name)
+            for a in (_safe(document, "authors") or [])
+        ]
+        references = [
+            Reference(
+                id=r.id, doi=r.doi, title=r.title, sourcetitle=r.sourcetitle, coverDate=r.coverDate,
+                authors=getattr(r, "authors", None),
+            )
+            for r in (_safe(document, "references") or [])
+        ]
+        record = AbstractRecord(
+            identifier=str(identifier),
+            coverDate=_safe(document, "coverDate"),
+            citedby_count=_safe(document, "citedby_count"),
+            authors=authors,
+            references=references,
+            doi=_safe(document, "doi"),
+            eid=_safe(document, "eid"),
+        )
+        # La respuesta enlaza el DOI con el EID: a partir de aquí son el mismo documento
+        if record.doi and record.eid:
+            identity_index.resolve(doi=record.doi, eid=record.eid)
+        return record
+
+    # La clave de la caché es la identidad canónica: DOI, EID y Scopus ID comparten entrada
+    canonical = identity_index.resolve_identifier(identifier) or str(identifier)
+    return response_cache.get_or_fetch(
+        "abstract_retrieval", make_key("abstract_retrieval", canonical, view), fetch
+    )
+
+
+CROSSREF_WORKS_URL = "https://api.crossref.org/works"
+
+# Campos que necesita cada uso (select= evita descargar resúmenes, referencias, licencias...)
+CROSSREF_RANKING_FIELDS = (
+    "DOI", "title", "author", "issued", "published-print", "is-referenced-by-count",
+    "container-title", "ISSN", "publisher",
+)
+CROSSREF_GRAPH_FIELDS = ("DOI", "title", "author", "issued", "container-title", "reference")
+
+
+def _crossref_page(params, cursor):
+    """
+    Descarga una página de ``/works`` con el cursor indicado. Devuelve
+    (elementos, siguiente cursor) o ``None`` si la respuesta no es válida.
+    """
+    response = http_session.get(CROSSREF_WORKS_URL, params={**params, "cursor": cursor})
+    if response.status_code != 200:
+        print(f"⚠️ CrossRef respondió {response.status_code} al paginar: {response.text[:200]}")
+        return None
+    message = response.json().get("message", {})
+    return message.get("items", []), message.get("next-cursor")
+
+
+def iter_crossref_works(query, limit=None, select=CROSSREF_RANKING_FIELDS, page_size=None, filters=None):
+    """
+    Generador de trabajos de CrossRef para ``query``, página a página con
+    cursores de paginación profunda y proyección ``select=``. En memoria solo
+    está la página actual y los primeros resultados llegan sin esperar al resto.
+
+    Cada página se guarda en la caché junto con el cursor siguiente; si al
+    repetir una búsqueda el cursor guardado ya ha caducado en CrossRef, se
+    vuelve a recorrer desde el principio sin repetir los ya devueltos.
+    """
+    page_size = min(page_size or ajustes.CROSSREF_PAGE_SIZE, limit or 1000, 1000)
+    params = {"query": query, "rows": page_size}
+    if select:
+        params["select"] = ",".join(select)
+    if filters:
+        params["filter"] = ",".join(f"{key}:{value}" for key, value in filters.items())
+
+    yielded, skip = 0, 0
+    cursor = "*"
+    use_cache = True
+    while limit is None or yielded < limit:
+        key = make_key("crossref_page", params, cursor)
+        page = response_cache.get("crossref_search", key) if use_cache else None
+        if page is None:
+            page = _crossref_page(params, cursor)
+            if page is None:
+                if cursor == "*" or not use_cache:
+                    return
+                # Cursor guardado caducado: recorrer de nuevo saltando lo ya devuelto
+                use_cache, cursor, skip = False, "*", yielded
+                continue
+            response_cache.set("crossref_search", key, page)
+
+        items, next_cursor = page
+        if not items:
+            return
+        page_length = len(items)
+        if skip:
+            items, skip = items[skip:], max(0, skip - page_length)
+
+        for item in items[:None if limit is None else limit - yielded]:
+            yielded += 1
+            yield item
+
+        if not next_cursor or page_length < page_size:
+            return
+        cursor = next_cursor
+
+
+def crossref_work(doi):
+    """
+    Devuelve el bloque ``message`` de ``/works/{doi}`` en CrossRef, o ``None``.
+    """
+    data = http_get_json(f"https://api.crossref.org/works/{normalize_doi(doi) or doi}", endpoint="crossref_work")
+    return data.get("message") if data else None
+
+
+def google_search(params):
+    """
+    Ejecuta una búsqueda de SerpApi. La clave de API no forma parte de la clave de caché.
+    """
+    params = {"api_key": ajustes.SERPAPI_KEY, **params}
+    key_params = {k: v for k, v in params.items() if k != "api_key"}
+
+    return response_cache.get_or_fetch(
+        "serpapi",
+        make_key("serpapi", key_params),
+        lambda: _limited("serpapi", GoogleSearch, params).get_dict(),
+        cacheable=lambda result: isinstance(result, dict) and "error" not in result,
+    )
+
+
+def http_get_json(url, params=None, headers=None, endpoint="http"):
+    """
+    GET con caché para las llamadas directas a las APIs. Devuelve el JSON o
+    ``None`` si la respuesta no es 200 (las respuestas fallidas no se cachean).
+    """
+    def fetch():
+        response = http_session.get(url, params=params, headers=headers)
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    return response_cache.get_or_fetch(
+        endpoint,
+        make_key(endpoint, url, params),
+        fetch,
+        cacheable=lambda data: data is not None,
+    )
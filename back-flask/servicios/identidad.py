@@ -0,0 +1,186 @@
+"""
+Índice de identidades canónicas de documentos.
+
+Un mismo artículo puede llegar por DOI, por EID (``2-s2.0-<id>``) o por su
+Scopus ID. Este índice guarda cada alias normalizado (``doi:<doi>`` o
+``scopus:<id>``) apuntando a una única clave canónica, de modo que el grafo
+de citas y las cachés tratan todos los alias como el mismo documento.
+
+Cuando una respuesta revela que dos claves ya conocidas son el mismo
+documento (por ejemplo, un DOI y un Scopus ID vistos por separado), se
+fusionan y se avisa a los suscriptores (``on_merge``) para que muevan sus datos.
+"""
+import threading
+import time
+
+from servicios import ajustes
+from servicios.basedatos import SQLiteStore
+
+
+EID_PREFIX = "2-s2.0-"
+
+
+def normalize_doi(doi):
+    if not doi:
+        return None
+    doi = str(doi).strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "http://dx.doi.org/", "https://dx.doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi or None
+
+
+def normalize_scopus_id(scopus_id):
+    """
+    Scopus ID sin el prefijo de los EID (el EID es el Scopus ID con prefijo).
+    """
+    if not scopus_id:
+        return None
+    scopus_id = str(scopus_id).strip()
+    if scopus_id.startswith(EID_PREFIX):
+        scopus_id = scopus_id[len(EID_PREFIX):]
+    return scopus_id or None
+
+
+def alias_keys(doi=None, scopus_id=None, eid=None):
+    """
+    Alias normalizados de un documento, con el DOI primero si existe.
+    """
+    aliases = []
+    doi = normalize_doi(doi)
+    if doi:
+        aliases.append(f"doi:{doi}")
+    for identifier in (scopus_id, eid):
+        identifier = normalize_scopus_id(identifier)
+        if identifier and f"scopus:{identifier}" not in aliases:
+            aliases.append(f"scopus:{identifier}")
+    return aliases
+
+
+def split_identifier(identifier):
+    """
+    Clasifica un identificador suelto como (doi, scopus_id): los EID y los
+    identificadores numéricos son de Scopus, el resto se trata como DOI.
+    """
+    identifier = str(identifier).strip()
+    if identifier.startswith(EID_PREFIX) or identifier.isdigit():
+        return None, identifier
+    return identifier, None
+
+
+class IdentityIndex(SQLiteStore):
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._listeners = []
+        super().__init__(path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS aliases (
+                alias TEXT PRIMARY KEY,
+                canonical TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_aliases_canonical ON aliases (canonical)")
+
+    def on_merge(self, callback):
+        """
+        Registra ``callback(clave_antigua, clave_canonica)``, llamado al fusionar dos documentos.
+        """
+        self._listeners.append(callback)
+
+    def lookup(self, alias):
+        """
+        Clave canónica de un alias ya normalizado, o ``None`` si no se conoce.
+        """
+        with self._lock:
+            if alias in self._memo:
+                return self._memo[alias]
+        row = self._connect().execute("SELECT canonical FROM aliases WHERE alias = ?", (alias,)).fetchone()
+        canonical = row[0] if row else None
+        if canonical:
+            with self._lock:
+                self._memo[alias] = canonical
+        return canonical
+
+    def find(self, doi=None, scopus_id=None, eid=None):
+        """
+        Clave canónica del documento si alguno de sus alias ya está registrado,
+        sin registrar nada. ``None`` si no se conoce.
+        """
+        for alias in alias_keys(doi, scopus_id, eid):
+            canonical = self.lookup(alias)
+            if canonical:
+                return canonical
+        return None
+
+    def resolve(self, doi=None, scopus_id=None, eid=None):
+        """
+        Devuelve la clave canónica del documento y registra todos sus alias.
+        ``None`` si no hay ningún identificador.
+        """
+        aliases = alias_keys(doi, scopus_id, eid)
+        if not aliases:
+            return None
+
+        known = {alias: self.lookup(alias) for alias in aliases}
+        canonicals = list(dict.fromkeys(value for value in known.values() if value))
+        if len(canonicals) == 1 and all(known.values()):
+            return canonicals[0]
+
+        # Alias nuevos o documentos que resultan ser el mismo: se registran/fusionan
+        canonical = canonicals[0] if canonicals else aliases[0]
+        merged = canonicals[1:]
+        now = time.time()
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for old in merged:
+                conn.execute("UPDATE aliases SET canonical = ?, updated_at = ? WHERE canonical = ?", (canonical, now, old))
+            conn.executemany(
+                "INSERT OR IGNORE INTO aliases (alias, canonical, updated_at) VALUES (?, ?, ?)",
+                [(alias, canonical, now) for alias, value in known.items() if not value],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            if merged:
+                # Otros alias de las claves fusionadas pueden estar en memoria
+                self._memo = {alias: value for alias, value in self._memo.items() if value not in merged}
+            for alias in aliases:
+                self._memo[alias] = canonical
+
+        for old in merged:
+            print(f"🔗 Fusionando {old} con {canonical}")
+            for callback in self._listeners:
+                try:
+                    callback(old, canonical)
+                except Exception as e:
+                    print(f"⚠️ Error fusionando {old} con {canonical}: {e}")
+
+        return canonical
+
+    def resolve_identifier(self, identifier):
+        """
+        Clave canónica de un identificador suelto (DOI, EID o Scopus ID).
+        """
+        doi, scopus_id = split_identifier(identifier)
+        return self.resolve(doi=doi, scopus_id=scopus_id)
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "aliases": conn.execute("SELECT COUNT(*) FROM aliases").fetchone()[0],
+            "documents": conn.execute("SELECT COUNT(DISTINCT canonical) FROM aliases").fetchone()[0],
+        }
+
+
+identity_index = IdentityIndex(ajustes.IDENTITY_PATH)
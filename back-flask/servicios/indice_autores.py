@@ -0,0 +1,304 @@
+"""
+Índice local de autores para la búsqueda por nombre (``/author_eid``).
+
+Cada autor que ya se ha resuelto (perfiles de Scopus, autores de los
+resultados de búsqueda y de Google Scholar) se guarda con sus variantes de
+nombre, su identificador, afiliación y h-index. Las variantes normalizadas
+(minúsculas, sin tildes ni signos) se mantienen en memoria en una lista
+ordenada para buscar por prefijo con ``bisect`` y en un índice de trigramas
+para las búsquedas aproximadas, así que una consulta no toca las APIs y de la
+base de datos solo lee lo que otros procesos hayan añadido desde la anterior.
+Solo si no hay ninguna coincidencia se consulta ``AuthorSearch``.
+"""
+import bisect
+import json
+import threading
+import time
+import unicodedata
+
+from servicios import ajustes
+from servicios.basedatos import SQLiteStore
+
+
+def normalize_name(name):
+    """
+    Nombre en minúsculas, sin tildes, signos de puntuación ni espacios repetidos.
+    """
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = "".join(char if char.isalnum() else " " for char in name.lower())
+    return " ".join(name.split())
+
+
+def name_variants(surname=None, given_name=None, full_name=None):
+    """
+    Variantes normalizadas de un nombre: "apellido nombre", "nombre apellido",
+    "apellido inicial" y el apellido solo. ``full_name`` admite "Apellido, Nombre"
+    (Scopus) o "Nombre Apellido" (Scholar).
+    """
+    if full_name and not surname:
+        if "," in full_name:
+            surname, given_name = (part.strip() for part in full_name.split(",", 1))
+        else:
+            parts = full_name.split()
+            surname, given_name = (parts[-1], " ".join(parts[:-1])) if parts else (None, None)
+
+    surname, given_name = normalize_name(surname), normalize_name(given_name)
+    if not surname:
+        return []
+
+    variants = [surname]
+    if given_name:
+        initials = " ".join(part[0] for part in given_name.split())
+        variants += [f"{surname} {given_name}", f"{given_name} {surname}", f"{surname} {initials}"]
+    return list(dict.fromkeys(variants))
+
+
+def author_search_query(name):
+    """
+    Consulta de ``AuthorSearch`` para un nombre ("Apellido, Nombre" o "Nombre Apellido").
+    """
+    name = " ".join("".join(char if char.isalnum() or char in ",-'" else " " for char in name).split())
+    if "," in name:
+        surname, given_name = (part.strip() for part in name.split(",", 1))
+    else:
+        parts = name.split()
+        surname, given_name = (parts[-1], " ".join(parts[:-1])) if parts else ("", "")
+    query = f"AUTHLAST({surname})"
+    return f"{query} AND AUTHFIRST({given_name})" if given_name else query
+
+
+def trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class AuthorIndex(SQLiteStore):
+    # Candidatos por prefijo que se ordenan por h-index, por cada resultado pedido
+    CANDIDATES_PER_RESULT = 20
+
+    def __init__(self, path, min_similarity=0.4):
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        # Último ``rowid`` de ``authors`` ya cargado en memoria
+        self._last_rowid = 0
+        self._authors = {}
+        self._variants = []
+        self._entries = set()
+        # El índice de trigramas se construye en la primera búsqueda aproximada
+        self._trigrams = None
+        self._variant_trigrams = {}
+        super().__init__(path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS authors (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS names (
+                variant TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (variant, key)
+            )
+            """
+        )
+
+    def _load(self):
+        # ``INSERT OR REPLACE`` da a cada fila escrita un ``rowid`` mayor que
+        # todos los anteriores, así que basta leer las filas posteriores a la
+        # última cargada para ver lo que han añadido otros procesos
+        conn = self._connect()
+        last = conn.execute("SELECT MAX(rowid) FROM authors").fetchone()[0] or 0
+        loaded = self._last_rowid
+        if last <= loaded:
+            return
+
+        rows = conn.execute("SELECT rowid, key, data FROM authors WHERE rowid > ?", (loaded,)).fetchall()
+        if not loaded:
+            names = conn.execute("SELECT variant, key FROM names").fetchall()
+        else:
+            keys = [key for _, key, _ in rows]
+            names = []
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                names += conn.execute(
+                    f"SELECT variant, key FROM names WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+
+        with self._lock:
+            self._authors.update((key, json.loads(data)) for _, key, data in rows)
+            self._index_variants(sorted(names))
+            self._last_rowid = max(self._last_rowid, max(rowid for rowid, _, _ in rows))
+
+    def _index_variants(self, entries):
+        # Pocas entradas se insertan en su sitio; muchas se añaden y se reordena la lista
+        entries = [entry for entry in entries if entry not in self._entries]
+        if len(entries) > 100:
+            self._variants.extend(entries)
+            self._variants.sort()
+        else:
+            for entry in entries:
+                bisect.insort(self._variants, entry)
+
+        self._entries.update(entries)
+        if self._trigrams is not None:
+            self._index_trigrams(entries)
+
+    def _index_trigrams(self, entries):
+        for entry in entries:
+            variant = entry[0]
+            if variant not in self._variant_trigrams:
+                self._variant_trigrams[variant] = trigrams(variant)
+            for gram in self._variant_trigrams[variant]:
+                self._trigrams.setdefault(gram, set()).add(entry)
+
+    def add_many(self, authors):
+        """
+        Registra o actualiza autores. Cada autor es un dict con ``source``
+        ("scopus" o "scholar"), ``id`` y ``name`` o ``surname``/``given_name``;
+        opcionalmente ``affiliation``, ``h_index`` y ``documents``. Los campos
+        nuevos se combinan con los que ya había.
+        """
+        self._load()
+        rows, names = {}, set()
+        for author in authors:
+            author_id = str(author.get("id") or "").strip()
+            if not author_id:
+                continue
+            key = f"{author.get('source', 'scopus')}:{author_id}"
+            variants = name_variants(author.get("surname"), author.get("given_name"), author.get("name"))
+            if not variants:
+                continue
+
+            with self._lock:
+                data = dict(rows.get(key) or self._authors.get(key) or {})
+            data.update({
+                field: value for field, value in author.items()
+                if value not in (None, "") and field not in ("surname", "given_name")
+            })
+            if author.get("surname"):
+                # El nombre del perfil completo tiene preferencia sobre el de los resultados
+                data["name"] = ", ".join(part for part in (author["surname"], author.get("given_name")) if part)
+            rows[key] = data
+            names.update((variant, key) for variant in variants)
+
+        if not rows:
+            return
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.execute("SELECT MAX(rowid) FROM authors").fetchone()[0] or 0
+            conn.executemany(
+                "INSERT OR REPLACE INTO authors (key, data, updated_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(data, ensure_ascii=False, default=str), now) for key, data in rows.items()],
+            )
+            conn.executemany("INSERT OR IGNORE INTO names (variant, key) VALUES (?, ?)", sorted(names))
+            after = conn.execute("SELECT MAX(rowid) FROM authors").fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._authors.update(rows)
+            self._index_variants(sorted(names))
+            # Si nadie más había escrito desde la última carga, estas filas ya están en memoria
+            if before == self._last_rowid:
+                self._last_rowid = after
+
+    def add(self, **author):
+        self.add_many([author])
+
+    def add_scopus_documents(self, documents):
+        """
+        Registra los autores de documentos de Scopus (``author_names`` y
+        ``author_ids`` separados por ";", con su afiliación si viene).
+        """
+        authors = []
+        for doc in documents:
+            names = (doc.author_names or "").split(";")
+            ids = (doc.author_ids or "").split(";")
+            afids = (doc.author_afids or "").split(";")
+            affiliations = dict(zip((doc.afid or "").split(";"), (doc.affilname or "").split(";")))
+            for position, (name, author_id) in enumerate(zip(names, ids)):
+                afid = afids[position].split("-")[0] if position < len(afids) else None
+                authors.append({
+                    "source": "scopus", "id": author_id, "name": name.strip(),
+                    "affiliation": affiliations.get(afid),
+                })
+        self.add_many(authors)
+
+    def lookup(self, query, limit=10, source=None):
+        """
+        Autores cuyo nombre empieza por ``query`` (por cualquiera de sus
+        variantes), los de mayor h-index primero. Si no hay ninguno, los más
+        parecidos por trigramas (nombres mal escritos o en otro orden).
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        self._load()
+
+        def wanted(key):
+            return source is None or key.startswith(f"{source}:")
+
+        def rank(key):
+            data = self._authors.get(key, {})
+            return -(data.get("h_index") or 0), -(data.get("documents") or 0)
+
+        with self._lock:
+            # Un prefijo corto ("a") casa con medio índice: solo se ordenan los primeros candidatos
+            prefix = set()
+            max_candidates = limit * self.CANDIDATES_PER_RESULT
+            position = bisect.bisect_left(self._variants, (query, ""))
+            while (
+                position < len(self._variants) and len(prefix) < max_candidates
+                and self._variants[position][0].startswith(query)
+            ):
+                key = self._variants[position][1]
+                if wanted(key):
+                    prefix.add(key)
+                position += 1
+            matches = sorted(prefix, key=lambda key: (rank(key), key))
+
+            if not matches:
+                if self._trigrams is None:
+                    self._trigrams = {}
+                    self._index_trigrams(self._variants)
+                grams = trigrams(query)
+                overlap = {}
+                for gram in grams:
+                    for entry in self._trigrams.get(gram, ()):
+                        overlap[entry] = overlap.get(entry, 0) + 1
+                # Similitud de Jaccard con la variante más parecida de cada autor
+                best = {}
+                for (variant, key), common in overlap.items():
+                    if key in prefix or not wanted(key):
+                        continue
+                    similarity = common / len(grams | self._variant_trigrams[variant])
+                    if similarity >= self.min_similarity and similarity > best.get(key, 0):
+                        best[key] = similarity
+                matches += sorted(best, key=lambda key: (-best[key], rank(key)))
+
+            return [
+                {"key": key, **self._authors[key]} for key in matches[:limit] if key in self._authors
+            ]
+
+    def stats(self):
+        self._load()
+        with self._lock:
+            return {"authors": len(self._authors), "name_variants": len(self._variants)}
+
+
+author_index = AuthorIndex(ajustes.AUTHOR_INDEX_PATH, min_similarity=ajustes.AUTHOR_MIN_SIMILARITY)
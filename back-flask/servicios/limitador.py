@@ -0,0 +1,226 @@
+"""
+Limitador de peticiones (token bucket) por API externa.
+
+Cada API tiene un cubo con una tasa (peticiones por segundo) y una ráfaga
+máxima. El estado vive en SQLite, así que lo comparten los hilos y todos los
+procesos (workers de gunicorn) de la máquina: cada ``acquire`` toma un turno
+dentro de una transacción ``BEGIN IMMEDIATE``.
+
+Además se guarda la cuota restante que anuncian las cabeceras de las APIs
+(``X-RateLimit-Remaining``/``X-RateLimit-Reset`` en Scopus,
+``X-Rate-Limit-Limit``/``X-Rate-Limit-Interval`` en CrossRef). Con la cuota
+agotada no se hacen más peticiones hasta la hora de reinicio, y un 429/503
+con ``Retry-After`` pausa el cubo (en todos los procesos) hasta esa hora.
+"""
+import re
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from servicios import ajustes
+from servicios.basedatos import SQLiteStore
+
+
+class QuotaExceededError(RuntimeError):
+    """
+    La cuota de la API está agotada (o no hay turno dentro de la espera máxima).
+    """
+
+
+def bucket_for_url(url):
+    """
+    Cubo que corresponde a una URL de las llamadas HTTP directas.
+    """
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host.endswith("elsevier.com"):
+        return "scopus_search" if "/search/" in parsed.path else "scopus_retrieval"
+    if host.endswith("crossref.org"):
+        return "crossref"
+    if host.endswith("serpapi.com"):
+        return "serpapi"
+    return "http"
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Respuestas con las que la API pide esperar (``Retry-After``) antes de volver a llamar
+PAUSE_STATUSES = (429, 503)
+
+
+def retry_after(headers):
+    """
+    Segundos que pide esperar la cabecera ``Retry-After`` (en segundos o como
+    fecha HTTP), o ``None`` si no viene o no se entiende.
+    """
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    seconds = _to_int(value)
+    if seconds is None:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, float(seconds))
+
+
+class RateLimiter(SQLiteStore):
+    def __init__(self, path, limits=None, max_wait=60, reserve=0):
+        self.limits = dict(limits or {})
+        self.max_wait = max_wait
+        self.reserve = reserve
+        super().__init__(path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                rate REAL,
+                quota_remaining INTEGER,
+                quota_reset REAL
+            )
+            """
+        )
+
+    def _limits_for(self, name):
+        return self.limits.get(name, self.limits.get("http", (10, 10)))
+
+    def _try_acquire(self, name):
+        """
+        Intenta tomar un turno. Devuelve 0 si lo consigue o los segundos que hay que esperar.
+        """
+        default_rate, burst = self._limits_for(name)
+        now = time.time()
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at, rate, quota_remaining, quota_reset FROM buckets WHERE name = ?",
+                (name,),
+            ).fetchone()
+            if row is None:
+                tokens, updated_at, announced_rate, remaining, reset = float(burst), now, None, None, None
+            else:
+                tokens, updated_at, announced_rate, remaining, reset = row
+            # Nunca más rápido que lo configurado ni que lo que anuncia la API
+            rate = min(announced_rate, default_rate) if announced_rate else default_rate
+
+            # Cuota agotada: esperar hasta el reinicio que anunció la API
+            if remaining is not None and remaining <= self.reserve:
+                if reset and reset > now:
+                    conn.execute("COMMIT")
+                    return reset - now
+                remaining = None  # ya se ha reiniciado
+
+            tokens = min(float(burst), tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+                if remaining is not None:
+                    remaining -= 1
+            else:
+                wait = (1 - tokens) / rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at, rate, quota_remaining, quota_reset) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, tokens, now, announced_rate, remaining, reset),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, name, max_wait=None):
+        """
+        Espera hasta conseguir un turno para ``name``. Lanza ``QuotaExceededError``
+        si habría que esperar más de ``max_wait`` segundos.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._try_acquire(name)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise QuotaExceededError(f"Sin cuota disponible para {name} (espera estimada: {wait:.0f} s)")
+            time.sleep(wait)
+
+    def observe(self, name, headers, status=None):
+        """
+        Actualiza la cuota y la tasa del cubo a partir de las cabeceras de una
+        respuesta. Un 429/503 con ``Retry-After`` deja el cubo sin cuota hasta
+        la hora indicada.
+        """
+        if not headers:
+            return
+
+        remaining = _to_int(headers.get("X-RateLimit-Remaining"))
+        reset = _to_int(headers.get("X-RateLimit-Reset"))
+
+        pause = retry_after(headers) if status in PAUSE_STATUSES else None
+        if pause:
+            remaining, reset = 0, time.time() + pause
+
+        # CrossRef anuncia su límite como "X-Rate-Limit-Limit: 50" y "X-Rate-Limit-Interval: 1s"
+        rate = None
+        limit = _to_int(headers.get("X-Rate-Limit-Limit"))
+        interval = re.match(r"(\d+)s", headers.get("X-Rate-Limit-Interval") or "")
+        if limit and interval and int(interval.group(1)) > 0:
+            rate = limit / int(interval.group(1))
+
+        if remaining is None and rate is None:
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT 1 FROM buckets WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                _, burst = self._limits_for(name)
+                conn.execute(
+                    "INSERT INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)", (name, float(burst), time.time())
+                )
+            if remaining is not None:
+                conn.execute(
+                    "UPDATE buckets SET quota_remaining = ?, quota_reset = ? WHERE name = ?", (remaining, reset, name)
+                )
+            if rate is not None:
+                conn.execute("UPDATE buckets SET rate = ? WHERE name = ?", (rate, name))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        rows = self._connect().execute(
+            "SELECT name, tokens, rate, quota_remaining, quota_reset FROM buckets"
+        ).fetchall()
+        return {
+            name: {
+                "tokens": round(tokens, 2),
+                "rate": rate or self._limits_for(name)[0],
+                "quota_remaining": remaining,
+                "quota_reset": reset,
+            }
+            for name, tokens, rate, remaining, reset in rows
+        }
+
+
+rate_limiter = RateLimiter(
+    ajustes.RATE_LIMITS_PATH,
+    limits=ajustes.RATE_LIMITS,
+    max_wait=ajustes.RATE_LIMIT_MAX_WAIT,
+    reserve=ajustes.QUOTA_RESERVE,
+)
@@ -0,0 +1,86 @@
+"""
+Métricas de revistas (SJR, SNIP, CiteScore, editorial) indexadas por ISSN.
+
+Las métricas se publican una vez al año, así que se guardan en la caché de
+respuestas con un TTL largo y se consultan en bloque para todos los ISSN de
+un conjunto de resultados.
+"""
+from collections import namedtuple
+
+from servicios import ajustes
+from servicios.concurrencia import bounded_map
+from servicios.fuentes import serial_title
+
+
+JournalMetrics = namedtuple(
+    "JournalMetrics", "issn title publisher sjr snip citescore citescoreyearinfolist"
+)
+
+
+def normalize_issn(issn):
+    """
+    Normaliza un ISSN a 8 caracteres sin guion ("0140-6736" -> "01406736").
+    """
+    if not issn:
+        return None
+    value = str(issn).replace("-", "").replace(" ", "").upper()
+    return value or None
+
+
+class JournalMetricsService:
+    def __init__(self, max_workers=ajustes.FETCH_WORKERS):
+        self.max_workers = max_workers
+
+    def _fetch(self, issn):
+        journal = serial_title(issn)
+        citescores = journal.citescoreyearinfolist or []
+        return JournalMetrics(
+            issn=issn,
+            title=journal.title,
+            publisher=journal.publisher,
+            sjr=journal.sjrlist[0][1] if journal.sjrlist else None,
+            snip=journal.sniplist[0][1] if journal.sniplist else None,
+            citescore=citescores[0].citescore if citescores else None,
+            citescoreyearinfolist=citescores or None,
+        )
+
+    def get_many(self, issns):
+        """
+        Devuelve {issn_normalizado: JournalMetrics} para los ISSN indicados.
+        Cada ISSN distinto se consulta una sola vez y los que faltan en caché
+        se piden en paralelo. Los ISSN que no se encuentran no aparecen.
+        """
+        unique = [issn for issn in (normalize_issn(issn) for issn in issns) if issn]
+        metrics, errors = bounded_map(self._fetch, unique, self.max_workers)
+
+        for issn, error in errors.items():
+            print(f"Error al obtener métricas del ISSN {issn}: {error}")
+
+        return metrics
+
+    def get(self, issn):
+        issn = normalize_issn(issn)
+        return self.get_many([issn]).get(issn) if issn else None
+
+
+journal_metrics = JournalMetricsService()
+
+
+def _metrics_json(issn, metrics):
+    if metrics is None:
+        return {"issn": issn, "error": "No se encontraron métricas para este ISSN"}
+
+    data = metrics._asdict()
+    data["citescoreyearinfolist"] = [entry._asdict() for entry in (metrics.citescoreyearinfolist or [])]
+    return data
+
+
+def get_journal_metrics_many(issns):
+    """
+    Devuelve las métricas de varias revistas como diccionarios listos para
+    JSON, en el orden de ``issns``, con una sola consulta en bloque.
+    """
+    issns = [issn for issn in issns if issn]
+    metrics = journal_metrics.get_many(issns)
+    return [_metrics_json(issn, metrics.get(normalize_issn(issn))) for issn in issns]
+
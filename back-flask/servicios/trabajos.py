@@ -0,0 +1,231 @@
+"""
+Cola de trabajos en segundo plano para los endpoints costosos (informes de
+impacto y grafos de citas).
+
+Los trabajos se ejecutan en un pool de hilos del proceso que los recibe, pero
+su estado y su resultado se guardan en SQLite, así que cualquier worker de
+gunicorn puede responder a /jobs/<id> y /jobs/<id>/result. Dos peticiones
+idénticas mientras la primera sigue pendiente o en curso comparten el mismo
+trabajo, aunque lleguen a workers distintos.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from servicios import ajustes
+from servicios.basedatos import SQLiteStore
+from servicios.cache import make_key
+
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+ACTIVE = (PENDING, RUNNING)
+
+# Segundos mínimos entre dos escrituras del progreso de un mismo trabajo
+PROGRESS_INTERVAL = 0.5
+
+_COLUMNS = "id, kind, key, status, progress, message, error, mimetype, filename, created_at, updated_at, finished_at"
+
+
+class Job:
+    def __init__(self, queue, id, kind, key, status=PENDING, progress=0.0, message="En cola", error=None,
+                 mimetype=None, filename=None, created_at=None, updated_at=None, finished_at=None, result=None):
+        self._queue = queue
+        self._reported_at = 0.0
+        self.id = id
+        self.kind = kind
+        self.key = key
+        self.status = status
+        self.progress = progress
+        self.message = message
+        self.error = error
+        self.mimetype = mimetype
+        self.filename = filename
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.finished_at = finished_at
+        self.result = result
+
+    def report(self, done, total, message=None):
+        """
+        Actualiza el progreso del trabajo (``done`` de ``total`` pasos).
+        """
+        self.progress = round(done / total, 3) if total else 0.0
+        if message:
+            self.message = message
+        # Se guarda como mucho cada PROGRESS_INTERVAL (y siempre el último paso)
+        now = time.time()
+        if now - self._reported_at >= PROGRESS_INTERVAL or done == total:
+            self._reported_at = now
+            self._queue._update(self.id, progress=self.progress, message=self.message)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue(SQLiteStore):
+    def __init__(self, path, max_workers=4, result_ttl=3600, max_result_bytes=50 * 2 ** 20, stale_after=600):
+        self.result_ttl = result_ttl
+        self.max_result_bytes = max_result_bytes
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trabajo")
+        # Trabajos de este proceso aún sin terminar (para el latido)
+        self._own = set()
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        super().__init__(path)
+
+    def _create_schema(self, conn):
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                mimetype TEXT,
+                filename TEXT,
+                result BLOB,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status);
+            CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+            """
+        )
+
+    def _job(self, row, result=None):
+        return Job(self, *row, result=result)
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        self._connect().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _purge(self, conn):
+        now = time.time()
+        # Resultados caducados
+        conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (now - self.result_ttl,))
+        # Trabajos cuyo worker murió sin terminarlos (sin noticias desde hace ``stale_after``)
+        conn.execute(
+            f"UPDATE jobs SET status = ?, error = ?, message = ?, finished_at = ?, updated_at = ? "
+            f"WHERE status IN ({','.join('?' * len(ACTIVE))}) AND updated_at < ?",
+            (ERROR, "El proceso que ejecutaba el trabajo terminó antes de acabarlo", "Abandonado", now, now,
+             *ACTIVE, now - self.stale_after),
+        )
+
+    def _beat(self):
+        # Mantiene al día ``updated_at`` de los trabajos propios aunque un paso
+        # largo no informe de progreso, para que nadie los dé por abandonados
+        while True:
+            time.sleep(self.stale_after / 4)
+            with self._lock:
+                own = list(self._own)
+            for job_id in own:
+                try:
+                    self._update(job_id)
+                except Exception as e:
+                    print(f"⚠️ No se pudo actualizar el trabajo {job_id}: {e}")
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name="trabajos-latido", daemon=True)
+                self._heartbeat.start()
+
+    def submit(self, kind, params, fn):
+        """
+        Encola ``fn(params, job)`` y devuelve el ``Job``. ``fn`` debe devolver
+        ``(contenido, mimetype, nombre_de_fichero)`` y puede informar del progreso
+        con ``job.report(hechos, total, mensaje)``.
+        """
+        key = make_key(kind, params)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._purge(conn)
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE key = ? AND status IN ({','.join('?' * len(ACTIVE))}) "
+                f"ORDER BY created_at LIMIT 1",
+                (key, *ACTIVE),
+            ).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return self._job(row)
+
+            now = time.time()
+            job = Job(self, uuid.uuid4().hex, kind, key, created_at=now, updated_at=now)
+            conn.execute(
+                "INSERT INTO jobs (id, kind, key, status, progress, message, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, kind, key, job.status, job.progress, job.message, now, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._own.add(job.id)
+        self._start_heartbeat()
+        self._executor.submit(self._run, job, fn, params)
+        return job
+
+    def get(self, job_id, with_result=False):
+        """
+        Devuelve el trabajo (con su contenido si ``with_result``) o ``None``
+        si no existe o ya ha caducado.
+        """
+        conn = self._connect()
+        self._purge(conn)
+        columns = f"{_COLUMNS}, result" if with_result else _COLUMNS
+        row = conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return self._job(row[:-1], result=row[-1]) if with_result else self._job(row)
+
+    def _run(self, job, fn, params):
+        self._update(job.id, status=RUNNING, message="En curso")
+        try:
+            result, mimetype, filename = fn(params, job)
+            if len(result) > self.max_result_bytes:
+                raise ValueError(
+                    f"El resultado ocupa {len(result) / 2 ** 20:.1f} MB y el máximo es "
+                    f"{self.max_result_bytes / 2 ** 20:.1f} MB"
+                )
+            self._update(
+                job.id, status=DONE, progress=1.0, message="Terminado", result=result, mimetype=mimetype,
+                filename=filename, finished_at=time.time(),
+            )
+        except Exception as e:
+            print(f"❌ Error en el trabajo {job.kind} {job.id}: {e}")
+            self._update(job.id, status=ERROR, error=str(e), message="Error", finished_at=time.time())
+        finally:
+            with self._lock:
+                self._own.discard(job.id)
+
+
+job_queue = JobQueue(
+    ajustes.JOBS_PATH,
+    max_workers=ajustes.JOB_WORKERS,
+    result_ttl=ajustes.JOB_RESULT_TTL,
+    max_result_bytes=ajustes.JOB_MAX_RESULT_BYTES,
+    stale_after=ajustes.JOB_STALE_AFTER,
+)
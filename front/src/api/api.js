@@ -41,3 +41,97 @@ export const searchAndRank = async ({ query, searchType, startYear, endYear, sou
       return { error: "No se pudo completar la búsqueda" };
     }
 };
+
+// Versión en streaming (NDJSON): llama a onSource(source, articles, error) en cuanto
+// cada fuente termina, sin esperar a las demás.
+export const searchAndRankStream = async ({ query, searchType, startYear, endYear, sources }, onSource) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/search_and_rank`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        busqueda: query,
+        tipoBusqueda: searchType,
+        fechaInicio: startYear ? parseInt(startYear, 10) : null,
+        fechaFin: endYear ? parseInt(endYear, 10) : null,
+        sources,
+        stream: "ndjson",
+      }),
+    });
+
+    if (!response.ok) throw new Error(`Error HTTP: ${response.status}`);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const lines = buffer.split("\n");
+      buffer = lines.pop();
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const event = JSON.parse(line);
+        if (event.source) onSource(event.source, event.articles || [], event.error);
+      }
+    }
+    return {};
+  } catch (error) {
+    console.error("Error en la búsqueda avanzada:", error);
+    return { error: "No se pudo completar la búsqueda" };
+  }
+};
+
+// Grafo de citas en formato JSON (nodos/aristas de vis-network)
+export const fetchCitationGraph = async (query, source) => {
+  const response = await fetch(`${API_BASE_URL}/generate_citation_graph`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ query, source, format: "json" }),
+  });
+  return await response.json();
+};
+
+// Dibuja el grafo en una ventana nueva con vis-network servido por el backend
+export const openCitationGraph = (graph) => {
+  const win = window.open("", "_blank");
+  if (!win) return;
+
+  win.document.write(`<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Grafo de citas</title>
+  <link rel="stylesheet" href="${API_BASE_URL}/lib/vis-9.1.2/vis-network.css">
+  <script src="${API_BASE_URL}/lib/vis-9.1.2/vis-network.min.js"></script>
+  <style>html, body, #grafo { width: 100%; height: 100%; margin: 0; }</style>
+</head>
+<body><div id="grafo"></div></body>
+</html>`);
+  win.document.close();
+
+  const draw = () => {
+    const nodes = graph.nodes.map((node) => {
+      // El hover llega como HTML: vis-network necesita un elemento para mostrarlo
+      const title = win.document.createElement("div");
+      title.innerHTML = node.title;
+      return { ...node, title };
+    });
+    const network = new win.vis.Network(
+      win.document.getElementById("grafo"),
+      { nodes: new win.vis.DataSet(nodes), edges: new win.vis.DataSet(graph.edges) },
+      // Si el servidor ya calculó las posiciones (x/y), no hace falta simular físicas
+      { edges: { arrows: "to", smooth: graph.physics !== false }, physics: { enabled: graph.physics !== false } }
+    );
+    network.on("doubleClick", ({ nodes: selected }) => {
+      const node = graph.nodes.find((n) => n.id === selected[0]);
+      if (node && node.url) win.open(node.url, "_blank");
+    });
+  };
+
+  if (win.vis) draw();
+  else win.addEventListener("load", draw);
+};
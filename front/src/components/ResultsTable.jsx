@@ -16,6 +16,7 @@ import Typography from "@mui/material/Typography";
 import PropTypes from "prop-types";
 import React, { useState } from "react";
 import { FaDownload } from "react-icons/fa";
+import { fetchCitationGraph as requestCitationGraph, openCitationGraph } from "../api/api";
 
 function escapeRegExp(value) {
   return value.replace(/[-[\]{}()*+?.,\\^$|#\s]/g, "\\$&");
@@ -146,18 +147,10 @@ const ResultsTable = ({ results }) => {
 
   const fetchCitationGraph = async (title, source) => {
     try {
-      const response = await fetch("http://localhost:5000/generate_citation_graph", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ query: title, source }), // <-- Enviar la fuente también
-      });
-  
-      const data = await response.json();
+      const data = await requestCitationGraph(title, source); // <-- Enviar la fuente también
   
       if (data.status === "success") {
-        const blob = new Blob([atob(data.graph_html)], { type: "text/html" });
-        const url = URL.createObjectURL(blob);
-        window.open(url, "_blank");
+        openCitationGraph(data.graph);
       } else {
         alert(`Error generando el grafo para ${source}: ` + data.message);
       }
@@ -1,6 +1,6 @@
 import "bootstrap/dist/css/bootstrap.min.css";
 import React, { useEffect, useState } from "react";
-import { searchAndRank } from "../api/api";
+import { searchAndRankStream } from "../api/api";
 import CircularProgressWithLabel from "../components/CircularProgress";
 import ResultsTable from "../components/ResultsTable";
 import SearchForm from "../components/SearchForm";
@@ -35,24 +35,25 @@ const SearcherPage = () => {
 
   const handleSearch = async () => {
     setLoading(true);
+    setResults({});
     try {
-      const data = await searchAndRank({
-        query: params.query,
-        searchType: params.searchType,
-        startYear: params.startYear,
-        endYear: params.endYear,
-        sources: selectedSources,
-      });
+      // Cada fuente se muestra en cuanto llega, sin esperar a las demás
+      const data = await searchAndRankStream(
+        {
+          query: params.query,
+          searchType: params.searchType,
+          startYear: params.startYear,
+          endYear: params.endYear,
+          sources: selectedSources,
+        },
+        (source, articles, error) => {
+          if (error) console.error(`Error en la búsqueda de ${source}: ${error}`);
+          setResults((prev) => ({ ...prev, [source]: Array.isArray(articles) ? articles : [] }));
+        }
+      );
 
       if (data.error) {
         console.error(`Error en la búsqueda: ${data.error}`);
-        setResults({});
-      } else {
-        const validResults = selectedSources.reduce((acc, source) => {
-          acc[source] = Array.isArray(data[source]) ? data[source] : [];
-          return acc;
-        }, {});
-        setResults(validResults);
       }
     } finally {
       setProgress(100);
@@ -69,7 +70,8 @@ const SearcherPage = () => {
       </div>
 
       <div className="mt-4 text-center">
-        {loading ? <CircularProgressWithLabel value={progress} /> : <ResultsTable results={results} />}
+        {loading && <CircularProgressWithLabel value={progress} />}
+        {Object.keys(results).length > 0 && <ResultsTable results={results} />}
       </div>
 
       <div className="mt-5">